@@ -0,0 +1,225 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from os import environ
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Literal,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    overload,
+)
+
+from app.engines import POOL_SETTINGS
+from app.enums import Operators, RowShapes
+from app.models import BaseModel, EventModel, Query, SelectionModel, SportModel
+from app.pagination import Page
+from app.schemas import ISchema
+from app.shapes import Results
+
+T = TypeVar('T')
+
+# A call checks out at most one pooled connection and returns it before it
+# completes, so by default there are as many workers as connections and the
+# async models never wait on the pool themselves.
+ASYNC_WORKERS = int(environ.get('DB_ASYNC_WORKERS', str(POOL_SETTINGS.size)))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ThreadPoolExecutor:
+    """The bounded executor every async model runs its blocking calls on."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=ASYNC_WORKERS, thread_name_prefix='async-model',
+            )
+        return _executor
+
+
+def shutdown_executor(wait: bool = True) -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+
+
+def _call(function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    # Async models are created without the schema check, which may run DDL,
+    # so it runs here instead. Once an engine is checked it returns at once.
+    BaseModel.ensure_schema()
+    return function(*args, **kwargs)
+
+
+async def _run(function: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor(), partial(_call, function, *args, **kwargs))
+
+
+class AsyncQuery:
+    """Awaitable version of a `Query`, immutable like it."""
+
+    __slots__ = ('query',)
+
+    def __init__(self, query: Query) -> None:
+        self.query = query
+
+    def select(self, *field_names: str) -> 'AsyncQuery':
+        return AsyncQuery(self.query.select(*field_names))
+
+    def filter(self, field_name: str, operator: Operators, value: Any) -> 'AsyncQuery':
+        return AsyncQuery(self.query.filter(field_name, operator, value))
+
+    def order_by(self, field_name: str, descending: bool = False) -> 'AsyncQuery':
+        return AsyncQuery(self.query.order_by(field_name, descending))
+
+    def limit(self, limit: Optional[int]) -> 'AsyncQuery':
+        return AsyncQuery(self.query.limit(limit))
+
+    def offset(self, offset: int) -> 'AsyncQuery':
+        return AsyncQuery(self.query.offset(offset))
+
+    def get_query(self) -> str:
+        return self.query.get_query()
+
+    def get_params(self) -> List[Any]:
+        return self.query.get_params()
+
+    @overload
+    async def execute(self, shape: Literal[RowShapes.Schema] = ...) -> List[ISchema]:
+        ...
+
+    @overload
+    async def execute(self, shape: RowShapes) -> Results:
+        ...
+
+    async def execute(self, shape: RowShapes = RowShapes.Schema) -> Results:
+        return await _run(self.query.execute, shape)
+
+    async def exists(self) -> bool:
+        return await _run(self.query.exists)
+
+    async def count(self) -> int:
+        return await _run(self.query.count)
+
+    async def count_by(self, *field_names: str) -> Dict[Any, int]:
+        return await _run(self.query.count_by, *field_names)
+
+    async def page(self, size: int, token: Optional[str] = None) -> Page:
+        return await _run(self.query.page, size, token)
+
+    async def with_children(self, depth: Optional[int] = None) -> List[ISchema]:
+        return await _run(self.query.with_children, depth)
+
+    async def iter(self, batch_size: int = 5000) -> AsyncIterator[ISchema]:
+        """Stream the results a keyset `page` of `batch_size` rows at a time.
+
+        Each page is a call of its own on the executor, so no connection is
+        held while the iterator is suspended. Like `page` the results are
+        ordered by `order_by`, ID by default, which must share a direction.
+        """
+        skip, remaining = self.query.statement.offset, self.query.statement.limit
+        token = None
+        while remaining != 0:
+            page = await _run(self.query.page, batch_size, token)
+            results = page.results[skip:]
+            skip = max(skip - len(page.results), 0)
+            if remaining is not None:
+                results = results[:remaining]
+                remaining -= len(results)
+            for schema in results:
+                yield schema
+            token = page.next_token
+            if token is None:
+                break
+
+
+class AsyncBaseModel:
+    """Awaitable version of a model, for use from an asyncio event loop.
+
+    Queries are built on the event loop like on the model itself, every
+    database call then runs on a bounded thread pool so the loop is never
+    blocked, e.g.::
+        sport = await AsyncSportModel().find(1)
+        events = await AsyncEventModel().filter('Sport', Operators.Equals, 1).execute()
+
+    Any number of calls can be awaited concurrently, at most `ASYNC_WORKERS`
+    of them run at a time. A call runs on one connection from start to end,
+    so `update` and `deactivate` cascade in a single transaction as usual.
+    """
+
+    model: Type[BaseModel]
+
+    def __init__(self) -> None:
+        # The schema check may run DDL, so it is left to the executor.
+        self._model = self.model(ensure_schema=False)
+
+    def query(self) -> AsyncQuery:
+        return AsyncQuery(self._model.query())
+
+    def select(self, *field_names: str) -> AsyncQuery:
+        return self.query().select(*field_names)
+
+    def filter(self, field_name: str, operator: Operators, value: Any) -> AsyncQuery:
+        return self.query().filter(field_name, operator, value)
+
+    async def with_children(self, depth: Optional[int] = None) -> List[ISchema]:
+        return await self.query().with_children(depth)
+
+    @overload
+    async def select_fields(
+        self, *field_names: str, shape: Literal[RowShapes.Schema] = ...,
+    ) -> List[ISchema]:
+        ...
+
+    @overload
+    async def select_fields(self, *field_names: str, shape: RowShapes) -> Results:
+        ...
+
+    async def select_fields(self, *field_names: str, shape: RowShapes = RowShapes.Schema) -> Results:
+        return await _run(self._model.select_fields, *field_names, shape=shape)
+
+    async def find(self, id: int) -> ISchema:
+        return await _run(self._model.find, id)
+
+    async def find_many(self, ids: Iterable[int]) -> Tuple[List[ISchema], List[int]]:
+        return await _run(self._model.find_many, list(ids))
+
+    async def insert(self, schema: ISchema) -> ISchema:
+        return await _run(self._model.insert, schema)
+
+    async def insert_many(self, schemas: Iterable[ISchema], chunk_size: int = 1000) -> int:
+        """`schemas` is consumed on the executor, it must not need the event loop."""
+        return await _run(self._model.insert_many, schemas, chunk_size)
+
+    async def update(self, schema: ISchema) -> ISchema:
+        return await _run(self._model.update, schema)
+
+    async def patch(self, id: int, **fields: Any) -> int:
+        return await _run(self._model.patch, id, **fields)
+
+    async def deactivate(self, ids: Iterable[int]) -> int:
+        return await _run(self._model.deactivate, list(ids))
+
+
+class AsyncSportModel(AsyncBaseModel):
+    model = SportModel
+
+
+class AsyncEventModel(AsyncBaseModel):
+    model = EventModel
+
+
+class AsyncSelectionModel(AsyncBaseModel):
+    model = SelectionModel
@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Tuple
+
+
+@dataclass
+class CacheStats:
+    """Point in time snapshot of a `QueryCache`."""
+
+    size: int = 0
+    max_size: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+
+
+class CacheKey(NamedTuple):
+    table_name: str
+    generation: int
+    query: Hashable
+    params: Tuple[Any, ...]
+
+
+class QueryCache:
+    """A thread-safe LRU cache of query results with a time to live.
+
+    Entries are keyed by table, query and parameters, where the query is its
+    text or a hashable statement which already holds its parameters. Each
+    table has a generation which is part of the key, so invalidating a table
+    is O(1): its old entries can no longer be looked up and age out of the LRU.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 60.0) -> None:
+        if max_size < 1:
+            raise ValueError('max_size must be at least 1.')
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[CacheKey, Tuple[float, Any]]' = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self._stats = CacheStats(max_size=max_size)
+
+    def key(
+        self, table_name: str, query: Hashable, params: Tuple[Any, ...] = (),
+    ) -> CacheKey:
+        with self._lock:
+            return CacheKey(
+                table_name, self._generations.get(table_name, 0), query, params,
+            )
+
+    def get(self, key: CacheKey) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats.misses += 1
+                return None
+            expires_at, value = entry
+            if time.monotonic() >= expires_at:
+                del self._entries[key]
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def set(self, key: CacheKey, value: Any) -> None:
+        with self._lock:
+            if key.generation != self._generations.get(key.table_name, 0):
+                return  # The table was written while the query was running.
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self._stats.evictions += 1
+
+    def invalidate(self, *table_names: str) -> None:
+        with self._lock:
+            for table_name in table_names:
+                self._generations[table_name] = self._generations.get(table_name, 0) + 1
+                self._stats.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            stats = CacheStats(**vars(self._stats))
+            stats.size = len(self._entries)
+        return stats
@@ -1,18 +1,61 @@
+import shlex
+import sys
+import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, cast
 
+import click
 import typer
+from typer.main import get_command
 
-from app.enums import Entities, Operators, OutcomeEnum, StatusEnum, TypeEnum
-from app.models import ModelFactory
-from app.schemas import SchemaFactory
+from app.enums import (
+    DataFormats,
+    Entities,
+    Operators,
+    OutcomeEnum,
+    StatusEnum,
+    TypeEnum,
+)
+
+# Only typer and the enums its options need are imported at startup. The
+# models, and pydantic with them, the importer and the exporter are imported
+# by the commands which use them, so `--help` or a typo doesn't pay for them.
 
 NULL_FOREIGN_KEY = 0
 
 app = typer.Typer()
 
 
+@app.callback()
+def options(
+    ctx: typer.Context,
+    stats: bool = typer.Option(
+        False, '--stats', help='Print statement counters per model method on exit.',
+    ),
+    slow_query_ms: Optional[float] = typer.Option(
+        None, help='Log statements slower than this many milliseconds.',
+    ),
+) -> None:
+    if not stats and slow_query_ms is None:
+        return
+    from app.instrumentation import instrumentation  # noqa: WPS433 - Lazy, see above.
+
+    if slow_query_ms is not None:
+        import logging  # noqa: WPS433
+
+        logging.basicConfig(format='%(levelname)s %(name)s: %(message)s')
+    instrumentation.enable(
+        slow_query_threshold=None if slow_query_ms is None else slow_query_ms / 1000,
+    )
+    if stats:
+        ctx.call_on_close(lambda: typer.echo(instrumentation.report(), err=True))
+
+
 def _create(entity: str, **kwargs) -> None:
+    from app.models import ModelFactory  # noqa: WPS433
+    from app.schemas import SchemaFactory  # noqa: WPS433
+
     schema = SchemaFactory.create(entity, **kwargs)
     model = ModelFactory.create(entity)
 
@@ -26,17 +69,11 @@ def _update(entity: str, id: int, arguments: Dict[str, Any]) -> None:
     if all(value == None for value in arguments.values()):
         typer.echo('Nothing was requested to be changed.')
         return
-    new_schema = {k: v for k, v in arguments.items() if v != None}
-
-    model = ModelFactory.create(entity)
-    old_model = model.find(id)
-
-    model_dict = old_model.dict()
-    model_dict.update(new_schema)
+    changes = {k: v for k, v in arguments.items() if v != None}
+    from app.models import ModelFactory  # noqa: WPS433
 
-    updated_model = SchemaFactory.create(entity, **model_dict)
-
-    model.update(updated_model)
+    # Only the changed columns are written, without reading the row first.
+    ModelFactory.create(entity).patch(id, **changes)
 
     typer.echo(f'Updated {entity.capitalize()} with ID: {id} successfully.')
 
@@ -94,34 +131,195 @@ def create_selection(
     )
 
 
-@app.command()
-def search(entity: str, select_field: List[str] = typer.Option(default=[])) -> None:
-    model = ModelFactory.create(entity)
+def _parse_filter(expression: str) -> Tuple[str, Operators, Any]:
+    """Parse a filter such as `Active = 1` or `ID IN 1,2,3`."""
+    field, _, rest = expression.strip().partition(' ')
+    rest = rest.strip()
+    # Longest first, so that `NOT IN` isn't taken for a value of `IN`.
+    for symbol in sorted(Operators.get_operators(), key=len, reverse=True):
+        if rest.upper().startswith(f'{symbol} '):
+            operator = Operators.get_operators()[symbol]
+            value: Any = rest[len(symbol):].strip()
+            if operator.takes_many:
+                value = [item.strip() for item in value.split(',')]
+            return field, operator, value
+    raise typer.BadParameter(f'Expected "<field> <operator> <value>", got: {expression}')
 
-    if select_field:
-        model.select(*select_field)
-    while True:
-        field = typer.prompt('Field to filter via')
+
+@app.command()
+def search(
+    entity: str,
+    select_field: List[str] = typer.Option(default=[]),
+    format: Optional[DataFormats] = typer.Option(
+        None, help='Write the results to stdout as csv or ndjson, prompting on stderr.',
+    ),
+    limit: Optional[int] = typer.Option(None, help='Results per page, ordered by ID.'),
+    page_token: Optional[str] = typer.Option(None, help='Continue after a previous page.'),
+    filter: List[str] = typer.Option(
+        default=[], help='e.g. "Active = 1", combined with AND. Skips the prompts, e.g. in scripts.',
+    ),
+) -> None:
+    if page_token is not None and limit is None:
+        raise typer.BadParameter('--page-token needs --limit.')
+    from app.exporter import export, write_rows  # noqa: WPS433
+    from app.models import ModelFactory  # noqa: WPS433
+
+    query = ModelFactory.create(entity).query()
+    err = format is not None
+
+    try:
+        if select_field:
+            query = query.select(*select_field)
+        for expression in filter:
+            query = query.filter(*_parse_filter(expression))
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
+    while not filter:
+        field = typer.prompt('Field to filter via', err=err)
 
         operators = Operators.get_operators()
         while True:
-            operator = typer.prompt(
-                f"Operator({', '.join(op for op in operators.keys())}) to filter via"
+            symbol = typer.prompt(
+                f"Operator({', '.join(op for op in operators.keys())}) to filter via",
+                err=err,
             )
-            if operator in operators:
-                operator = operators[operator]
+            if symbol in operators:
+                operator = operators[symbol]
                 break
-        value = typer.prompt('Value to filter via')
-
-        model.filter(field, operator, value)
-
-        cont = typer.confirm('Would you like to add another filter')
+        value: Any = typer.prompt(
+            'Values, comma separated, to filter via'
+            if operator.takes_many
+            else 'Value to filter via',
+            err=err,
+        )
+        if operator.takes_many:
+            value = [item.strip() for item in value.split(',')]
+
+        query = query.filter(field, operator, value)
+
+        cont = typer.confirm('Would you like to add another filter', err=err)
         if not cont:
             break
-    result = model.execute()
+    if limit is None:
+        if format is not None:
+            export(query, format, sys.stdout)
+            return
+        result = query.execute()
+        next_token = None
+    else:
+        from app.pagination import InvalidPageToken  # noqa: WPS433
+        try:
+            result, next_token = query.page(limit, page_token)
+        except InvalidPageToken as error:
+            raise typer.BadParameter(str(error), param_hint='--page-token')
+
+    if format is not None:
+        write_rows(
+            (tuple(getattr(schema, field) for field in query.fields) for schema in result),
+            query.fields, query.model.metadata(), format, sys.stdout,
+        )
+    else:
+        result_str = f"Found: {result} successfully." if result else "Nothing was found."
+        typer.echo(result_str)
+    if next_token is not None:
+        typer.echo(f'Next page: --page-token {next_token}', err=True)
+
+
+@app.command('export')
+def export_rows(
+    entity: str,
+    output: str = typer.Argument('-', help='File to write, - for stdout.'),
+    format: DataFormats = typer.Option(DataFormats.CSV),
+    select_field: List[str] = typer.Option(default=[]),
+    filter: List[str] = typer.Option(
+        default=[], help='e.g. "Active = 1" or "ID IN 1,2,3", combined with AND.',
+    ),
+    batch_size: Optional[int] = typer.Option(
+        None, help='Rows fetched at a time, by default the exporter\'s.',
+    ),
+) -> None:
+    """Stream rows to a file or stdout as they are read from the database."""
+    from app.exporter import DEFAULT_BATCH_SIZE, export  # noqa: WPS433
+    from app.models import ModelFactory  # noqa: WPS433
+
+    query = ModelFactory.create(entity).query()
+    try:
+        if select_field:
+            query = query.select(*select_field)
+        for expression in filter:
+            query = query.filter(*_parse_filter(expression))
+    except ValueError as error:
+        raise typer.BadParameter(str(error))
+
+    stream = sys.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+    try:
+        exported = export(
+            query, format, stream, DEFAULT_BATCH_SIZE if batch_size is None else batch_size,
+        )
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    typer.echo(f'Exported {exported} {entity} rows.', err=True)
+
+
+@app.command('import')
+def import_rows(
+    entity: Entities,
+    source: str = typer.Argument('-', help='CSV or NDJSON file, - for stdin.'),
+    format: Optional[DataFormats] = typer.Option(
+        None, help='Defaults to the file extension, ndjson for stdin.',
+    ),
+    parent_key: Optional[str] = typer.Option(
+        None, help='Parent column the foreign key column holds, e.g. Slug. Defaults to ID.',
+    ),
+    batch_size: Optional[int] = typer.Option(
+        None, help='Rows per transaction, by default the importer\'s.',
+    ),
+    rejected: Optional[str] = typer.Option(
+        None, help='Write rejected rows to this file as NDJSON, instead of stderr.',
+    ),
+) -> None:
+    """Stream rows into the database in batches, rejecting invalid ones."""
+    import json  # noqa: WPS433
+
+    from app.importer import (  # noqa: WPS433
+        DEFAULT_BATCH_SIZE,
+        Importer,
+        Rejection,
+        detect_format,
+        read_rows,
+    )
+
+    stream = sys.stdin if source == '-' else open(source, newline='', encoding='utf-8')
+    rejected_file = None if rejected is None else open(rejected, 'w', encoding='utf-8')
+
+    def on_reject(rejection: Rejection) -> None:
+        if rejected_file is None:
+            typer.echo(f'Rejected row {rejection.line}: {rejection.error}', err=True)
+            return
+        rejected_file.write(json.dumps(
+            {'line': rejection.line, 'error': rejection.error, 'row': rejection.row}, default=str,
+        ) + '\n')
+
+    try:
+        importer = Importer(
+            entity.value,
+            parent_key,
+            DEFAULT_BATCH_SIZE if batch_size is None else batch_size,
+            on_reject,
+        )
+        report = importer.run(read_rows(stream, format or detect_format(source)))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if rejected_file is not None:
+            rejected_file.close()
+
+    typer.echo(
+        f'Imported {report.inserted} of {report.rows} {entity.value} rows, '
+        f'{report.rejected} rejected, in {report.elapsed:.2f}s ({report.rows_per_second:.0f} rows/s).'
+    )
 
-    result_str = f"Found: {result} successfully." if result else "Nothing was found."
-    typer.echo(result_str)
 
 @app.command()
 def update_sport(
@@ -180,5 +378,144 @@ def update_selection(
         },
     )
 
+# Commands a shell or batch script can't run, they would nest sessions.
+SESSION_COMMANDS = ('shell', 'batch')
+
+SHELL_PROMPT = '888> '
+SHELL_EXIT = ('exit', 'quit')
+
+DEFAULT_TRANSACTION_SIZE = 1000
+
+
+def _script_lines(lines: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """Number the lines of a script, skipping blank ones and # comments."""
+    for line_number, line in enumerate(lines, 1):
+        stripped = line.strip()
+        if stripped and not stripped.startswith('#'):
+            yield line_number, stripped
+
+
+def _run_line(group: click.Group, line: str) -> None:
+    """Run a command line, e.g. `update-selection 1 --price 2.5`, in this process.
+
+    The command is called directly, parsing the group's options on every
+    line would take longer than most commands.
+    """
+    name, *arguments = shlex.split(line)
+    if name in ('--help', 'help'):
+        typer.echo(group.get_help(click.Context(group, info_name='888')))
+        return
+    if name in SESSION_COMMANDS:
+        raise typer.BadParameter(f'{name} can\'t be run from a shell or batch script.')
+    command = group.commands.get(name)
+    if command is None:
+        raise click.UsageError(f"No such command '{name}'.")
+    command.main(arguments, prog_name=f'888 {name}', standalone_mode=False)
+
+
+def _describe(error: Exception) -> str:
+    if isinstance(error, click.ClickException):
+        return error.format_message()
+    return f'{type(error).__name__}: {error}'
+
+
+def _warm_up() -> None:
+    """Create the models, their metadata and a pooled connection up front."""
+    from app.models import BaseModel, ModelFactory  # noqa: WPS433
+
+    for entity in Entities:
+        ModelFactory.create(entity.value).metadata()
+    with BaseModel.pool().connection():
+        pass
+
+
+@app.command()
+def shell() -> None:
+    """Run commands, one per line, in one process.
+
+    The models, their metadata and the pooled connections stay warm between
+    commands, which are the CLI's own, e.g. `create-sport name slug`.
+    """
+    group = cast(click.Group, get_command(app))
+    interactive = sys.stdin.isatty()
+    _warm_up()
+    if interactive:
+        typer.echo(f"Type a command, --help for the list, or {' / '.join(SHELL_EXIT)} to leave.")
+
+    while True:
+        try:
+            line = input(SHELL_PROMPT if interactive else '').strip()
+        except EOFError:
+            break
+        except KeyboardInterrupt:
+            typer.echo()
+            continue
+        if line in SHELL_EXIT:
+            break
+        if not line or line.startswith('#'):
+            continue
+        try:
+            _run_line(group, line)
+        except (click.Abort, KeyboardInterrupt):
+            typer.echo('Aborted.', err=True)
+        except Exception as error:
+            typer.echo(f'Error: {_describe(error)}', err=True)
+
+
+@app.command()
+def batch(
+    script: str = typer.Argument('-', help='Commands, one per line, - for stdin.'),
+    transaction_size: int = typer.Option(
+        DEFAULT_TRANSACTION_SIZE, help='Operations committed together.',
+    ),
+) -> None:
+    """Run a script of commands, one per line, on one connection.
+
+    The commands are committed in transactions of `--transaction-size`. A
+    failing command is rolled back alone, reported on stderr with its line
+    and the script goes on. `search` needs `--filter`, as nothing answers
+    its prompts. For example::
+        create-selection name 1.5 Unsettled --event 1
+        update-selection 12 --price 2.5
+        search selection --filter "Event = 1" --format ndjson
+    """
+    if transaction_size < 1:
+        raise typer.BadParameter('--transaction-size must be at least 1.')
+    from app.models import transaction  # noqa: WPS433
+
+    group = cast(click.Group, get_command(app))
+    _warm_up()
+    stream = sys.stdin if script == '-' else open(script, encoding='utf-8')
+    started = time.perf_counter()
+    ran = failed = 0
+    try:
+        lines = _script_lines(stream)
+        while True:
+            chunk = list(islice(lines, transaction_size))
+            if not chunk:
+                break
+            with transaction():
+                for line_number, line in chunk:
+                    ran += 1
+                    try:
+                        with transaction():  # A savepoint, undone alone on failure.
+                            _run_line(group, line)
+                    except Exception as error:
+                        failed += 1
+                        typer.echo(f'Line {line_number}: {_describe(error)}', err=True)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+    elapsed = time.perf_counter() - started
+    typer.echo(
+        f'Ran {ran} commands, {failed} failed, in {elapsed:.2f}s '
+        f'({ran / elapsed if elapsed else 0:.0f} commands/s).',
+        err=True,
+    )
+    if failed:
+        raise typer.Exit(code=1)
+
+
 def main() -> None:
     app()
\ No newline at end of file
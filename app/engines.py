@@ -0,0 +1,674 @@
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import partial
+from os import environ
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+)
+
+from app.enums import Engines, Keywords, Operators
+from app.metadata import TableMetadata
+from app.migrations import MIGRATIONS_TABLE, SCHEMA_VERSION, migrations_metadata
+from app.pool import ConnectionPool, PoolSettings, StatementCache
+from app.statements import (
+    Condition,
+    Count,
+    DeactivateOrphans,
+    Insert,
+    OrderBy,
+    Select,
+    Statement,
+    Update,
+    condition_params,
+)
+
+POOL_SETTINGS = PoolSettings(
+    size=int(environ.get('DB_POOL_SIZE', '5')),
+    max_idle_time=float(environ.get('DB_POOL_MAX_IDLE_TIME', '300')),
+    checkout_timeout=float(environ.get('DB_POOL_CHECKOUT_TIMEOUT', '10')),
+)
+STATEMENT_CACHE_SIZE = int(environ.get('DB_STATEMENT_CACHE_SIZE', '64'))
+
+KEY_DATABASE = 'database'
+KEY_DIRECTORY = 'directory'
+KEY_ENGINE = 'engine'
+
+
+class Connection:
+    """A DB-API connection and the statement cache which lives with it."""
+
+    def __init__(self, raw: Any, statements: StatementCache) -> None:
+        self.raw = raw
+        self.statements = statements
+
+    @property
+    def in_transaction(self) -> bool:
+        return self.raw.in_transaction
+
+    def cursor(self) -> Any:
+        return self.raw.cursor()
+
+    def commit(self) -> None:
+        self.raw.commit()
+
+    def rollback(self) -> None:
+        self.raw.rollback()
+
+    def close(self) -> None:
+        self.raw.close()
+
+
+class IEngine(ABC):
+    """A storage engine, which owns the connection pool of one database.
+
+    Models describe what to run with the statements in `app.statements` and
+    engines decide how, so `BaseModel` never depends on a particular driver
+    or SQL dialect. Reads return a cursor-like object with `fetchall()` and
+    `fetchmany(size)`.
+    """
+
+    name: str
+
+    def __init__(self, db_settings: Dict[str, Any]) -> None:
+        self.db_settings = db_settings
+        self.pool = ConnectionPool(
+            self.connect,
+            size=POOL_SETTINGS.size,
+            max_idle_time=POOL_SETTINGS.max_idle_time,
+            checkout_timeout=POOL_SETTINGS.checkout_timeout,
+            health_check=self.is_connected,
+        )
+        self._tables_lock = threading.Lock()
+        self._schema_version = 0  # Known to be applied, see `ensure_schema`.
+
+    @abstractmethod
+    def connect(self) -> Any:
+        ...
+
+    @abstractmethod
+    def is_connected(self, connection: Any) -> bool:
+        ...
+
+    @abstractmethod
+    def create_database(self, database_name: str) -> None:
+        ...
+
+    @abstractmethod
+    def remove_database(self, database_name: str) -> None:
+        ...
+
+    @abstractmethod
+    def create_table(self, connection: Any, metadata: TableMetadata) -> None:
+        """Create the table if it does not exist, then `create_indexes`."""
+
+    @abstractmethod
+    def create_indexes(self, connection: Any, metadata: TableMetadata) -> None:
+        """Create the table's declared indexes which don't exist yet."""
+
+    @abstractmethod
+    def drop_indexes(self, connection: Any, metadata: TableMetadata) -> None:
+        ...
+
+    @abstractmethod
+    def existing_indexes(self, connection: Any, table_name: str) -> Set[str]:
+        ...
+
+    @abstractmethod
+    def has_table(self, connection: Any, table_name: str) -> bool:
+        ...
+
+    @abstractmethod
+    def select(self, connection: Any, statement: Union[Select, Count]) -> Any:
+        """A cursor of the rows of a `Select`, or of the counts of a `Count`."""
+
+    @abstractmethod
+    def insert(self, connection: Any, statement: Insert) -> int:
+        """Insert the rows, returning the ID of the first one.
+
+        The rows of a single insert are given consecutive IDs.
+        """
+
+    @abstractmethod
+    def update(self, connection: Any, statement: Update) -> int:
+        """Update the matching rows, returning how many were changed."""
+
+    @abstractmethod
+    def deactivate_orphans(self, connection: Any, statement: DeactivateOrphans) -> None:
+        ...
+
+    @abstractmethod
+    def savepoint(self, connection: Any, name: str) -> None:
+        """Mark a point of the transaction, starting it if needed."""
+
+    @abstractmethod
+    def rollback_to_savepoint(self, connection: Any, name: str) -> None:
+        """Undo the writes since the savepoint `name`, and release it."""
+
+    @abstractmethod
+    def release_savepoint(self, connection: Any, name: str) -> None:
+        ...
+
+    @abstractmethod
+    def compile(self, statement: Statement) -> Tuple[str, List[Any]]:
+        """The statement as SQL and its parameters, for debugging."""
+
+    def describe(self, statement: Statement) -> str:
+        """The statement as the engine would run it, for debugging."""
+        return self.compile(statement)[0]
+
+    def lock(self, connection: Any, statement: Select) -> None:
+        """Lock the rows matching `statement` until the transaction ends."""
+        self.select(connection, statement._replace(for_update=True)).fetchall()
+
+    def schema_version(self, connection: Any) -> int:
+        """The latest version recorded in `schema_migrations`, 0 if none."""
+        if not self.has_table(connection, MIGRATIONS_TABLE):
+            return 0
+        rows = self.select(
+            connection,
+            Select(
+                MIGRATIONS_TABLE,
+                ('Version',),
+                order_by=(OrderBy('Version', descending=True),),
+                limit=1,
+            ),
+        ).fetchall()
+        return rows[0][0] if rows else 0
+
+    def ensure_schema(self, tables: Callable[[], Iterable[TableMetadata]]) -> None:
+        """Create `tables` unless `schema_migrations` records `SCHEMA_VERSION`.
+
+        The version is read once for the lifetime of the engine, so a new
+        process costs a single lookup instead of DDL for every table. Only
+        when the database is older are the tables, and their indexes, created
+        and the version recorded, in one transaction where DDL allows it.
+        """
+        if self._schema_version >= SCHEMA_VERSION:
+            return
+        with self._tables_lock:
+            if self._schema_version >= SCHEMA_VERSION:
+                return
+            with self.pool.connection() as connection:
+                version = self.schema_version(connection)
+                if version < SCHEMA_VERSION:
+                    self.create_table(connection, migrations_metadata())
+                    for metadata in tables():
+                        self.create_table(connection, metadata)
+                    self.insert(
+                        connection,
+                        Insert(
+                            MIGRATIONS_TABLE,
+                            ('Version', 'AppliedAt'),
+                            ((SCHEMA_VERSION, datetime.now()),),
+                        ),
+                    )
+                    connection.commit()
+                    version = SCHEMA_VERSION
+            self._schema_version = version
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class SQLCompiler:
+    """Compiles statements to SQL with `placeholder` parameters.
+
+    Compiled SQL is cached per statement shape, i.e. everything but the
+    parameter values, so a hot query is only ever built once.
+    """
+
+    placeholder: str = '%s'
+    supports_for_update: bool = True
+
+    MAX_TEMPLATES = 4096
+
+    def __init__(self) -> None:
+        self._templates: Dict[Hashable, str] = {}
+
+    def _template(self, shape: Hashable, build: Callable[[], str]) -> str:
+        query = self._templates.get(shape)
+        if query is None:
+            if len(self._templates) >= self.MAX_TEMPLATES:
+                self._templates.clear()
+            query = build()
+            self._templates[shape] = query
+        return query
+
+    def _placeholders(self, count: int) -> str:
+        return f"({', '.join([self.placeholder] * count)})"
+
+    def _where(self, conditions: Tuple[Condition, ...]) -> str:
+        if not conditions:
+            return ''
+        expressions = []
+        for where in conditions:
+            if not where.operator.takes_many:
+                expressions.append(
+                    f'{where.field_name} {where.operator.value} {self.placeholder}'
+                )
+            elif where.value:
+                expressions.append(
+                    f'{where.field_name} {where.operator.value} {self._placeholders(len(where.value))}'
+                )
+            else:  # Nothing is IN an empty list, everything is NOT IN it.
+                expressions.append('1 = 0' if where.operator == Operators.In else '1 = 1')
+        return f" {Keywords.Where.value} {f' {Keywords.And.value} '.join(expressions)}"
+
+    @staticmethod
+    def _conditions_shape(conditions: Tuple[Condition, ...]) -> Hashable:
+        return tuple(
+            (
+                where.field_name,
+                where.operator,
+                len(where.value) if where.operator.takes_many else None,
+            )
+            for where in conditions
+        )
+
+    def compile(self, statement: Statement) -> Tuple[str, List[Any]]:
+        if isinstance(statement, Select):
+            return self.compile_select(statement)
+        if isinstance(statement, Count):
+            return self.compile_count(statement)
+        if isinstance(statement, Insert):
+            return self.compile_insert(statement)
+        if isinstance(statement, Update):
+            return self.compile_update(statement)
+        return self.compile_deactivate_orphans(statement)
+
+    def _seek(self, statement: Select) -> str:
+        """`(<order by columns>) > (<after>)`, or `<` when descending."""
+        order_by = statement.order_by[:len(statement.after)]
+        columns = ', '.join(order.field_name for order in order_by)
+        operator = Operators.LessThan if order_by[0].descending else Operators.GreaterThan
+        return f'({columns}) {operator.value} {self._placeholders(len(order_by))}'
+
+    def compile_select(self, statement: Select) -> Tuple[str, List[Any]]:
+        for_update = statement.for_update and self.supports_for_update
+        paginated = statement.limit is not None or statement.offset > 0
+
+        def build() -> str:
+            distinct = f'{Keywords.Distinct.value} ' if statement.distinct else ''
+            query = f"{Keywords.Select.value} {distinct}{', '.join(statement.fields)} {Keywords.From.value} {statement.table_name}{self._where(statement.conditions)}"
+            if statement.after:
+                query += f" {Keywords.And.value if statement.conditions else Keywords.Where.value} {self._seek(statement)}"
+            if statement.order_by:
+                query += f" {Keywords.OrderBy.value} {', '.join(f'{order.field_name} DESC' if order.descending else order.field_name for order in statement.order_by)}"
+            if paginated:
+                query += f' {Keywords.Limit.value} {self.placeholder} {Keywords.Offset.value} {self.placeholder}'
+            if for_update:
+                query += f' {Keywords.ForUpdate.value}'
+            return query
+
+        shape = (
+            Select,
+            statement.table_name,
+            statement.fields,
+            self._conditions_shape(statement.conditions),
+            statement.order_by,
+            statement.distinct,
+            for_update,
+            paginated,
+            len(statement.after),
+        )
+        return self._template(shape, build), statement.params()
+
+    def compile_count(self, statement: Count) -> Tuple[str, List[Any]]:
+        def build() -> str:
+            columns = ', '.join((*statement.group_by, Keywords.CountAll.value))
+            query = f'{Keywords.Select.value} {columns} {Keywords.From.value} {statement.table_name}{self._where(statement.conditions)}'
+            if statement.group_by:
+                query += f" {Keywords.GroupBy.value} {', '.join(statement.group_by)}"
+            return query
+
+        shape = (
+            Count,
+            statement.table_name,
+            self._conditions_shape(statement.conditions),
+            statement.group_by,
+        )
+        return self._template(shape, build), statement.params()
+
+    def compile_insert(self, statement: Insert) -> Tuple[str, List[Any]]:
+        def build() -> str:
+            rows_placeholder = ', '.join(
+                [self._placeholders(len(statement.columns))] * len(statement.rows)
+            )
+            return f"{Keywords.InsertInto.value} {statement.table_name} ({', '.join(statement.columns)}) {Keywords.Values.value} {rows_placeholder}"
+
+        shape = (Insert, statement.table_name, statement.columns, len(statement.rows))
+        return (
+            self._template(shape, build),
+            [value for row in statement.rows for value in row],
+        )
+
+    def compile_update(self, statement: Update) -> Tuple[str, List[Any]]:
+        def build() -> str:
+            assignments = ', '.join(
+                f'{column} = {self.placeholder}' for column, _ in statement.assignments
+            )
+            return f'{Keywords.Update.value} {statement.table_name} {Keywords.Set.value} {assignments}{self._where(statement.conditions)}'
+
+        shape = (
+            Update,
+            statement.table_name,
+            tuple(column for column, _ in statement.assignments),
+            self._conditions_shape(statement.conditions),
+        )
+        params = [value for _, value in statement.assignments]
+        params.extend(condition_params(statement.conditions))
+        return self._template(shape, build), params
+
+    def compile_deactivate_orphans(
+        self, statement: DeactivateOrphans,
+    ) -> Tuple[str, List[Any]]:
+        parent, child = statement.parent_table, statement.child_table
+
+        def build() -> str:
+            return (
+                f'{Keywords.Update.value} {parent} {Keywords.Set.value} {Keywords.Active.value} = 0 '
+                f'{Keywords.Where.value} {Keywords.ID.value} {Keywords.In.value} {self._placeholders(len(statement.parent_ids))} {Keywords.And.value} {Keywords.Active.value} = 1 '
+                f'{Keywords.And.value} {Keywords.NotExists.value} ({Keywords.Select.value} 1 {Keywords.From.value} {child} '
+                f'{Keywords.Where.value} {child}.{statement.foreign_key} = {parent}.{Keywords.ID.value} '
+                f'{Keywords.And.value} {child}.{Keywords.Active.value} = 1)'
+            )
+
+        shape = (
+            DeactivateOrphans, parent, child, statement.foreign_key, len(statement.parent_ids),
+        )
+        return self._template(shape, build), list(statement.parent_ids)
+
+
+class SQLEngine(SQLCompiler, IEngine, ABC):
+    """An engine running compiled SQL through a DB-API driver."""
+
+    primary_key: str
+    type_lookup: Dict[str, str]
+
+    def __init__(self, db_settings: Dict[str, Any]) -> None:
+        IEngine.__init__(self, db_settings)
+        SQLCompiler.__init__(self)
+
+    def create_table_query(self, metadata: TableMetadata) -> str:
+        """For example::
+            CREATE TABLE IF NOT EXISTS sports (ID INTEGER PRIMARY KEY AUTO_INCREMENT, Name VARCHAR(255), Slug VARCHAR(255), Active BOOLEAN)
+        """
+        table_columns = ', '.join(
+            f'{column} {self.type_lookup[column_type]}'
+            for column, column_type in metadata.column_types.items()
+        )
+        return f'CREATE TABLE IF NOT EXISTS {metadata.table_name} ({self.primary_key}, {table_columns})'
+
+    def create_index_query(self, table_name: str, index_name: str, columns: Tuple[str, ...]) -> str:
+        """For example::
+            CREATE INDEX ix_selections_Event_Active ON selections (Event, Active)
+        """
+        return f"CREATE INDEX {index_name} ON {table_name} ({', '.join(columns)})"
+
+    def create_table(self, connection: Any, metadata: TableMetadata) -> None:
+        connection.cursor().execute(self.create_table_query(metadata))
+        self.create_indexes(connection, metadata)
+
+    def create_indexes(self, connection: Any, metadata: TableMetadata) -> None:
+        if not metadata.indexes:
+            return
+        existing = self.existing_indexes(connection, metadata.table_name)
+        cursor = connection.cursor()
+        for index_name, columns in metadata.indexes.items():
+            if index_name not in existing:
+                cursor.execute(self.create_index_query(metadata.table_name, index_name, columns))
+
+    def select(self, connection: Any, statement: Union[Select, Count]) -> Any:
+        return connection.statements.execute(*self.compile(statement))
+
+    def update(self, connection: Any, statement: Update) -> int:
+        return connection.statements.execute(*self.compile_update(statement)).rowcount
+
+    def deactivate_orphans(self, connection: Any, statement: DeactivateOrphans) -> None:
+        connection.statements.execute(*self.compile_deactivate_orphans(statement))
+
+    def savepoint(self, connection: Any, name: str) -> None:
+        connection.cursor().execute(f'SAVEPOINT {name}')
+
+    def rollback_to_savepoint(self, connection: Any, name: str) -> None:
+        cursor = connection.cursor()
+        cursor.execute(f'ROLLBACK TO SAVEPOINT {name}')
+        cursor.execute(f'RELEASE SAVEPOINT {name}')
+
+    def release_savepoint(self, connection: Any, name: str) -> None:
+        connection.cursor().execute(f'RELEASE SAVEPOINT {name}')
+
+
+class MySQLEngine(SQLEngine):
+    name = Engines.MySQL.value
+    primary_key = 'ID INTEGER PRIMARY KEY AUTO_INCREMENT'
+    type_lookup = {
+        'string': 'VARCHAR(255)',
+        'integer': 'INTEGER',
+        'boolean': 'BOOLEAN',
+        'number': 'INTEGER',
+    }
+
+    def connect(self) -> Connection:
+        from mysql.connector import connect  # noqa: WPS433 - Only needed by MySQL.
+
+        raw = connect(
+            **{
+                key: value
+                for key, value in self.db_settings.items()
+                if key not in {KEY_ENGINE, KEY_DIRECTORY}
+            }
+        )
+        return Connection(raw, StatementCache(partial(raw.cursor, prepared=True), STATEMENT_CACHE_SIZE))
+
+    def is_connected(self, connection: Any) -> bool:
+        return connection.raw.is_connected()
+
+    def create_database(self, database_name: str) -> None:
+        with self.pool.connection() as connection:
+            connection.cursor().execute(f'CREATE DATABASE IF NOT EXISTS {database_name}')
+
+    def remove_database(self, database_name: str) -> None:
+        with self.pool.connection() as connection:
+            connection.cursor().execute(f'DROP DATABASE IF EXISTS {database_name}')
+
+    def existing_indexes(self, connection: Any, table_name: str) -> Set[str]:
+        cursor = connection.cursor()
+        cursor.execute(
+            'SELECT DISTINCT INDEX_NAME FROM information_schema.statistics WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+            (table_name,),
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def has_table(self, connection: Any, table_name: str) -> bool:
+        cursor = connection.cursor()
+        cursor.execute(
+            'SELECT 1 FROM information_schema.tables WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+            (table_name,),
+        )
+        return bool(cursor.fetchall())
+
+    def drop_indexes(self, connection: Any, metadata: TableMetadata) -> None:
+        existing = self.existing_indexes(connection, metadata.table_name)
+        cursor = connection.cursor()
+        for index_name in metadata.indexes:
+            if index_name in existing:
+                cursor.execute(f'DROP INDEX {index_name} ON {metadata.table_name}')
+
+    def insert(self, connection: Any, statement: Insert) -> int:
+        query, params = self.compile_insert(statement)
+        if len(statement.rows) == 1:
+            cursor = connection.statements.execute(query, params)
+        else:
+            # Multi-row inserts are not prepared, their placeholder count can
+            # exceed the server's limit for prepared statements.
+            cursor = connection.cursor()
+            cursor.execute(query, params)
+        return cursor.lastrowid
+
+
+# Stored like MySQL's VARCHAR representation, without the deprecated default.
+sqlite3.register_adapter(datetime, partial(datetime.isoformat, sep=' '))
+
+
+class SQLiteEngine(SQLEngine):
+    """An embedded engine, each database is a file in `directory`.
+
+    Connections run in WAL mode so readers never block the writer, with
+    `synchronous = NORMAL` which is durable in WAL mode short of power loss.
+    Writes open an IMMEDIATE transaction, SQLite allows one writer at a time,
+    which serialises cascades without `SELECT ... FOR UPDATE`.
+    """
+
+    name = Engines.SQLite.value
+    placeholder = '?'
+    primary_key = 'ID INTEGER PRIMARY KEY'
+    type_lookup = {
+        'string': 'TEXT',
+        'integer': 'INTEGER',
+        'boolean': 'BOOLEAN',
+        'number': 'REAL',
+    }
+    supports_for_update = False
+
+    PRAGMAS = (
+        'PRAGMA journal_mode = WAL',
+        'PRAGMA synchronous = NORMAL',
+        'PRAGMA temp_store = MEMORY',
+        'PRAGMA cache_size = -65536',  # 64 MiB.
+        'PRAGMA mmap_size = 268435456',  # 256 MiB.
+    )
+    BUSY_TIMEOUT = 10.0
+    MAX_VARIABLES = 32766
+
+    def __init__(self, db_settings: Dict[str, Any]) -> None:
+        super().__init__(db_settings)
+        self.directory = db_settings.get(KEY_DIRECTORY) or '.'
+
+    def _path(self, database_name: str) -> str:
+        return os.path.join(self.directory, f'{database_name}.db')
+
+    def connect(self) -> Connection:
+        os.makedirs(self.directory, exist_ok=True)
+        raw = sqlite3.connect(
+            self._path(self.db_settings[KEY_DATABASE]),
+            timeout=self.BUSY_TIMEOUT,
+            isolation_level='IMMEDIATE',
+            check_same_thread=False,  # The pool hands connections across threads.
+        )
+        for pragma in self.PRAGMAS:
+            raw.execute(pragma)
+        return Connection(raw, StatementCache(raw.cursor, STATEMENT_CACHE_SIZE))
+
+    def is_connected(self, connection: Any) -> bool:
+        connection.raw.execute('SELECT 1')
+        return True
+
+    def create_database(self, database_name: str) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+
+    def remove_database(self, database_name: str) -> None:
+        path = self._path(database_name)
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def existing_indexes(self, connection: Any, table_name: str) -> Set[str]:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?",
+            (table_name,),
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def has_table(self, connection: Any, table_name: str) -> bool:
+        cursor = connection.cursor()
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table_name,),
+        )
+        return bool(cursor.fetchall())
+
+    def create_index_query(self, table_name: str, index_name: str, columns: Tuple[str, ...]) -> str:
+        return f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({', '.join(columns)})"
+
+    def drop_indexes(self, connection: Any, metadata: TableMetadata) -> None:
+        cursor = connection.cursor()
+        for index_name in metadata.indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS {index_name}')
+
+    def lock(self, connection: Any, statement: Select) -> None:
+        """Take the database's write lock, which covers every row."""
+        if not connection.in_transaction:
+            connection.raw.execute('BEGIN IMMEDIATE')
+
+    def savepoint(self, connection: Any, name: str) -> None:
+        # Outside a transaction SAVEPOINT would begin a deferred one.
+        if not connection.in_transaction:
+            connection.raw.execute('BEGIN IMMEDIATE')
+        super().savepoint(connection, name)
+
+    def insert(self, connection: Any, statement: Insert) -> int:
+        rows_per_insert = max(1, self.MAX_VARIABLES // len(statement.columns))
+        first_id: Optional[int] = None
+        cursor = connection.cursor()
+        for start in range(0, len(statement.rows), rows_per_insert):
+            rows = statement.rows[start : start + rows_per_insert]
+            cursor.execute(*self.compile_insert(statement._replace(rows=rows)))
+            if first_id is None:
+                # The last row ID is reported, rows get consecutive IDs.
+                first_id = cursor.lastrowid - len(rows) + 1
+        return first_id or 0
+
+
+ENGINES: Dict[str, Type[IEngine]] = {
+    Engines.MySQL.value: MySQLEngine,
+    Engines.SQLite.value: SQLiteEngine,
+}
+
+_engines: Dict[Tuple[Tuple[str, str], ...], IEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def _engine_key(db_settings: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((key, str(value)) for key, value in db_settings.items()))
+
+
+def _engine_class(name: str) -> Type[IEngine]:
+    if name == Engines.Memory.value:
+        from app.memory import MemoryEngine  # noqa: WPS433 - It depends on this module.
+
+        return MemoryEngine
+    return ENGINES[name]
+
+
+def get_engine(db_settings: Dict[str, Any]) -> IEngine:
+    """Return the engine, and pool, shared by everything using `db_settings`."""
+    key = _engine_key(db_settings)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engine_class(db_settings.get(KEY_ENGINE, Engines.MySQL.value))(db_settings)
+            _engines[key] = engine
+    return engine
+
+
+def close_engines(database_name: Optional[str] = None) -> None:
+    """Close the engines using `database_name`, or every engine."""
+    with _engines_lock:
+        for key, engine in list(_engines.items()):
+            if database_name is None or (KEY_DATABASE, database_name) in key:
+                engine.close()
+                del _engines[key]
@@ -8,6 +8,29 @@ class Entities(str, Enum):
     Selection = "selection"
 
 
+class Engines(str, Enum):
+    MySQL = "mysql"
+    SQLite = "sqlite"
+    Memory = "memory"
+
+
+class DataFormats(str, Enum):
+    """File formats of the import and export commands."""
+
+    CSV = "csv"
+    NDJSON = "ndjson"  # One JSON object per line, also known as JSONL.
+
+
+class RowShapes(str, Enum):
+    """Shapes `execute` and `select_fields` can return results in."""
+
+    Schema = "schema"  # Schema objects, the default.
+    Tuple = "tuple"  # Plain tuples, in the order of the fields.
+    Record = "record"  # Objects of a `__slots__` class per projection.
+    NamedTuple = "namedtuple"  # A namedtuple class per projection.
+    Columns = "columns"  # A sequence per field, arrays for numbers.
+
+
 class Operators(Enum):
     """
     Additional operators can be easily added such as REGEXP, ADD, etc.
@@ -17,6 +40,13 @@ class Operators(Enum):
     NotEquals = "!="
     GreaterThan = ">"
     LessThan = "<"
+    In = "IN"
+    NotIn = "NOT IN"
+
+    @property
+    def takes_many(self) -> bool:
+        """Whether the operator compares against a list of values."""
+        return self in {Operators.In, Operators.NotIn}
 
     @classmethod
     def get_operators(cls) -> Dict[str, "Operators"]:
@@ -46,3 +76,29 @@ class StatusEnum(str, Enum):
     Ended = "Ended"
     Started = "Started"
     Pending = "Pending"
+
+
+class Keywords(str, Enum):
+    ID = 'ID'
+
+    Properties = 'properties'
+
+    Active = 'Active'
+
+    And = 'AND'
+    CountAll = 'COUNT(*)'
+    Distinct = 'DISTINCT'
+    ForUpdate = 'FOR UPDATE'
+    From = 'FROM'
+    GroupBy = 'GROUP BY'
+    In = 'IN'
+    InsertInto = 'INSERT INTO'
+    Limit = 'LIMIT'
+    NotExists = 'NOT EXISTS'
+    Offset = 'OFFSET'
+    OrderBy = 'ORDER BY'
+    Set = 'SET'
+    Select = 'SELECT'
+    Update = 'UPDATE'
+    Values = 'VALUES'
+    Where = 'WHERE'
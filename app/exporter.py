@@ -0,0 +1,88 @@
+import csv
+import json
+from datetime import datetime
+from typing import Any, Callable, Iterable, List, Optional, TextIO, Tuple
+
+from app.enums import DataFormats
+from app.metadata import TableMetadata
+from app.models import Query
+
+DEFAULT_BATCH_SIZE = 5000
+
+Converter = Callable[[Any], Any]
+
+
+def _to_boolean(value: Any) -> Optional[bool]:
+    # MySQL and SQLite return booleans as 0 and 1.
+    return None if value is None else bool(value)
+
+
+def _to_string(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def converters(metadata: TableMetadata, columns: Iterable[str]) -> List[Converter]:
+    """Functions making the cursor values of `columns` JSON serializable."""
+    column_converters: List[Converter] = []
+    for column in columns:
+        column_type = metadata.column_types.get(column)
+        if column_type == 'boolean':
+            column_converters.append(_to_boolean)
+        elif column in metadata.column_formats:
+            column_converters.append(_to_string)
+        else:
+            column_converters.append(_identity)
+    return column_converters
+
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return value
+
+
+def write_rows(
+    rows: Iterable[Tuple[Any, ...]],
+    columns: Tuple[str, ...],
+    metadata: TableMetadata,
+    format: DataFormats,
+    output: TextIO,
+) -> int:
+    """Write `rows` to `output` one at a time, returning how many.
+
+    CSV starts with a header of `columns`, NDJSON has an object per row.
+    Both can be read back by the import command.
+    """
+    column_converters = converters(metadata, columns)
+    written = 0
+    if format is DataFormats.CSV:
+        writer = csv.writer(output)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([
+                _csv_value(convert(value)) for convert, value in zip(column_converters, row)
+            ])
+            written += 1
+        return written
+
+    for row in rows:
+        output.write(json.dumps({
+            column: convert(value)
+            for column, convert, value in zip(columns, column_converters, row)
+        }))
+        output.write('\n')
+        written += 1
+    return written
+
+
+def export(
+    query: Query, format: DataFormats, output: TextIO, batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Stream the results of `query` to `output`, without building schemas."""
+    return write_rows(
+        query.iter_rows(batch_size), query.fields, query.model.metadata(), format, output,
+    )
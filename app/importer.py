@@ -0,0 +1,222 @@
+import csv
+import json
+from dataclasses import dataclass
+from itertools import islice
+from os import path
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    TextIO,
+    Tuple,
+    cast,
+)
+
+from pydantic import ValidationError
+
+from app.enums import DataFormats, Keywords, Operators
+from app.models import BaseModel, ModelFactory
+from app.schemas import ISchema, SchemaFactory
+
+DEFAULT_BATCH_SIZE = 1000
+PARENT_KEY_CACHE_SIZE = 100000
+
+_EXTENSIONS = {
+    '.csv': DataFormats.CSV,
+    '.ndjson': DataFormats.NDJSON,
+    '.jsonl': DataFormats.NDJSON,
+}
+
+
+class MalformedRow(NamedTuple):
+    """A line which could not be parsed, rejected by `Importer`."""
+
+    text: str
+    error: str
+
+
+@dataclass
+class Rejection:
+    line: int  # The number of the row in the feed, from 1.
+    error: str
+    row: Any
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    inserted: int = 0
+    rejected: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+
+def detect_format(file_name: str) -> DataFormats:
+    """The format of `file_name` by its extension, NDJSON for stdin."""
+    if file_name == '-':
+        return DataFormats.NDJSON
+    extension = path.splitext(file_name)[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError(f'Unknown format of {file_name}, expected one of {", ".join(_EXTENSIONS)}.')
+    return _EXTENSIONS[extension]
+
+
+def read_rows(stream: TextIO, format: DataFormats) -> Iterator[Any]:
+    """Parse `stream` lazily, one dict per row.
+
+    Empty CSV cells are left out so the schema defaults apply. Lines which
+    are not valid JSON are yielded as `MalformedRow` instead of failing.
+    """
+    if format is DataFormats.CSV:
+        for row in csv.DictReader(stream):
+            yield {key: value for key, value in row.items() if value not in ('', None)}
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as error:
+            yield MalformedRow(line, str(error))
+
+
+class ParentKeys:
+    """Maps external keys of parents, e.g. sport slugs, to their IDs.
+
+    Unknown keys are looked up in batches of `WHERE <column> IN (...)` and
+    the results kept in a cache of at most `max_size` keys, which is cleared
+    when full so memory stays bounded however many parents a feed has. The
+    column should be unique, e.g. `Slug`.
+    """
+
+    def __init__(
+        self, model: BaseModel, column: str, max_size: int = PARENT_KEY_CACHE_SIZE,
+    ) -> None:
+        if column not in model.metadata().columns:
+            raise KeyError(column)
+        self._query = model.select(column)
+        self._column = column
+        self._max_size = max_size
+        self._ids: Dict[str, int] = {}
+
+    def resolve(self, keys: Iterable[Any]) -> Dict[str, int]:
+        """The IDs of `keys` which exist, by key as a string."""
+        keys = {str(key) for key in keys}
+        missing = [key for key in keys if key not in self._ids]
+        if missing:
+            if len(self._ids) + len(missing) > self._max_size:
+                # The keys which were cached are looked up again too, or
+                # they would be missing from the result.
+                self._ids.clear()
+                missing = list(keys)
+            for schema in self._query.filter(self._column, Operators.In, missing).execute():
+                self._ids.setdefault(str(getattr(schema, self._column)), cast(int, schema.get_id()))
+        return {key: self._ids[key] for key in keys if key in self._ids}
+
+
+class Importer:
+    """Validates and inserts rows of `entity`, `batch_size` rows at a time.
+
+    Each batch has its parent keys mapped, is validated through
+    `SchemaFactory` and inserted with `insert_many`, i.e. in its own
+    transaction. Only one batch is held in memory, rejected rows are passed
+    to `on_reject` rather than kept.
+
+    Without `parent_key` the foreign key column holds parent IDs as is. With
+    it, the column holds the `parent_key` of the parent, e.g. its `Slug`,
+    and rows whose parent doesn't exist are rejected.
+    """
+
+    def __init__(
+        self,
+        entity: str,
+        parent_key: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_reject: Optional[Callable[[Rejection], None]] = None,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1.')
+        self.entity = entity
+        self.model = ModelFactory.create(entity)
+        self.batch_size = batch_size
+        self.on_reject = on_reject
+
+        self._parent_keys: Optional[ParentKeys] = None
+        if parent_key is not None and parent_key != Keywords.ID.value:
+            parent = self.model.parent
+            if parent is None:
+                raise ValueError(f'{entity.capitalize()} has no parent to map keys of.')
+            self._parent_keys = ParentKeys(parent(), parent_key)
+
+    def _reject(self, report: ImportReport, line: int, error: str, row: Any) -> None:
+        report.rejected += 1
+        if self.on_reject is not None:
+            self.on_reject(Rejection(line, error, row))
+
+    def _map_parents(
+        self, report: ImportReport, batch: List[Tuple[int, Dict[str, Any]]],
+    ) -> List[Tuple[int, Dict[str, Any]]]:
+        if self._parent_keys is None:
+            return batch
+        foreign_key = cast(str, self.model.foreign_key)
+        ids = self._parent_keys.resolve(
+            row[foreign_key] for _, row in batch if foreign_key in row
+        )
+
+        mapped = []
+        for line, row in batch:
+            if foreign_key in row:
+                id = ids.get(str(row[foreign_key]))
+                if id is None:
+                    self._reject(report, line, f'Unknown {foreign_key}: {row[foreign_key]}.', row)
+                    continue
+                row = {**row, foreign_key: id}
+            mapped.append((line, row))
+        return mapped
+
+    def _validate(
+        self, report: ImportReport, batch: List[Tuple[int, Dict[str, Any]]],
+    ) -> List[ISchema]:
+        schemas = []
+        for line, row in batch:
+            try:
+                schemas.append(SchemaFactory.create(self.entity, **row))
+            except (ValidationError, TypeError, ValueError) as error:
+                self._reject(report, line, str(error).replace('\n', ' '), row)
+        return schemas
+
+    def run(self, rows: Iterable[Any]) -> ImportReport:
+        report = ImportReport()
+        started = perf_counter()
+        numbered = enumerate(rows, start=1)
+        while True:
+            chunk = list(islice(numbered, self.batch_size))
+            if not chunk:
+                break
+            report.rows += len(chunk)
+
+            batch = []
+            for line, row in chunk:
+                if isinstance(row, MalformedRow):
+                    self._reject(report, line, row.error, row.text)
+                elif not isinstance(row, dict):
+                    self._reject(report, line, 'Expected an object.', row)
+                else:
+                    row.pop(Keywords.ID.value, None)  # IDs are assigned by the database.
+                    batch.append((line, row))
+            schemas = self._validate(report, self._map_parents(report, batch))
+            if schemas:
+                report.inserted += self.model.insert_many(schemas, chunk_size=self.batch_size)
+        report.elapsed = perf_counter() - started
+        return report
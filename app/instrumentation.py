@@ -0,0 +1,361 @@
+import logging
+import threading
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field, replace
+from functools import wraps
+from inspect import isgeneratorfunction
+from time import perf_counter
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from app.statements import Insert, Select, Statement
+
+slow_query_logger = logging.getLogger('app.slow_queries')
+
+Hook = Callable[['QueryEvent'], None]
+F = TypeVar('F', bound=Callable[..., Any])
+
+UNKNOWN = '-'
+
+
+@dataclass
+class QueryEvent:
+    """A statement run by a model, passed to the hooks.
+
+    Before hooks see it without `rowcount`, `elapsed` or `error`.
+    """
+
+    model: str
+    method: str
+    operation: str
+    sql: str
+    params: List[Any]
+    connection_wait: float = 0.0
+    rowcount: int = -1
+    elapsed: float = 0.0
+    error: Optional[BaseException] = None
+
+
+@dataclass
+class OperationStats:
+    """Aggregated statements of one model method."""
+
+    statements: int = 0
+    rows: int = 0
+    errors: int = 0
+    slow: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    connection_wait: float = 0.0
+    by_operation: Dict[str, int] = field(default_factory=dict)
+
+
+class Instrumentation:
+    """Hooks, a slow query log and counters around every statement.
+
+    Disabled by default, when `BaseModel.engine()` hands out the engine
+    itself and nothing is measured. Once enabled it hands out an
+    `InstrumentedEngine` instead, which times each statement and reports it
+    as a `QueryEvent` attributed to the model method which ran it.
+
+    For example::
+        instrumentation.enable(slow_query_threshold=0.1)
+        instrumentation.add_hook(after=lambda event: print(event.sql, event.elapsed))
+        SportModel().find(1)
+        print(instrumentation.report())
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.slow_query_threshold: Optional[float] = None
+
+        self._before: List[Hook] = []
+        self._after: List[Hook] = []
+        self._counters: Dict[Tuple[str, str], OperationStats] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._engines: Dict[int, 'InstrumentedEngine'] = {}
+
+    def enable(self, slow_query_threshold: Optional[float] = None) -> None:
+        """Start instrumenting, logging statements slower than `slow_query_threshold` seconds."""
+        self.slow_query_threshold = slow_query_threshold
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def add_hook(self, before: Optional[Hook] = None, after: Optional[Hook] = None) -> None:
+        if before is not None:
+            self._before.append(before)
+        if after is not None:
+            self._after.append(after)
+
+    def remove_hook(self, hook: Hook) -> None:
+        for hooks in (self._before, self._after):
+            if hook in hooks:
+                hooks.remove(hook)
+
+    def wrap(self, engine: Any) -> 'InstrumentedEngine':
+        with self._lock:
+            instrumented = self._engines.get(id(engine))
+            if instrumented is None or instrumented.engine is not engine:
+                instrumented = InstrumentedEngine(engine, self)
+                self._engines[id(engine)] = instrumented
+        return instrumented
+
+    @contextmanager
+    def operation(self, model: str, method: str) -> Iterator[None]:
+        """Attribute statements to `model.method`, the outermost call wins."""
+        if getattr(self._local, 'method', None) is not None:
+            yield
+            return
+        self._local.model, self._local.method = model, method
+        try:
+            yield
+        finally:
+            self._local.model = self._local.method = None
+
+    def waited(self, seconds: float) -> None:
+        """Connection wait, attributed to the next statement of the thread."""
+        self._local.wait = getattr(self._local, 'wait', 0.0) + seconds
+
+    def start(self, operation: str, sql: str, params: List[Any]) -> QueryEvent:
+        local = self._local
+        event = QueryEvent(
+            model=getattr(local, 'model', None) or UNKNOWN,
+            method=getattr(local, 'method', None) or UNKNOWN,
+            operation=operation,
+            sql=sql,
+            params=params,
+            connection_wait=getattr(local, 'wait', 0.0),
+        )
+        local.wait = 0.0
+        for hook in self._before:
+            hook(event)
+        return event
+
+    def finish(
+        self,
+        event: QueryEvent,
+        elapsed: float,
+        rowcount: int = -1,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        event.elapsed, event.rowcount, event.error = elapsed, rowcount, error
+        slow = (
+            self.slow_query_threshold is not None
+            and elapsed >= self.slow_query_threshold
+        )
+        with self._lock:
+            stats = self._counters.get((event.model, event.method))
+            if stats is None:
+                stats = self._counters[(event.model, event.method)] = OperationStats()
+            stats.statements += 1
+            stats.rows += max(rowcount, 0)
+            stats.errors += error is not None
+            stats.slow += slow
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.connection_wait += event.connection_wait
+            stats.by_operation[event.operation] = stats.by_operation.get(event.operation, 0) + 1
+        if slow:
+            slow_query_logger.warning(
+                'Slow query, %.1f ms in %s.%s: %s %r',
+                elapsed * 1000, event.model, event.method, event.sql, event.params,
+            )
+        for hook in self._after:
+            hook(event)
+
+    def counters(self) -> Dict[Tuple[str, str], OperationStats]:
+        """Snapshot of the counters by model and method."""
+        with self._lock:
+            return {
+                key: replace(stats, by_operation=dict(stats.by_operation))
+                for key, stats in self._counters.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+
+    def report(self) -> str:
+        lines = [
+            f"{'model.method':<32} {'statements':>10} {'rows':>8} {'errors':>6} {'slow':>5} {'total ms':>10} {'max ms':>9} {'wait ms':>9}"
+        ]
+        for (model, method), stats in sorted(self.counters().items()):
+            lines.append(
+                f'{f"{model}.{method}":<32} {stats.statements:>10} {stats.rows:>8} {stats.errors:>6} {stats.slow:>5} '
+                f'{stats.total_time * 1000:>10.3f} {stats.max_time * 1000:>9.3f} {stats.connection_wait * 1000:>9.3f}'
+            )
+        return '\n'.join(lines)
+
+
+instrumentation = Instrumentation()
+
+
+def instrumented(method: F) -> F:
+    """Attribute the statements run by a model method to it."""
+    name = method.__name__.lstrip('_')
+
+    if isgeneratorfunction(method):
+        @wraps(method)
+        def generator(self: Any, *args: Any, **kwargs: Any) -> Any:
+            # Only each step is attributed, not the caller's code between
+            # them, which may well run statements of its own.
+            iterator = method(self, *args, **kwargs)
+            try:
+                while True:
+                    with _operation(type(self).__name__, name):
+                        try:
+                            item = next(iterator)
+                        except StopIteration as stop:
+                            return stop.value
+                    yield item
+            finally:
+                with _operation(type(self).__name__, name):
+                    iterator.close()
+        return generator  # type: ignore
+
+    @wraps(method)
+    def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        if not instrumentation.enabled:
+            return method(self, *args, **kwargs)
+        with instrumentation.operation(type(self).__name__, name):
+            return method(self, *args, **kwargs)
+    return wrapper  # type: ignore
+
+
+def _operation(model: str, method: str) -> ContextManager[None]:
+    if not instrumentation.enabled:
+        return nullcontext()
+    return instrumentation.operation(model, method)
+
+
+class _InstrumentedPool:
+    """Records how long each checkout waited for a connection."""
+
+    def __init__(self, pool: Any, instrumentation: Instrumentation) -> None:
+        self._pool = pool
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool, name)
+
+    def acquire(self) -> Any:
+        started = perf_counter()
+        connection = self._pool.acquire()
+        self._instrumentation.waited(perf_counter() - started)
+        return connection
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self._pool.release(connection)
+
+
+class _InstrumentedCursor:
+    """Finishes the select's event once its rows are read."""
+
+    def __init__(
+        self, cursor: Any, instrumentation: Instrumentation, event: QueryEvent, elapsed: float,
+    ) -> None:
+        self._cursor = cursor
+        self._instrumentation = instrumentation
+        self._event: Optional[QueryEvent] = event
+        self._elapsed = elapsed
+        self._rows = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cursor, name)
+
+    def _finish(self) -> None:
+        if self._event is not None:
+            self._instrumentation.finish(self._event, self._elapsed, self._rows)
+            self._event = None
+
+    def fetchall(self) -> List[Tuple[Any, ...]]:
+        started = perf_counter()
+        rows = self._cursor.fetchall()
+        self._elapsed += perf_counter() - started
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def fetchmany(self, size: int) -> List[Tuple[Any, ...]]:
+        started = perf_counter()
+        rows = self._cursor.fetchmany(size)
+        self._elapsed += perf_counter() - started
+        self._rows += len(rows)
+        if len(rows) < size:
+            self._finish()
+        return rows
+
+
+class InstrumentedEngine:
+    """Proxy of an engine which reports every statement it runs."""
+
+    def __init__(self, engine: Any, instrumentation: Instrumentation) -> None:
+        self.engine = engine
+        self.pool = _InstrumentedPool(engine.pool, instrumentation)
+        self._instrumentation = instrumentation
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.engine, name)
+
+    def _run(
+        self,
+        operation: str,
+        run: Callable[[Any, Any], Any],
+        connection: Any,
+        statement: Statement,
+        rowcount: Callable[[Any], int] = lambda result: -1,
+    ) -> Any:
+        event = self._instrumentation.start(operation, *self.engine.compile(statement))
+        started = perf_counter()
+        try:
+            result = run(connection, statement)
+        except BaseException as error:
+            self._instrumentation.finish(event, perf_counter() - started, error=error)
+            raise
+        self._instrumentation.finish(event, perf_counter() - started, rowcount(result))
+        return result
+
+    def select(self, connection: Any, statement: Statement) -> Any:
+        event = self._instrumentation.start('select', *self.engine.compile(statement))
+        started = perf_counter()
+        try:
+            cursor = self.engine.select(connection, statement)
+        except BaseException as error:
+            self._instrumentation.finish(event, perf_counter() - started, error=error)
+            raise
+        return _InstrumentedCursor(cursor, self._instrumentation, event, perf_counter() - started)
+
+    def lock(self, connection: Any, statement: Select) -> None:
+        self._run('lock', self.engine.lock, connection, statement)
+
+    def insert(self, connection: Any, statement: Insert) -> int:
+        return self._run(
+            'insert', self.engine.insert, connection, statement,
+            rowcount=lambda result: len(statement.rows),
+        )
+
+    def update(self, connection: Any, statement: Statement) -> int:
+        return self._run(
+            'update', self.engine.update, connection, statement,
+            rowcount=lambda result: result,
+        )
+
+    def deactivate_orphans(self, connection: Any, statement: Statement) -> None:
+        self._run('deactivate_orphans', self.engine.deactivate_orphans, connection, statement)
@@ -0,0 +1,584 @@
+import os
+import pickle
+import threading
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from functools import partial
+from operator import eq, gt, lt, ne
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableSequence,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from app.engines import KEY_DATABASE, KEY_DIRECTORY, IEngine, SQLCompiler
+from app.enums import Engines, Keywords, Operators
+from app.metadata import TableMetadata
+from app.statements import (
+    Condition,
+    Count,
+    DeactivateOrphans,
+    Insert,
+    Select,
+    Statement,
+    Update,
+)
+
+FORMAT_DATE_TIME = 'date-time'
+
+# A filter value which can't be converted to its column's type, e.g. 'abc'
+# for an integer. Like in SQL it equals none of the column's values.
+_UNMATCHED = object()
+
+COMPARISONS: Dict[Operators, Callable[[Any, Any], bool]] = {
+    Operators.Equals: eq,
+    Operators.NotEquals: ne,
+    Operators.GreaterThan: gt,
+    Operators.LessThan: lt,
+}
+
+
+class IntegrityError(Exception):
+    """Raised when an inserted row reuses an existing ID."""
+
+
+class LockTimeout(Exception):
+    """Raised when the database's lock could not be taken within the timeout."""
+
+
+def _to_boolean(value: Any) -> int:
+    if isinstance(value, str):
+        return int(value.strip().lower() in {'1', 'true'})
+    return int(bool(value))
+
+
+def _to_string(value: Any) -> str:
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def _to_datetime(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value))
+
+
+CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    'string': _to_string,
+    'integer': int,
+    'boolean': _to_boolean,
+    'number': float,
+}
+
+
+def _new_column(column_type: str) -> MutableSequence:
+    if column_type == 'integer':
+        return array('q')
+    if column_type == 'number':
+        return array('d')
+    if column_type == 'boolean':
+        return bytearray()
+    return []
+
+
+class _HashIndex:
+    """Positions of the rows by the value of `column`."""
+
+    __slots__ = ('column', 'entries')
+
+    def __init__(self, column: str) -> None:
+        self.column = column
+        self.entries: Dict[Any, Set[int]] = {}
+
+    def add(self, value: Any, position: int) -> None:
+        positions = self.entries.get(value)
+        if positions is None:
+            self.entries[value] = {position}
+        else:
+            positions.add(position)
+
+    def remove(self, value: Any, position: int) -> None:
+        positions = self.entries[value]
+        positions.discard(position)
+        if not positions:
+            del self.entries[value]
+
+    def get(self, value: Any) -> Set[int]:
+        return self.entries.get(value, set())
+
+
+class _Table:
+    """Rows stored column by column, in insertion order.
+
+    Integer and number columns are packed arrays and booleans a bytearray,
+    so a row costs a few bytes per column rather than a Python object. The
+    ID column has a hash index to row positions and every declared index a
+    hash index on its leading column, e.g. the foreign keys `Sport` and
+    `Event`. Columns are not nullable.
+    """
+
+    __slots__ = ('name', 'converters', 'columns', 'positions', 'indexes', 'next_id')
+
+    def __init__(self, metadata: TableMetadata) -> None:
+        self.name = metadata.table_name
+        self.converters: Dict[str, Callable[[Any], Any]] = {Keywords.ID.value: int}
+        self.columns: Dict[str, MutableSequence] = {Keywords.ID.value: array('q')}
+        for column, column_type in metadata.column_types.items():
+            if metadata.column_formats.get(column) == FORMAT_DATE_TIME:
+                self.converters[column] = _to_datetime
+            else:
+                self.converters[column] = CONVERTERS[column_type]
+            self.columns[column] = _new_column(column_type)
+        self.positions: Dict[int, int] = {}
+        self.indexes: Dict[str, _HashIndex] = {}
+        self.next_id = 1
+
+    def __len__(self) -> int:
+        return len(self.columns[Keywords.ID.value])
+
+    def convert(self, column: str, value: Any) -> Any:
+        return self.converters[column](value)
+
+    def convert_filter(self, column: str, value: Any) -> Any:
+        """`convert`, or `_UNMATCHED` when `value` can't be converted."""
+        try:
+            return self.convert(column, value)
+        except (TypeError, ValueError):
+            return _UNMATCHED
+
+    def index_on(self, column: str) -> Optional[_HashIndex]:
+        for index in self.indexes.values():
+            if index.column == column:
+                return index
+        return None
+
+    def append(self, row: Dict[str, Any]) -> int:
+        """Append a converted row, returning its ID."""
+        id = row.get(Keywords.ID.value)
+        if id is None:
+            id = self.next_id
+        elif id in self.positions:
+            raise IntegrityError(f'Duplicate ID {id} in {self.name}.')
+
+        position = len(self)
+        self.columns[Keywords.ID.value].append(id)
+        for column, values in self.columns.items():
+            if column != Keywords.ID.value:
+                values.append(row[column])
+        self.positions[id] = position
+        for index in self.indexes.values():
+            index.add(row[index.column], position)
+        self.next_id = max(self.next_id, id + 1)
+        return id
+
+    def truncate(self, length: int, next_id: int) -> None:
+        """Remove the rows appended after the table had `length` rows."""
+        for position in range(length, len(self)):
+            del self.positions[self.columns[Keywords.ID.value][position]]
+            for index in self.indexes.values():
+                index.remove(self.columns[index.column][position], position)
+        for values in self.columns.values():
+            del values[length:]
+        self.next_id = next_id
+
+    def set(self, column: str, position: int, value: Any) -> None:
+        values = self.columns[column]
+        old = values[position]
+        values[position] = value
+        if column == Keywords.ID.value:
+            del self.positions[old]
+            self.positions[value] = position
+        for index in self.indexes.values():
+            if index.column == column:
+                index.remove(old, position)
+                index.add(value, position)
+
+    def add_index(self, name: str, column: str) -> None:
+        index = _HashIndex(column)
+        for position, value in enumerate(self.columns[column]):
+            index.add(value, position)
+        self.indexes[name] = index
+
+
+class _Database:
+    def __init__(self) -> None:
+        self.tables: Dict[str, _Table] = {}
+        self.lock = threading.Lock()
+
+
+class MemoryConnection:
+    """A session on an in-memory database.
+
+    There is a single writer at a time: the first write takes the database's
+    lock, which is held until commit or rollback, and rollback replays the
+    undo log of the transaction. Reads outside a transaction take the lock
+    only for as long as the read, so they never see uncommitted rows.
+    """
+
+    def __init__(self, database: _Database, lock_timeout: float) -> None:
+        self.database = database
+        self.lock_timeout = lock_timeout
+        self.in_transaction = False
+        self._undo: List[Callable[[], None]] = []
+        self._savepoints: Dict[str, int] = {}  # Length of the undo log at each.
+
+    def _acquire(self) -> None:
+        if not self.database.lock.acquire(timeout=self.lock_timeout):
+            raise LockTimeout(f'Database locked for more than {self.lock_timeout}s.')
+
+    def begin(self) -> None:
+        if not self.in_transaction:
+            self._acquire()
+            self.in_transaction = True
+
+    def log(self, undo: Callable[[], None]) -> None:
+        self._undo.append(undo)
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        if self.in_transaction:
+            yield
+            return
+        self._acquire()
+        try:
+            yield
+        finally:
+            self.database.lock.release()
+
+    def savepoint(self, name: str) -> None:
+        self._savepoints[name] = len(self._undo)
+
+    def rollback_to_savepoint(self, name: str) -> None:
+        mark = self._savepoints.pop(name)
+        for undo in reversed(self._undo[mark:]):
+            undo()
+        del self._undo[mark:]
+
+    def release_savepoint(self, name: str) -> None:
+        self._savepoints.pop(name)
+
+    def commit(self) -> None:
+        self._savepoints.clear()
+        if self.in_transaction:
+            self._undo.clear()
+            self.in_transaction = False
+            self.database.lock.release()
+
+    def rollback(self) -> None:
+        self._savepoints.clear()
+        if self.in_transaction:
+            for undo in reversed(self._undo):
+                undo()
+            self._undo.clear()
+            self.in_transaction = False
+            self.database.lock.release()
+
+    def close(self) -> None:
+        self.rollback()
+
+
+class _Result:
+    """The rows of a select, read like a DB-API cursor."""
+
+    __slots__ = ('_rows', '_offset')
+
+    def __init__(self, rows: List[Tuple[Any, ...]]) -> None:
+        self._rows = rows
+        self._offset = 0
+
+    def fetchall(self) -> List[Tuple[Any, ...]]:
+        rows = self._rows[self._offset :]
+        self._offset = len(self._rows)
+        return rows
+
+    def fetchmany(self, size: int) -> List[Tuple[Any, ...]]:
+        rows = self._rows[self._offset : self._offset + size]
+        self._offset += len(rows)
+        return rows
+
+
+_databases: Dict[str, _Database] = {}
+_databases_lock = threading.Lock()
+
+
+class MemoryEngine(IEngine):
+    """Keeps every table in process memory, evaluating statements directly.
+
+    Meant for tests and read-mostly replicas: lookups by ID or by an indexed
+    column are dictionary lookups, everything else a scan of packed columns.
+    Engines of the same database name share its tables for the lifetime of
+    the process. `snapshot` writes them to `{directory}/{database}.snapshot`,
+    which is loaded when the database is first used.
+    """
+
+    name = Engines.Memory.value
+
+    LOCK_TIMEOUT = 10.0
+
+    def __init__(self, db_settings: Dict[str, Any]) -> None:
+        super().__init__(db_settings)
+        self.directory = db_settings.get(KEY_DIRECTORY) or '.'
+        self._compiler = SQLCompiler()
+
+    def _path(self, database_name: str) -> str:
+        return os.path.join(self.directory, f'{database_name}.snapshot')
+
+    def _database(self, database_name: str) -> _Database:
+        with _databases_lock:
+            database = _databases.get(database_name)
+            if database is None:
+                database = _Database()
+                path = self._path(database_name)
+                if os.path.exists(path):
+                    with open(path, 'rb') as snapshot:
+                        database.tables = pickle.load(snapshot)  # noqa: S301 - Written by `snapshot`.
+                _databases[database_name] = database
+        return database
+
+    def connect(self) -> MemoryConnection:
+        return MemoryConnection(
+            self._database(self.db_settings[KEY_DATABASE]), self.LOCK_TIMEOUT,
+        )
+
+    def is_connected(self, connection: Any) -> bool:
+        return True
+
+    def create_database(self, database_name: str) -> None:
+        self._database(database_name)
+
+    def remove_database(self, database_name: str) -> None:
+        with _databases_lock:
+            _databases.pop(database_name, None)
+        path = self._path(database_name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def snapshot(self) -> str:
+        """Write a consistent copy of the database to disk, returning its path."""
+        path = self._path(self.db_settings[KEY_DATABASE])
+        with self.pool.connection() as connection:
+            with connection.locked():
+                data = pickle.dumps(connection.database.tables, pickle.HIGHEST_PROTOCOL)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(f'{path}.tmp', 'wb') as snapshot:
+            snapshot.write(data)
+        os.replace(f'{path}.tmp', path)
+        return path
+
+    def create_table(self, connection: Any, metadata: TableMetadata) -> None:
+        with connection.locked():
+            tables = connection.database.tables
+            if metadata.table_name not in tables:
+                tables[metadata.table_name] = _Table(metadata)
+        self.create_indexes(connection, metadata)
+
+    def create_indexes(self, connection: Any, metadata: TableMetadata) -> None:
+        with connection.locked():
+            table = connection.database.tables[metadata.table_name]
+            for index_name, columns in metadata.indexes.items():
+                if index_name not in table.indexes:
+                    table.add_index(index_name, columns[0])
+
+    def drop_indexes(self, connection: Any, metadata: TableMetadata) -> None:
+        with connection.locked():
+            table = connection.database.tables[metadata.table_name]
+            for index_name in metadata.indexes:
+                table.indexes.pop(index_name, None)
+
+    def existing_indexes(self, connection: Any, table_name: str) -> Set[str]:
+        with connection.locked():
+            return set(connection.database.tables[table_name].indexes)
+
+    def has_table(self, connection: Any, table_name: str) -> bool:
+        with connection.locked():
+            return table_name in connection.database.tables
+
+    @staticmethod
+    def _predicate(table: _Table, where: Condition) -> Callable[[int], bool]:
+        values = table.columns[where.field_name]
+        if where.operator.takes_many:
+            expected = {table.convert_filter(where.field_name, value) for value in where.value}
+            if where.operator == Operators.In:
+                return lambda position: values[position] in expected
+            return lambda position: values[position] not in expected
+
+        value = table.convert_filter(where.field_name, where.value)
+        if value is _UNMATCHED:
+            matches = where.operator == Operators.NotEquals
+            return lambda position: matches
+        compare = COMPARISONS[where.operator]
+        return lambda position: compare(values[position], value)
+
+    @staticmethod
+    def _candidates(table: _Table, conditions: Tuple[Condition, ...]) -> Iterable[int]:
+        """Positions which may match, from a hash index where possible."""
+        for where in conditions:
+            if where.operator not in {Operators.Equals, Operators.In}:
+                continue
+            values = where.value if where.operator.takes_many else (where.value,)
+            values = [table.convert_filter(where.field_name, value) for value in values]
+            if where.field_name == Keywords.ID.value:
+                return sorted(
+                    table.positions[value] for value in set(values) if value in table.positions
+                )
+            index = table.index_on(where.field_name)
+            if index is not None:
+                return sorted(
+                    position for value in set(values) for position in index.get(value)
+                )
+        return range(len(table))
+
+    def _matching(self, table: _Table, conditions: Tuple[Condition, ...]) -> List[int]:
+        candidates = self._candidates(table, conditions)
+        predicates = [self._predicate(table, where) for where in conditions]
+        if not predicates:
+            return list(candidates)
+        return [
+            position
+            for position in candidates
+            if all(predicate(position) for predicate in predicates)
+        ]
+
+    def select(self, connection: Any, statement: Union[Select, Count]) -> _Result:
+        if isinstance(statement, Count):
+            return self._count(connection, statement)
+        if statement.for_update:
+            connection.begin()
+        with connection.locked():
+            table = connection.database.tables[statement.table_name]
+            positions = self._matching(table, statement.conditions)
+            if statement.after:
+                positions = self._seek(table, statement, positions)
+            for order in reversed(statement.order_by):  # Stable, so last key first.
+                positions.sort(
+                    key=table.columns[order.field_name].__getitem__,
+                    reverse=order.descending,
+                )
+            columns = [table.columns[field_name] for field_name in statement.fields]
+            rows = list(
+                zip(*[[values[position] for position in positions] for values in columns])
+            )
+        if statement.distinct:
+            rows = list(dict.fromkeys(rows))
+        if statement.limit is not None or statement.offset:
+            end = None if statement.limit is None else statement.offset + statement.limit
+            rows = rows[statement.offset:end]
+        return _Result(rows)
+
+    @staticmethod
+    def _seek(table: _Table, statement: Select, positions: List[int]) -> List[int]:
+        order_by = statement.order_by[:len(statement.after)]
+        columns = [table.columns[order.field_name] for order in order_by]
+        after = tuple(
+            table.convert(order.field_name, value)
+            for order, value in zip(order_by, statement.after)
+        )
+        compare = lt if order_by[0].descending else gt
+        return [
+            position for position in positions
+            if compare(tuple(values[position] for values in columns), after)
+        ]
+
+    def _count(self, connection: Any, statement: Count) -> _Result:
+        with connection.locked():
+            table = connection.database.tables[statement.table_name]
+            positions = self._matching(table, statement.conditions)
+            if not statement.group_by:
+                return _Result([(len(positions),)])
+            columns = [table.columns[field_name] for field_name in statement.group_by]
+            counts = Counter(
+                tuple(values[position] for values in columns) for position in positions
+            )
+        return _Result([(*group, count) for group, count in counts.items()])
+
+    def lock(self, connection: Any, statement: Select) -> None:
+        """Take the database's write lock, which covers every row."""
+        connection.begin()
+
+    def savepoint(self, connection: Any, name: str) -> None:
+        connection.savepoint(name)
+
+    def rollback_to_savepoint(self, connection: Any, name: str) -> None:
+        connection.rollback_to_savepoint(name)
+
+    def release_savepoint(self, connection: Any, name: str) -> None:
+        connection.release_savepoint(name)
+
+    def insert(self, connection: Any, statement: Insert) -> int:
+        connection.begin()
+        table = connection.database.tables[statement.table_name]
+        rows = [
+            {
+                column: None if value is None else table.convert(column, value)
+                for column, value in zip(statement.columns, row)
+            }
+            for row in statement.rows
+        ]
+        connection.log(partial(table.truncate, len(table), table.next_id))
+        ids = [table.append(row) for row in rows]
+        return ids[0] if ids else 0
+
+    def _set(self, connection: Any, table: _Table, column: str, position: int, value: Any) -> bool:
+        old = table.columns[column][position]
+        if old == value:
+            return False
+        table.set(column, position, value)
+        connection.log(partial(table.set, column, position, old))
+        return True
+
+    def update(self, connection: Any, statement: Update) -> int:
+        """Returns the number of rows changed, as MySQL does."""
+        connection.begin()
+        table = connection.database.tables[statement.table_name]
+        assignments = [
+            (column, table.convert(column, value)) for column, value in statement.assignments
+        ]
+        changed = 0
+        for position in self._matching(table, statement.conditions):
+            row_changed = False
+            for column, value in assignments:
+                row_changed |= self._set(connection, table, column, position, value)
+            changed += row_changed
+        return changed
+
+    def deactivate_orphans(self, connection: Any, statement: DeactivateOrphans) -> None:
+        connection.begin()
+        tables = connection.database.tables
+        parent, child = tables[statement.parent_table], tables[statement.child_table]
+        parent_active = parent.columns[Keywords.Active.value]
+        child_active = child.columns[Keywords.Active.value]
+        child_parents = child.columns[statement.foreign_key]
+
+        index = child.index_on(statement.foreign_key)
+        if index is None:
+            active_parents = {
+                child_parents[position]
+                for position in range(len(child))
+                if child_active[position]
+            }
+
+        for parent_id in statement.parent_ids:
+            position = parent.positions.get(parent_id)
+            if position is None or not parent_active[position]:
+                continue
+            if index is None:
+                orphaned = parent_id not in active_parents
+            else:
+                orphaned = not any(child_active[child_position] for child_position in index.get(parent_id))
+            if orphaned:
+                self._set(connection, parent, Keywords.Active.value, position, 0)
+
+    def compile(self, statement: Statement) -> Tuple[str, List[Any]]:
+        return self._compiler.compile(statement)
@@ -0,0 +1,92 @@
+import json
+from typing import Any, Dict, Iterable, Tuple, Type
+
+from app.enums import Keywords
+from app.schemas import ISchema
+
+COLUMN_DEFINITIONS = 'definitions'
+COLUMN_FORMAT = 'format'
+COLUMN_TYPE = 'type'
+
+KEY_REF = '$ref'
+
+JSON_TYPES = ('string', 'integer', 'boolean', 'number')
+
+
+def _ref_lookup(property: Dict[str, Any], fields: Dict[str, Any]) -> Dict[str, Any]:
+    ref = property[KEY_REF]
+    property_lookup_name = ref[ref.rfind('/') + 1 :]
+    return fields[COLUMN_DEFINITIONS][property_lookup_name]
+
+
+class TableMetadata:
+    """Column metadata of a model's table, independent of any storage engine.
+
+    Built once per model from the schema, for example::
+        {
+            "title":"SportSchema",
+            "type":"object",
+            "properties":{
+                "ID":{
+                "title":"Id",
+                "type":"integer"
+                },
+                "Name":{
+                "title":"Name",
+                "type":"string"
+                },
+                "Slug":{
+                "title":"Slug",
+                "type":"string"
+                },
+                "Active":{
+                "title":"Active",
+                "type":"boolean"
+                }
+            },
+            "required":[
+                "Name",
+                "Slug",
+                "Active"
+            ]
+        }
+
+    Would result in the column types::
+        {"Name": "string", "Slug": "string", "Active": "boolean"}
+
+    And `SportSchema.indexes` of `(('Slug',),)` in the index::
+        {"ix_sports_Slug": ("Slug",)}
+
+    Engines map the JSON types to their own column types.
+    """
+
+    def __init__(self, table_name: str, schema: Type[ISchema]) -> None:
+        fields = json.loads(schema.schema_json())
+
+        self.table_name = table_name
+        self.column_types: Dict[str, str] = {}
+        self.column_formats: Dict[str, str] = {}  # e.g. date-time strings.
+        for property_name, property in fields[Keywords.Properties.value].items():
+            if property_name == Keywords.ID.value:
+                continue  # Primary key field. It is handled with auto increment.
+            if KEY_REF in property:
+                property = _ref_lookup(property, fields)
+            if property[COLUMN_TYPE] not in JSON_TYPES:
+                raise ValueError(f'Unsupported type of {table_name}.{property_name}: {property[COLUMN_TYPE]}')
+            self.column_types[property_name] = property[COLUMN_TYPE]
+            if COLUMN_FORMAT in property:
+                self.column_formats[property_name] = property[COLUMN_FORMAT]
+
+        self.columns: Tuple[str, ...] = (Keywords.ID.value, *self.column_types)
+        self.data_columns: Tuple[str, ...] = tuple(self.column_types)
+        self.column_fields: Dict[str, str] = {column: column for column in self.columns}
+
+        self.indexes: Dict[str, Tuple[str, ...]] = {}
+        for index_columns in schema.indexes:
+            unknown = set(index_columns) - set(self.columns)
+            if unknown:
+                raise ValueError(f'Unknown index columns for {table_name}: {unknown}')
+            self.indexes[f"ix_{table_name}_{'_'.join(index_columns)}"] = index_columns
+
+    def row_values(self, row: Dict[str, Any], columns: Iterable[str]) -> Tuple[Any, ...]:
+        return tuple(row[self.column_fields[column]] for column in columns)
@@ -0,0 +1,26 @@
+from datetime import datetime
+from functools import lru_cache
+
+from app.metadata import TableMetadata
+from app.schemas import Schema
+
+# The version of the tables the models expect. A database recorded at an
+# older version has its missing tables and indexes created and this version
+# recorded. Existing tables are never altered, so bump it when tables or
+# indexes are added; changing the columns of a table needs a migration of
+# its own.
+SCHEMA_VERSION = 1
+
+MIGRATIONS_TABLE = 'schema_migrations'
+
+
+class MigrationSchema(Schema):
+    """A row of `schema_migrations`, one per schema version applied."""
+
+    Version: int
+    AppliedAt: datetime
+
+
+@lru_cache(maxsize=None)
+def migrations_metadata() -> TableMetadata:
+    return TableMetadata(MIGRATIONS_TABLE, MigrationSchema)
@@ -1,147 +1,475 @@
-import json
-from enum import Enum
+from collections import defaultdict
+from contextlib import closing, contextmanager
+from itertools import islice
 from os import environ
-from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, cast
-
-from mysql.connector import connect
-
-from app.enums import Entities, Operators
-from app.schemas import EventSchema, ISchema, SelectionSchema, SportSchema
+from typing import (
+    Any,
+    ContextManager,
+    Dict,
+    Generator,
+    Iterable,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    Union,
+    cast,
+    overload,
+)
+
+from app import transactions
+from app.cache import CacheStats, QueryCache
+from app.engines import IEngine, close_engines, get_engine
+from app.enums import Engines, Entities, Keywords, Operators, RowShapes
+from app.instrumentation import instrumentation, instrumented
+from app.metadata import TableMetadata
+from app.pagination import Page, decode_token, encode_token
+from app.pool import ConnectionPool, PoolStats
+from app.schemas import (
+    EventSchema,
+    EventTreeSchema,
+    ISchema,
+    SelectionSchema,
+    SportSchema,
+    SportTreeSchema,
+)
+from app.shapes import Results, shape_rows
+from app.statements import (
+    Condition,
+    Count,
+    DeactivateOrphans,
+    Insert,
+    OrderBy,
+    Select,
+    Update,
+    condition,
+)
 
 DB_SETTINGS = {
+    'engine': environ.get('DB_ENGINE', Engines.MySQL.value),
+    'directory': environ.get('DB_DIRECTORY', 'data'),  # SQLite and snapshot files.
     'host': environ.get('DB_HOST', 'localhost'),
     'port': environ.get('DB_PORT', '3306'),
     'user': 'root',
     'password': 'root',
-    'database': 'eightapp',
+    'database': environ.get('DB_NAME', 'eightapp'),
 }
 ## TODO: CREATE DATABASE FROM DOCKERFILE OR MAKE FILE. :)
 
 
 def create_database(db_settings: Dict[str, Any], database_name: str) -> None:
-    with connect(**db_settings) as connection:
-        cursor = connection.cursor()
-        cursor.execute(f'CREATE DATABASE IF NOT EXISTS {database_name}')
+    get_engine(db_settings).create_database(database_name)
 
 
 def remove_database(db_settings: Dict[str, Any], database_name: str) -> None:
-    with connect(**db_settings) as connection:
-        cursor = connection.cursor()
-        cursor.execute(f'DROP DATABASE IF EXISTS {database_name}')
+    close_engines(database_name)
+    get_engine(db_settings).remove_database(database_name)
 
 
-class Keywords(str, Enum):
-    ID = 'ID'
+class SchemaNotFound(Exception):
+    """Raised when the requested Schema is not found."""
 
-    Properties = 'properties'
+IN_CHUNK_SIZE = 1000
 
-    And = 'AND'
-    From = 'FROM'
-    InsertInto = 'INSERT INTO'
-    Set = 'SET'
-    Select = 'SELECT'
-    Update = 'UPDATE'
-    Values = 'VALUES'
-    Where = 'WHERE'
 
-class EmptyQuery(Exception):
-    """Raised when `.execute()` is called without prior select/filter."""
+def _chunks(ids: List[int], chunk_size: int = IN_CHUNK_SIZE) -> Iterable[List[int]]:
+    for start in range(0, len(ids), chunk_size):
+        yield ids[start : start + chunk_size]
+
+
+def _id_in(ids: List[int]) -> Condition:
+    return condition(Keywords.ID.value, Operators.In, ids)
+
+
+def _select_ids(
+    engine: IEngine,
+    connection: Any,
+    statement: Select,
+    ids: List[int],
+) -> List[int]:
+    """Run `statement` with `ID IN (...)` prepended to its conditions for
+    every chunk of `ids`, returning the sorted first column.
+    """
+    found: Set[int] = set()
+    for chunk in _chunks(ids):
+        cursor = engine.select(
+            connection,
+            statement._replace(conditions=(_id_in(chunk), *statement.conditions)),
+        )
+        found.update(row[0] for row in cursor.fetchall())
+    return sorted(found)
+
+
+class Cascade:
+    """Set based deactivation of parents whose children are all inactive.
+
+    When all the selections of an event are inactive the event becomes
+    inactive, and when all the events of a sport are inactive the sport
+    becomes inactive. Instead of reading every sibling back, each level is a
+    single statement run on the caller's connection and transaction::
+        UPDATE events SET Active = 0 WHERE ID IN (%s) AND Active = 1 AND NOT EXISTS (SELECT 1 FROM selections WHERE selections.Event = events.ID AND selections.Active = 1)
+
+    `lock` takes row locks on every affected ancestor, top down and in ID
+    order, and must be called before the children are written so that
+    concurrent cascades queue up on the ancestors instead of deadlocking.
+    `apply` runs the deactivations bottom up once the children are written.
+    """
+
+    def __init__(
+        self,
+        model: Type['BaseModel'],
+        engine: IEngine,
+        connection: Any,
+        parent_ids: Iterable[int],
+    ) -> None:
+        self._engine = engine
+        self._connection = connection
+        self._levels: List[Tuple[Type['BaseModel'], List[int]]] = []
+
+        ids = sorted({parent_id for parent_id in parent_ids if parent_id > 0})
+        child = model
+        while child.parent is not None and ids:
+            self._levels.append((child, ids))
+            parent = child.parent
+            if parent.parent is None:
+                break
+            foreign_key = cast(str, parent.foreign_key)
+            ids = _select_ids(
+                engine,
+                connection,
+                Select(
+                    parent.table_name,
+                    (foreign_key,),
+                    (Condition(foreign_key, Operators.GreaterThan, 0),),
+                    distinct=True,
+                ),
+                ids,
+            )
+            child = parent
+
+    @property
+    def table_names(self) -> List[str]:
+        """Tables `apply` may write to."""
+        return [
+            cast(Type['BaseModel'], child.parent).table_name
+            for child, _ in self._levels
+        ]
+
+    def lock(self) -> None:
+        for child, ids in reversed(self._levels):
+            parent = cast(Type['BaseModel'], child.parent)
+            for chunk in _chunks(ids):
+                self._engine.lock(
+                    self._connection,
+                    Select(
+                        parent.table_name,
+                        (Keywords.ID.value,),
+                        (_id_in(chunk),),
+                        order_by=(OrderBy(Keywords.ID.value),),
+                    ),
+                )
+
+    def apply(self) -> None:
+        for child, ids in self._levels:
+            parent = cast(Type['BaseModel'], child.parent)
+            for chunk in _chunks(ids):
+                self._engine.deactivate_orphans(
+                    self._connection,
+                    DeactivateOrphans(
+                        parent.table_name,
+                        child.table_name,
+                        cast(str, child.foreign_key),
+                        tuple(chunk),
+                    ),
+                )
+
+class Query:
+    """An immutable query on a model, built with `select` and `filter`.
+
+    Each call returns a new query and leaves the one it was called on
+    untouched, so a query can be built once, kept, refined in different ways
+    and run concurrently from many threads::
+        active = EventModel().filter('Active', Operators.Equals, True)
+        preplay = active.filter('Type', Operators.Equals, TypeEnum.Preplay.value)
+        events = preplay.select('Name', 'Sport').execute()
+    """
+
+    __slots__ = ('model', 'statement')
+
+    model: 'BaseModel'
+    statement: Select
+
+    def __init__(self, model: 'BaseModel', statement: Select) -> None:
+        object.__setattr__(self, 'model', model)
+        object.__setattr__(self, 'statement', statement)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f'{type(self).__name__} is immutable.')
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({type(self.model).__name__}, {self.statement!r})'
+
+    def _replace(self, **changes: Any) -> 'Query':
+        return Query(self.model, self.statement._replace(**changes))
+
+    def select(self, *field_names: str) -> 'Query':
+        """Only return `field_names`, and ID, keeping the filters."""
+        return self._replace(fields=self.model._clean_selected_fields(field_names))
+
+    def filter(self, field_name: str, operator: Operators, value: Any) -> 'Query':
+        self.model._check_fields((field_name,))
+        return self._replace(
+            conditions=(*self.statement.conditions, condition(field_name, operator, value)),
+        )
+
+    def order_by(self, field_name: str, descending: bool = False) -> 'Query':
+        """Order by `field_name`, after any earlier `order_by`."""
+        self.model._check_fields((field_name,))
+        return self._replace(
+            order_by=(*self.statement.order_by, OrderBy(field_name, descending)),
+        )
+
+    def limit(self, limit: Optional[int]) -> 'Query':
+        if limit is not None and limit < 0:
+            raise ValueError('limit must not be negative.')
+        return self._replace(limit=limit)
+
+    def offset(self, offset: int) -> 'Query':
+        """Skip `offset` rows, which are still read, see `page` for deep pages."""
+        if offset < 0:
+            raise ValueError('offset must not be negative.')
+        return self._replace(offset=offset)
+
+    @overload
+    def execute(self, shape: Literal[RowShapes.Schema] = ...) -> List[ISchema]:
+        ...
+
+    @overload
+    def execute(self, shape: RowShapes) -> Results:
+        ...
+
+    def execute(self, shape: RowShapes = RowShapes.Schema) -> Results:
+        """Run the query, answering from `result_cache` when enabled.
+
+        By default each result is a schema object. Read only consumers can
+        skip building those with another `shape`, e.g. `RowShapes.Tuple` or
+        `RowShapes.Columns` for a dict of `array('d')` and the like.
+        """
+        return self.model._execute(self.statement, shape)
+
+    def exists(self) -> bool:
+        """Whether any row matches, reading at most one."""
+        return self.model._exists(self.statement)
+
+    def count(self) -> int:
+        """The number of matching rows, ignoring any `limit` and `offset`."""
+        return self.model._count(self.statement)[0][0]
+
+    def count_by(self, *field_names: str) -> Dict[Any, int]:
+        """The number of matching rows per distinct value of `field_names`.
+
+        Keyed by the value, or by a tuple of the values of several fields::
+            EventModel().filter('Active', Operators.Equals, 1).count_by('Sport')
+            {1: 12, 2: 40}
+        """
+        if not field_names:
+            raise ValueError('count_by needs at least one field.')
+        self.model._check_fields(field_names)
+        counts = self.model._count(self.statement, field_names)
+        if len(field_names) == 1:
+            return {row[0]: row[1] for row in counts}
+        return {row[:-1]: row[-1] for row in counts}
+
+    def page(self, size: int, token: Optional[str] = None) -> Page:
+        """A page of `size` results, continuing after the page of `token`.
+
+        Keyset pagination: instead of skipping the rows of earlier pages like
+        `offset`, the query seeks past the last row of the previous page, so
+        with an index on the `order_by` columns every page costs the same.
+        Results are ordered by `order_by`, ID by default, with ID added as the
+        last key so rows are never skipped or repeated::
+            query = EventModel().filter('Active', Operators.Equals, 1).order_by('ScheduledStart')
+            page = query.page(100)
+            while page.next_token is not None:
+                page = query.page(100, page.next_token)
+
+        A token only continues a query with the same order. Any `limit` and
+        `offset` of the query are ignored.
+        """
+        return self.model._page(self.statement, size, token)
+
+    def iter(self, batch_size: int = 5000) -> Iterator[ISchema]:
+        """Stream the results, fetching and mapping `batch_size` rows at a time.
+
+        Rows are read from an unbuffered cursor so memory stays flat however
+        large the result is. The connection is only checked out while the
+        iterator is being consumed, if it is abandoned early the connection is
+        closed rather than returned to the pool with unread rows.
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1.')
+        return self.model._stream_schemas(self.statement, batch_size)
+
+    @property
+    def fields(self) -> Tuple[str, ...]:
+        """The fields of each result, in order."""
+        return self.statement.fields
+
+    def iter_rows(self, batch_size: int = 5000) -> Iterator[Tuple[Any, ...]]:
+        """Stream the results as the tuples read from the cursor.
+
+        Like `iter` but without building a schema per row, the values are in
+        the order of `fields` and as the engine returns them.
+        """
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1.')
+        return self.model._stream_rows(self.statement, batch_size)
+
+    def with_children(self, depth: Optional[int] = None) -> List[ISchema]:
+        """Run the query and eager load the children of the results.
+
+        Each level of the hierarchy is loaded with batched
+        `WHERE <foreign key> IN (...)` queries, so the number of queries does
+        not grow with the number of parents. `depth` limits how many levels
+        are loaded, e.g. `depth=1` loads the events of sports but not their
+        selections, which are left as None rather than an empty list.
+
+        For example::
+            sports = SportModel().filter('Active', Operators.Equals, 1).with_children()
+            sports[0].Events[0].Selections
+        """
+        return self.model._with_children(self.statement, depth)
+
+    def get_query(self) -> str:
+        return self.model.engine().describe(self.statement)
+
+    def get_params(self) -> List[Any]:
+        return self.statement.params()
 
-class SchemaNotFound(Exception):
-    """Raised when the requested Schema is not found."""
 
 class BaseModel:
     db_settings: Dict[str, Any] = DB_SETTINGS
     table_name: str
     schema: Type[ISchema]
 
-    _table_created: Dict[str, bool] = {}
+    # The parent model deactivated by `Cascade` and the column referencing it.
+    parent: Optional[Type['BaseModel']] = None
+    foreign_key: Optional[str] = None
 
-    BLANK_QUERY: str = ''
+    # The schema `with_children` returns, and its field holding the children.
+    tree_schema: Optional[Type[ISchema]] = None
+    children_field: Optional[str] = None
 
-    def _create_table_if_not_exists(self) -> None:
-        """Automatically create the provided schema table if it does not exist.
+    # Optional result cache in front of `execute`, shared by every model.
+    result_cache: Optional[QueryCache] = None
 
-        For example::
-            {
-                "title":"SportSchema",
-                "type":"object",
-                "properties":{
-                    "Name":{
-                    "title":"Name",
-                    "type":"string"
-                    },
-                    "Slug":{
-                    "title":"Slug",
-                    "type":"string"
-                    },
-                    "Active":{
-                    "title":"Active",
-                    "type":"boolean"
-                    }
-                },
-                "required":[
-                    "Name",
-                    "Slug",
-                    "Active"
-                ]
-            }
-
-        Would result in the following create table query::
-            CREATE TABLE IF NOT EXISTS sports (ID INTEGER PRIMARY KEY AUTO_INCREMENT, Name VARCHAR(255), Slug VARCHAR(255), Active BOOLEAN)
+    _metadata: Dict[str, TableMetadata] = {}
+
+    @classmethod
+    def engine(cls) -> IEngine:
+        """The storage engine of `db_settings`, shared by every model.
+
+        While `instrumentation` is enabled, a proxy reporting every statement.
         """
-        COLUMN_DEFINITIONS = 'definitions'
-        COLUMN_TYPE = 'type'
-
-        KEY_REF = '$ref'
-
-        TYPE_LOOKUP = {
-            'string': 'VARCHAR(255)',
-            'integer': 'INTEGER',
-            'boolean': 'BOOLEAN',
-            'number': 'INTEGER',
-        }
-
-        def ref_lookup(
-            property: Dict[str, Any], fields: Dict[str, Any]
-        ) -> Dict[str, Any]:
-            ref = property[KEY_REF]
-            property_lookup_name = ref[ref.rfind('/') + 1 :]
-            return fields[COLUMN_DEFINITIONS][property_lookup_name]
-
-        field_queries = []
-        fields = json.loads(self.schema.schema_json())
-
-        del fields[Keywords.Properties.value][
-            Keywords.ID.value
-        ]  # Remove primary key field. It is handled with auto increment below.
-
-        for property_name, property in fields[Keywords.Properties.value].items():
-            if KEY_REF in property:
-                property = ref_lookup(property, fields)
-            field_queries.append(
-                f'{property_name} {TYPE_LOOKUP[property[COLUMN_TYPE]]}'
-            )
-        table_columns = ', '.join(field_queries)
+        engine = get_engine(BaseModel.db_settings)
+        if instrumentation.enabled:
+            return cast(IEngine, instrumentation.wrap(engine))
+        return engine
 
-        with connect(**BaseModel.db_settings) as connection:
-            cursor = connection.cursor()
-            cursor.execute(
-                f'CREATE TABLE IF NOT EXISTS {self.table_name} (ID INTEGER PRIMARY KEY AUTO_INCREMENT, {table_columns})'
-            )
-            self._table_created[self.table_name] = True
+    @classmethod
+    def pool(cls) -> ConnectionPool:
+        """The connection pool shared by every model."""
+        return cls.engine().pool
+
+    @classmethod
+    def pool_stats(cls) -> PoolStats:
+        return cls.pool().stats()
+
+    @classmethod
+    def enable_result_cache(cls, max_size: int = 1024, ttl: float = 60.0) -> QueryCache:
+        BaseModel.result_cache = QueryCache(max_size=max_size, ttl=ttl)
+        return BaseModel.result_cache
+
+    @classmethod
+    def disable_result_cache(cls) -> None:
+        BaseModel.result_cache = None
 
-    def __init__(self) -> None:
-        if not self._table_created.get(self.table_name):
-            self._create_table_if_not_exists()
-        self._query: str = BaseModel.BLANK_QUERY
-        self._last_method_called: Optional[function] = None
+    @classmethod
+    def cache_stats(cls) -> Optional[CacheStats]:
+        if BaseModel.result_cache is None:
+            return None
+        return BaseModel.result_cache.stats()
+
+    @classmethod
+    def _invalidate(cls, *table_names: str) -> None:
+        """Drop cached results of `table_names` once a write is committed."""
+        if BaseModel.result_cache is not None:
+            BaseModel.result_cache.invalidate(*table_names)
+
+    @contextmanager
+    def _connection(self, engine: IEngine) -> Iterator[Any]:
+        """The connection of the open `transaction`, or one from the pool."""
+        transaction = transactions.current()
+        if transaction is not None:
+            yield transaction.connection
+            return
+        with engine.pool.connection() as connection:
+            yield connection
+
+    def _commit(self, connection: Any, *table_names: str) -> None:
+        """Commit the writes to `table_names`, or leave them to the open
+        `transaction`, which drops their cached results when it commits.
+        """
+        transaction = transactions.current()
+        if transaction is not None:
+            transaction.written.update(table_names)
+            return
+        connection.commit()
+        self._invalidate(*table_names)
+
+    @classmethod
+    def metadata(cls) -> TableMetadata:
+        """Column metadata, built once per model."""
+        metadata = cls._metadata.get(cls.table_name)
+        if metadata is None:
+            metadata = TableMetadata(cls.table_name, cls.schema)
+            cls._metadata[cls.table_name] = metadata
+        return metadata
+
+    def __init__(self, ensure_schema: bool = True) -> None:
+        # Models hold no other state, queries are built as `Query` values so
+        # an instance can be shared between threads. `ensure_schema=False`
+        # leaves the check to the caller, e.g. one which mustn't block.
+        if ensure_schema:
+            self.ensure_schema()
+
+    @classmethod
+    def ensure_schema(cls) -> None:
+        """Create every table and its secondary indexes unless the database
+        is at `SCHEMA_VERSION`, checked once per engine.
+        """
+        cls.engine().ensure_schema(_model_tables)
+
+    def _check_fields(self, field_names: Iterable[str]) -> None:
+        """Raise `ValueError` unless every field is a column of the table.
+
+        Field names are written into the SQL, so anything else is refused
+        before a statement is built.
+        """
+        columns = self.metadata().columns
+        unknown = [field for field in field_names if field not in columns]
+        if unknown:
+            raise ValueError(f'Unknown fields of {self.table_name}: {", ".join(unknown)}.')
 
     def _clean_selected_fields(self, field_names: Tuple[str, ...]) -> Tuple[str, ...]:
         """Remove duplicates, e.g. 'ID' field requested twice.
 
         Maintains order. Using a set doesn't maintain order.
         """
+        self._check_fields(field_names)
         list_field_names = [Keywords.ID.value]
         for field in field_names:
             if field in list_field_names:
@@ -149,190 +477,516 @@ class BaseModel:
             list_field_names.append(field)
         return tuple(list_field_names)
 
-    def _append_to_query(self, statement: str) -> None:
-        if self._query == BaseModel.BLANK_QUERY:
-            fields = json.loads(self.schema.schema_json())
-            field_names = ', '.join(fields[Keywords.Properties.value].keys())
-
-            self._query = f'{Keywords.Select.value} {field_names} {Keywords.From.value} {self.table_name}'
-        self._query += f' {statement}'
-
     def _map_results_to_schema(
         self, field_names: Iterable[str], results: List[Tuple[Any, ...]]
     ) -> List[ISchema]:
+        column_fields = self.metadata().column_fields
+        field_names = [column_fields[field_name] for field_name in field_names]
         schema_objects: List[ISchema] = []
 
         for result in results:
             row_data_mapped_to_fields = dict(zip(field_names, result))
-            schema_objects.append(self.schema.construct(**row_data_mapped_to_fields))
+            schema = self.schema.construct(**row_data_mapped_to_fields)
+            schema.track_changes()
+            schema_objects.append(schema)
         return schema_objects
 
-    def _fields_from_schema(self, schema: ISchema) -> List[str]:
-        return cast(List[str], schema.dict().keys())  # KeysView[str]
+    def _shape_results(
+        self, field_names: Tuple[str, ...], results: List[Tuple[Any, ...]], shape: RowShapes,
+    ) -> Results:
+        if shape is RowShapes.Schema:
+            return self._map_results_to_schema(field_names, results)
+        return shape_rows(shape, self.metadata(), field_names, results)
 
-    def _values_from_schema(self, schema: ISchema) -> List[Any]:
-        return cast(List[Any], schema.dict().values())  # KeysView[Any]
+    @overload
+    def select_fields(
+        self, *field_names: str, shape: Literal[RowShapes.Schema] = ...,
+    ) -> List[ISchema]:
+        ...
 
-    def select_fields(self, *field_names) -> List[ISchema]:
-        field_names = self._clean_selected_fields(field_names)
+    @overload
+    def select_fields(self, *field_names: str, shape: RowShapes) -> Results:
+        ...
 
-        fields_formatted = ', '.join(field_names)
-        query = f'{Keywords.Select.value} {fields_formatted} {Keywords.From.value} {self.table_name}'
+    @instrumented
+    def select_fields(self, *field_names, shape: RowShapes = RowShapes.Schema) -> Results:
+        """Every row with only `field_names`, and ID, in `shape`."""
+        field_names = self._clean_selected_fields(field_names)
+        engine = self.engine()
 
-        with connect(**BaseModel.db_settings) as connection:
-            cursor = connection.cursor()
-            cursor.execute(query)
+        with self._connection(engine) as connection:
+            cursor = engine.select(connection, Select(self.table_name, field_names))
             results = cursor.fetchall()
 
-            return self._map_results_to_schema(field_names, results)
+            return self._shape_results(field_names, results, shape)
 
+    @instrumented
     def insert(self, schema: ISchema) -> ISchema:
-        fields = self._fields_from_schema(schema)
-        field_names = ', '.join(self._fields_from_schema(schema))
-        fields_placeholder = ('%s, ' * len(fields))[:-2]  # Remove trailing , .
-        values = tuple(self._values_from_schema(schema))
-
-        query = f'{Keywords.InsertInto.value} {self.table_name} ({field_names}) {Keywords.Values.value} ({fields_placeholder})'
-        with connect(**BaseModel.db_settings) as connection:
-            cursor = connection.cursor()
-            cursor.execute(query, values)
-            connection.commit()
-
-            schema.set_id(cursor.lastrowid)
-        return schema
-
-    def update(self, schema: ISchema) -> ISchema:
-        REMOVE_ID_FIELD_WITH_INDEX = 1
+        metadata = self.metadata()
+        values = metadata.row_values(schema.dict(), metadata.columns)
+        engine = self.engine()
 
-        field_names = list(self._fields_from_schema(schema))[
-            REMOVE_ID_FIELD_WITH_INDEX:
-        ]
-        values = list(self._values_from_schema(schema))[REMOVE_ID_FIELD_WITH_INDEX:]
-        fields_placeholder = ', '.join(
-            [f'{field_name} = %s' for field_name in field_names]
-        )
-        query = f"{Keywords.Update.value} {self.table_name} {Keywords.Set.value} {fields_placeholder} {Keywords.Where.value} {Keywords.ID.value} = '{schema.get_id()}'"
+        with self._connection(engine) as connection:
+            id = engine.insert(
+                connection, Insert(self.table_name, metadata.columns, (values,)),
+            )
+            self._commit(connection, self.table_name)
 
-        with connect(**BaseModel.db_settings) as connection:
-            cursor = connection.cursor()
-            cursor.execute(query, values)
-            connection.commit()
+            schema.set_id(id)
+            schema.track_changes()
         return schema
 
-    def select(self, *field_names) -> 'BaseModel':
-        field_names = self._clean_selected_fields(field_names)
-        fields_formatted = ', '.join(field_names)
-
-        self._query = f'{Keywords.Select.value} {fields_formatted} {Keywords.From.value} {self.table_name}'
-
-        self._last_method_called = self.select
-        return self
-
-    def filter(self, field_name: str, operator: Operators, value: Any) -> 'BaseModel':
-        expression = (
-            Keywords.And.value
-            if self._last_method_called == self.filter
-            else Keywords.Where.value
-        )
+    @instrumented
+    def insert_many(self, schemas: Iterable[ISchema], chunk_size: int = 1000) -> int:
+        """Insert `schemas` with one multi-row INSERT per `chunk_size` rows.
 
-        query = f"{expression} {field_name} {operator.value} '{value}'"
+        Every chunk is written inside a single transaction which is committed
+        once all of them succeed. `schemas` is consumed lazily, so a generator
+        of any size only holds one chunk in memory at a time.
 
-        self._append_to_query(query)
+        IDs are always assigned by the database. A multi-row INSERT is
+        allocated consecutive auto increment values, so each schema gets its
+        ID from the first one reported for its chunk.
 
-        self._last_method_called = self.filter
-        return self
+        Returns the number of inserted rows.
+        """
+        if chunk_size < 1:
+            raise ValueError('chunk_size must be at least 1.')
+
+        metadata = self.metadata()
+        engine = self.engine()
+        schemas = iter(schemas)
+        inserted = 0
+        with self._connection(engine) as connection:
+            while True:
+                chunk = list(islice(schemas, chunk_size))
+                if not chunk:
+                    break
+                rows = tuple(
+                    metadata.row_values(schema.dict(), metadata.data_columns)
+                    for schema in chunk
+                )
+                first_id = engine.insert(
+                    connection, Insert(self.table_name, metadata.data_columns, rows),
+                )
+
+                for offset, schema in enumerate(chunk):
+                    schema.set_id(first_id + offset)
+                    schema.track_changes()
+                inserted += len(chunk)
+            self._commit(connection, self.table_name)
+        return inserted
+
+    def _has_active_sibling(
+        self, engine: IEngine, connection: Any, parent_id: int, id: int,
+    ) -> bool:
+        """Whether a row other than `id` with the parent `parent_id` is active.
+
+        If so the update can't deactivate the parent and the cascade is
+        skipped. Called once the cascade has locked the ancestors. The read
+        locks too, as a locking read sees the latest committed rows where a
+        plain one could see the transaction's older snapshot, e.g. with
+        InnoDB's REPEATABLE READ, and miss a sibling deactivated since.
+        """
+        return bool(engine.select(
+            connection,
+            Select(
+                self.table_name,
+                (Keywords.ID.value,),
+                (
+                    Condition(cast(str, self.foreign_key), Operators.Equals, parent_id),
+                    Condition(Keywords.Active.value, Operators.Equals, True),
+                    Condition(Keywords.ID.value, Operators.NotEquals, id),
+                ),
+                limit=1,
+                for_update=True,
+            ),
+        ).fetchall())
+
+    def _update_columns(
+        self, id: int, values: Dict[str, Any], parent_id: Optional[int] = None,
+    ) -> int:
+        """Write only the columns of `values` to the row `id`, and cascade if
+        it is deactivated, in one transaction.
+
+        The parent to cascade to is the one in `values`, else `parent_id`,
+        else it is read from the row. Returns the number of rows changed.
+        """
+        engine = self.engine()
+        id_condition = Condition(Keywords.ID.value, Operators.Equals, id)
+        with self._connection(engine) as connection:
+            parent_ids: List[int] = []
+            if (
+                self.foreign_key is not None
+                and Keywords.Active.value in values
+                and not values[Keywords.Active.value]
+            ):
+                parent_id = values.get(self.foreign_key, parent_id)
+                if parent_id is None:
+                    parent_ids = _select_ids(
+                        engine, connection, Select(self.table_name, (self.foreign_key,)), [id],
+                    )
+                else:
+                    parent_ids = [parent_id]
+            cascade = Cascade(type(self), engine, connection, parent_ids)
+            # Ancestors are locked top down, as `deactivate` does, before
+            # the siblings are read.
+            cascade.lock()
+            if parent_ids and self._has_active_sibling(engine, connection, parent_ids[0], id):
+                cascade = Cascade(type(self), engine, connection, [])  # The parent keeps an active child.
+            changed = engine.update(
+                connection, Update(self.table_name, tuple(values.items()), (id_condition,)),
+            )
+            cascade.apply()
+            self._commit(connection, self.table_name, *cascade.table_names)
+        return changed
 
-    def execute(self) -> List[ISchema]:
-        if self._query == BaseModel.BLANK_QUERY:
-            raise EmptyQuery()
+    @instrumented
+    def update(self, schema: ISchema) -> ISchema:
+        """Update `schema` and cascade any deactivation in one transaction.
 
-        field_names = list(
-            map(
-                str.strip,
-                self._query[
-                    self._query.find(Keywords.Select.value)
-                    + len(Keywords.Select.value) : self._query.find(Keywords.From.value)
-                ]
-                .strip()
-                .split(','),
+        Schemas read or written by a model track their changes, and only the
+        columns assigned a new value are written, e.g. `UPDATE selections SET
+        Price = ?` for a price change. The cascade is only checked when
+        `Active` is one of them. Untracked schemas, e.g. built with
+        `SchemaFactory`, write every column.
+        """
+        metadata = self.metadata()
+        changes = schema.changes()
+        columns = metadata.data_columns
+        if changes is not None:
+            columns = tuple(
+                column for column in columns if metadata.column_fields[column] in changes
             )
-        )
 
-        with connect(**BaseModel.db_settings) as connection:
-            cursor = connection.cursor()
-            cursor.execute(self._query)
-            results = cursor.fetchall()
+        if columns:
+            row = schema.dict()
+            parent_id = None
+            if changes is None and self.foreign_key is not None:
+                # A tracked schema may be partial, its parent is read instead.
+                parent_id = row[self.foreign_key]
+            self._update_columns(
+                cast(int, schema.get_id()),
+                dict(zip(columns, metadata.row_values(row, columns))),
+                parent_id,
+            )
+        schema.track_changes()
+        return schema
 
-            self._query = BaseModel.BLANK_QUERY
-            self._last_method_called = None
+    @instrumented
+    def patch(self, id: int, **fields: Any) -> int:
+        """Update `fields` of the row `id` without reading it first.
 
-            return self._map_results_to_schema(field_names, results)
+        Each value is validated on its own, e.g.
+        `SelectionModel().patch(1, Price=2.5)`. Returns the number of rows
+        updated, which MySQL and the memory engine report as 0 when the row
+        already had these values.
 
+        Raises `SchemaNotFound` when there is no row `id`.
+        """
+        metadata = self.metadata()
+        unknown = [field for field in fields if field not in metadata.data_columns]
+        if unknown:
+            raise ValueError(f'Unknown fields of {self.table_name}: {", ".join(unknown)}.')
+        if not fields:
+            raise ValueError('Nothing to patch.')
+
+        changed = self._update_columns(id, self.schema.validate_fields(**fields))
+        if not changed and not self.filter(Keywords.ID.value, Operators.Equals, id).exists():
+            raise SchemaNotFound(f'Not found, ID: {id}.')
+        return changed
+
+    @instrumented
+    def deactivate(self, ids: Iterable[int]) -> int:
+        """Deactivate every row in `ids` and cascade in one transaction.
+
+        Returns the number of deactivated rows.
+        """
+        ids = sorted(set(ids))
+        deactivated = 0
+        engine = self.engine()
+        with self._connection(engine) as connection:
+            parent_ids: List[int] = []
+            if self.foreign_key is not None:
+                parent_ids = _select_ids(
+                    engine,
+                    connection,
+                    Select(self.table_name, (self.foreign_key,), distinct=True),
+                    ids,
+                )
+            cascade = Cascade(type(self), engine, connection, parent_ids)
+            cascade.lock()
+            for chunk in _chunks(ids):
+                deactivated += engine.update(
+                    connection,
+                    Update(
+                        self.table_name,
+                        ((Keywords.Active.value, False),),
+                        (
+                            _id_in(chunk),
+                            Condition(Keywords.Active.value, Operators.Equals, True),
+                        ),
+                    ),
+                )
+            cascade.apply()
+            self._commit(connection, self.table_name, *cascade.table_names)
+        return deactivated
+
+    def query(self) -> 'Query':
+        """Every column of every row, to narrow down with `select`/`filter`."""
+        return Query(self, Select(self.table_name, self.metadata().columns))
+
+    def select(self, *field_names) -> 'Query':
+        return self.query().select(*field_names)
+
+    def filter(self, field_name: str, operator: Operators, value: Any) -> 'Query':
+        return self.query().filter(field_name, operator, value)
+
+    def _fetch(self, statement: Union[Select, Count]) -> List[Tuple[Any, ...]]:
+        """Run `statement`, answering from `result_cache` when enabled.
+
+        The cache is bypassed inside a `transaction`, which may read its own
+        uncommitted writes.
+        """
+        cache = BaseModel.result_cache
+        if transactions.current() is not None:
+            cache = None
+        if cache is not None:
+            key = cache.key(self.table_name, statement)
+            results = cache.get(key)
+            if results is not None:
+                return results
+
+        engine = self.engine()
+        with self._connection(engine) as connection:
+            results = engine.select(connection, statement).fetchall()
+
+        if cache is not None:
+            cache.set(key, results)
+        return results
+
+    @overload
+    def _execute(
+        self, statement: Select, shape: Literal[RowShapes.Schema] = ...,
+    ) -> List[ISchema]:
+        ...
+
+    @overload
+    def _execute(self, statement: Select, shape: RowShapes) -> Results:
+        ...
+
+    @instrumented
+    def _execute(self, statement: Select, shape: RowShapes = RowShapes.Schema) -> Results:
+        return self._shape_results(statement.fields, self._fetch(statement), shape)
+
+    @instrumented
+    def _exists(self, statement: Select) -> bool:
+        return bool(self._fetch(statement._replace(
+            fields=(Keywords.ID.value,), order_by=(), distinct=False, limit=1, offset=0,
+        )))
+
+    @instrumented
+    def _count(self, statement: Select, group_by: Tuple[str, ...] = ()) -> List[Tuple[Any, ...]]:
+        return self._fetch(Count(self.table_name, statement.conditions, group_by))
+
+    @instrumented
+    def _page(self, statement: Select, size: int, token: Optional[str]) -> Page:
+        if size < 1:
+            raise ValueError('size must be at least 1.')
+        order_by = statement.order_by or (OrderBy(Keywords.ID.value),)
+        descending = order_by[0].descending
+        if any(order.descending != descending for order in order_by):
+            raise ValueError('Keyset pagination needs every order_by in the same direction.')
+        if order_by[-1].field_name != Keywords.ID.value:
+            # IDs are unique, so rows with equal order_by values aren't skipped.
+            order_by = (*order_by, OrderBy(Keywords.ID.value, descending))
+
+        order_fields = [order.field_name for order in order_by]
+        fields = (
+            *statement.fields,
+            *(field for field in order_fields if field not in statement.fields),
+        )
+        rows = self._fetch(statement._replace(
+            fields=fields,
+            order_by=order_by,
+            limit=size + 1,  # One more, to tell whether there is a next page.
+            offset=0,
+            after=() if token is None else decode_token(token, order_by),
+        ))
+
+        next_token = None
+        if len(rows) > size:
+            rows = rows[:size]
+            next_token = encode_token(
+                order_by, [rows[-1][fields.index(field)] for field in order_fields],
+            )
+        return Page(self._map_results_to_schema(statement.fields, rows), next_token)
+
+    @instrumented
+    def _stream(
+        self, statement: Select, batch_size: int,
+    ) -> Generator[List[Tuple[Any, ...]], None, None]:
+        """Batches of at most `batch_size` rows read from an unbuffered cursor."""
+        engine = self.engine()
+        transaction = transactions.current()
+        with self._connection(engine) as connection:
+            cursor = engine.select(connection, statement)
+            try:
+                while True:
+                    results = cursor.fetchmany(batch_size)
+                    if not results:
+                        break
+                    yield results
+            except GeneratorExit:
+                if transaction is not None:
+                    # The transaction's connection is still needed, so the
+                    # rest of the result set is read and dropped instead.
+                    cursor.fetchall()
+                else:
+                    engine.pool.invalidate(connection)
+                raise
+
+    def _stream_schemas(self, statement: Select, batch_size: int) -> Iterator[ISchema]:
+        with closing(self._stream(statement, batch_size)) as batches:
+            for results in batches:
+                yield from self._map_results_to_schema(statement.fields, results)
+
+    def _stream_rows(self, statement: Select, batch_size: int) -> Iterator[Tuple[Any, ...]]:
+        with closing(self._stream(statement, batch_size)) as batches:
+            for results in batches:
+                yield from results
+
+    @instrumented
     def find(self, id: int) -> ISchema:
-        self.filter(Keywords.ID.value, Operators.Equals, id)
-        result = self.execute()
+        result = self.filter(Keywords.ID.value, Operators.Equals, id).execute()
 
         if result:
             return result[0]
         raise SchemaNotFound(f'Not found, ID: {id}.')
 
-    def get_query(self) -> str:
-        return self._query
+    @instrumented
+    def find_many(self, ids: Iterable[int]) -> Tuple[List[ISchema], List[int]]:
+        """Find every ID in `ids` with chunked `WHERE ID IN (...)` queries.
+
+        Returns the schemas found, in the order of `ids`, and the IDs which
+        were not found.
+        """
+        ids = list(ids)
+        unique_ids = list(dict.fromkeys(ids))
+
+        found: Dict[Any, ISchema] = {}
+        for chunk in _chunks(unique_ids):
+            for schema in self.filter(Keywords.ID.value, Operators.In, chunk).execute():
+                found[schema.get_id()] = schema
+
+        return (
+            [found[id] for id in ids if id in found],
+            [id for id in unique_ids if id not in found],
+        )
+
+    @classmethod
+    def child_model(cls) -> Optional[Type['BaseModel']]:
+        for model in ModelFactory._models.values():
+            if model.parent is cls:
+                return model
+        return None
+
+    def with_children(self, depth: Optional[int] = None) -> List[ISchema]:
+        """Every row with its children eagerly loaded, see `Query.with_children`."""
+        return self.query().with_children(depth)
+
+    @instrumented
+    def _with_children(self, statement: Select, depth: Optional[int]) -> List[ISchema]:
+        return self._attach_children(self._execute(statement), depth)
+
+    def _attach_children(
+        self, parents: List[ISchema], depth: Optional[int],
+    ) -> List[ISchema]:
+        if self.tree_schema is None or self.children_field is None:
+            return parents
+        tree_schema, children_field = self.tree_schema, self.children_field
+
+        children_by_parent: Dict[Any, List[ISchema]] = defaultdict(list)
+        child = self.child_model()
+        # Levels below `depth` are None, telling them apart from no children.
+        loaded = child is not None and depth != 0
+        if child is not None and loaded and parents:
+            child_model = child()
+            child_depth = None if depth is None else depth - 1
+            parent_ids = [cast(int, parent.get_id()) for parent in parents]
+            for chunk in _chunks(parent_ids):
+                children = child_model.filter(
+                    cast(str, child.foreign_key), Operators.In, chunk,
+                ).execute()
+                for schema in child_model._attach_children(children, child_depth):
+                    children_by_parent[getattr(schema, cast(str, child.foreign_key))].append(schema)
+
+        return [
+            tree_schema.construct(**parent.dict(), **{
+                children_field: children_by_parent[parent.get_id()] if loaded else None,
+            })
+            for parent in parents
+        ]
 
 
 class SportModel(BaseModel):
     schema = SportSchema
     table_name = 'sports'
 
+    tree_schema = SportTreeSchema
+    children_field = 'Events'
+
 
 class EventModel(BaseModel):
+    """When all the events of a sport are inactive, the sport becomes inactive."""
+
     schema = EventSchema
     table_name = 'events'
 
-    def update(self, schema: ISchema) -> ISchema:
-        """When all the events of a sport are inactive,
-            the sport becomes inactive
-        """
-        schema = super().update(schema)
-
-        schema = cast(EventSchema, schema)
-        if not schema.Active and schema.Sport > 0:
-            self.select('ID', 'Sport', 'Active').filter(
-                'Sport', Operators.Equals, schema.Sport,
-            ).filter('Active', Operators.Equals, 1)
-            result = self.execute()
-            if not result:
-                sm = SportModel()
-                sport = sm.find(schema.Sport)
-                sport = cast(SportSchema, sport)
-                sport.Active = False
-                sm.update(sport)
-        return schema
+    parent = SportModel
+    foreign_key = 'Sport'
+
+    tree_schema = EventTreeSchema
+    children_field = 'Selections'
 
 
 class SelectionModel(BaseModel):
+    """When all the selections of a particular event are inactive,
+        the event becomes inactive
+    """
+
     schema = SelectionSchema
     table_name = 'selections'
 
-    def update(self, schema: ISchema) -> ISchema:
-        """When all the selections of a particular event are inactive,
-            the event becomes inactive
-        """
-        schema = super().update(schema)
-
-        schema = cast(SelectionSchema, schema)
-        if not schema.Active and schema.Event > 0:
-            self.select('ID', 'Event', 'Active').filter(
-                'Event', Operators.Equals, schema.Event,
-            ).filter('Active', Operators.Equals, 1)
-            result = self.execute()
-            if not result:
-                em = EventModel()
-                event = em.find(schema.Event)
-                event = cast(EventSchema, event)
-                event.Active = False
-                em.update(event)
-        return schema
+    parent = EventModel
+    foreign_key = 'Event'
+
+
+def transaction() -> ContextManager[transactions.Transaction]:
+    """A unit of work: every model call in the block shares one connection
+    and the writes are committed once, when the block ends.
+
+    If the block raises, every write in it, cascades included, is rolled
+    back. A block nested in another is a savepoint, so it can fail and be
+    rolled back on its own while the outer block goes on::
+        with transaction():
+            event = EventModel().insert(event)
+            for selection in selections:
+                SelectionModel().insert(selection)
+
+    The transaction belongs to the thread which opened it, and the writes of
+    the block hold their row locks until it ends.
+    """
+    # Tables are created up front, DDL would end the transaction in MySQL.
+    engine = BaseModel.engine()
+    engine.ensure_schema(_model_tables)
+    return transactions.begin(
+        engine, lambda table_names: BaseModel._invalidate(*table_names),
+    )
+
+
+def _model_tables() -> List[TableMetadata]:
+    return [model.metadata() for model in ModelFactory._models.values()]
 
 
 class ModelFactory:
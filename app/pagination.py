@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.schemas import ISchema
+from app.statements import OrderBy
+
+_DATETIME = '$datetime'
+
+
+class InvalidPageToken(ValueError):
+    """Raised when a page token is malformed or from another query's order."""
+
+
+class Page(NamedTuple):
+    """A page of results and the token of the next one, if there is one."""
+
+    results: List[ISchema]
+    next_token: Optional[str]
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {_DATETIME: value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        return datetime.fromisoformat(value[_DATETIME])
+    return value
+
+
+def encode_token(order_by: Sequence[OrderBy], after: Sequence[Any]) -> str:
+    """An opaque token of the last row of a page, i.e. its `order_by` values."""
+    token = {
+        'order': [[order.field_name, order.descending] for order in order_by],
+        'after': [_encode_value(value) for value in after],
+    }
+    return base64.urlsafe_b64encode(
+        json.dumps(token, separators=(',', ':')).encode(),
+    ).decode()
+
+
+def decode_token(token: str, order_by: Sequence[OrderBy]) -> Tuple[Any, ...]:
+    """The row values `token` continues after, for a query ordered by `order_by`."""
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(token.encode()))
+        order = [OrderBy(field_name, descending) for field_name, descending in decoded['order']]
+        after = tuple(_decode_value(value) for value in decoded['after'])
+    except (binascii.Error, ValueError, KeyError, TypeError) as error:
+        raise InvalidPageToken(f'Malformed page token: {token}') from error
+    if order != list(order_by) or len(after) != len(order):
+        raise InvalidPageToken('The page token is from a query with another order.')
+    return after
@@ -0,0 +1,278 @@
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out within the timeout."""
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """How a `ConnectionPool` is sized, see its arguments."""
+
+    size: int = 5
+    max_idle_time: float = 300.0
+    checkout_timeout: float = 10.0
+
+
+@dataclass
+class PoolStats:
+    """Point in time snapshot of a `ConnectionPool`."""
+
+    size: int = 0
+    in_use: int = 0
+    idle: int = 0
+    checkouts: int = 0
+    waits: int = 0
+    wait_time: float = 0.0
+    timeouts: int = 0
+    created: int = 0
+    closed: int = 0
+    health_check_failures: int = 0
+    idle_expired: int = 0
+
+
+class StatementCache:
+    """LRU cache of prepared statements on a single connection.
+
+    Statements are keyed by their query text, which only holds placeholders,
+    so every execution of the same query shape reuses the statement the server
+    already parsed and only sends the new parameters. The least recently used
+    statement is closed once more than `size` are cached.
+    """
+
+    def __init__(self, cursor: Callable[[], Any], size: int = 64) -> None:
+        self._cursor = cursor
+        self.size = size
+        self._statements: 'OrderedDict[str, Tuple[str, Any]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def execute(self, query: str, params: Sequence[Any] = ()) -> Any:
+        """Execute `query` as a prepared statement, returning its cursor."""
+        statement = self._statements.get(query)
+        if statement is None:
+            self.misses += 1
+            # The cursor only skips re-preparing for the very same query object.
+            statement = (query, self._cursor())
+            self._statements[query] = statement
+            if len(self._statements) > self.size:
+                _, (_, evicted) = self._statements.popitem(last=False)
+                evicted.close()
+        else:
+            self.hits += 1
+            self._statements.move_to_end(query)
+
+        prepared_query, cursor = statement
+        cursor.execute(prepared_query, params)
+        return cursor
+
+
+class _PooledConnection:
+    __slots__ = ('raw', 'created_at', 'last_used', 'invalid')
+
+    def __init__(self, raw: Any) -> None:
+        self.raw = raw
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.invalid = False
+
+
+class ConnectionPool:
+    """A sized, thread-safe pool of DB-API connections.
+
+    Idle connections are reused most recently used first so the hot ones stay
+    warm, and are closed once they sit idle for longer than `max_idle_time`.
+    A connection which has been idle for longer than `health_check_after` is
+    health checked before being handed out. When all `size` connections are
+    checked out, callers wait up to `checkout_timeout` seconds for one to be
+    released before `PoolTimeout` is raised.
+
+    For example::
+        pool = ConnectionPool(lambda: connect(**settings), size=5)
+        with pool.connection() as connection:
+            cursor = connection.cursor()
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        size: int = 5,
+        max_idle_time: float = 300.0,
+        checkout_timeout: float = 10.0,
+        health_check: Optional[Callable[[Any], bool]] = None,
+        health_check_after: float = 30.0,
+    ) -> None:
+        if size < 1:
+            raise ValueError('Pool size must be at least 1.')
+        self._connect = connect
+        self.size = size
+        self.max_idle_time = max_idle_time
+        self.checkout_timeout = checkout_timeout
+        self._health_check = health_check
+        self.health_check_after = health_check_after
+
+        self._condition = threading.Condition(threading.Lock())
+        self._idle: List[_PooledConnection] = []
+        self._in_use: Dict[int, _PooledConnection] = {}
+        self._total = 0
+        self._stats = PoolStats(size=size)
+
+    def _close(self, pooled: _PooledConnection) -> None:
+        try:
+            pooled.raw.close()
+        except Exception:  # noqa: S110 - Already broken, nothing to recover.
+            pass
+        with self._condition:
+            self._stats.closed += 1
+
+    def _is_healthy(self, pooled: _PooledConnection) -> bool:
+        if self._health_check is None:
+            return True
+        if time.monotonic() - pooled.last_used < self.health_check_after:
+            return True
+        try:
+            healthy = self._health_check(pooled.raw)
+        except Exception:
+            healthy = False
+        if not healthy:
+            with self._condition:
+                self._stats.health_check_failures += 1
+        return healthy
+
+    def _pop_idle(
+        self, expired: List[_PooledConnection],
+    ) -> Optional[_PooledConnection]:
+        """Pop the most recently used idle connection. Must hold the lock."""
+        now = time.monotonic()
+        while self._idle:
+            pooled = self._idle.pop()
+            if now - pooled.last_used <= self.max_idle_time:
+                return pooled
+            self._total -= 1
+            self._stats.idle_expired += 1
+            expired.append(pooled)
+        return None
+
+    def _reserve(
+        self, expired: List[_PooledConnection],
+    ) -> Optional[_PooledConnection]:
+        """Return an idle connection or reserve a slot for a new one."""
+        deadline = time.monotonic() + self.checkout_timeout
+        waited = False
+        with self._condition:
+            while True:
+                pooled = self._pop_idle(expired)
+                if pooled is not None or self._total < self.size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats.timeouts += 1
+                    raise PoolTimeout(
+                        f'No connection available within {self.checkout_timeout}s.'
+                    )
+                if not waited:
+                    waited = True
+                    self._stats.waits += 1
+                started = time.monotonic()
+                self._condition.wait(remaining)
+                self._stats.wait_time += time.monotonic() - started
+            if pooled is None:
+                self._total += 1
+            return pooled
+
+    def _create(self) -> _PooledConnection:
+        try:
+            pooled = _PooledConnection(self._connect())
+        except Exception:
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+            raise
+        with self._condition:
+            self._stats.created += 1
+        return pooled
+
+    def acquire(self) -> Any:
+        """Check a connection out of the pool."""
+        expired: List[_PooledConnection] = []
+        pooled = self._reserve(expired)
+        while pooled is not None and not self._is_healthy(pooled):
+            expired.append(pooled)
+            with self._condition:
+                self._total -= 1
+            pooled = self._reserve(expired)
+        for stale in expired:
+            self._close(stale)
+        if pooled is None:
+            pooled = self._create()
+
+        with self._condition:
+            self._in_use[id(pooled.raw)] = pooled
+            self._stats.checkouts += 1
+        return pooled.raw
+
+    def invalidate(self, connection: Any) -> None:
+        """Close `connection` when it is released instead of reusing it."""
+        with self._condition:
+            pooled = self._in_use.get(id(connection))
+            if pooled is not None:
+                pooled.invalid = True
+
+    def release(self, connection: Any) -> None:
+        """Return a connection to the pool.
+
+        Any open transaction is rolled back so that locks and read snapshots
+        are not carried over to the next checkout.
+        """
+        with self._condition:
+            pooled = self._in_use.pop(id(connection))
+
+        if not pooled.invalid and getattr(connection, 'in_transaction', False):
+            try:
+                connection.rollback()
+            except Exception:
+                pooled.invalid = True
+
+        if pooled.invalid:
+            self._close(pooled)
+            with self._condition:
+                self._total -= 1
+                self._condition.notify()
+            return
+
+        pooled.last_used = time.monotonic()
+        with self._condition:
+            self._idle.append(pooled)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Check a connection out for the duration of the `with` block."""
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self) -> None:
+        """Close every idle connection. Checked out ones close on release."""
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            for pooled in self._in_use.values():
+                pooled.invalid = True
+            self._condition.notify_all()
+        for pooled in idle:
+            self._close(pooled)
+
+    def stats(self) -> PoolStats:
+        with self._condition:
+            stats = PoolStats(**vars(self._stats))
+            stats.in_use = len(self._in_use)
+            stats.idle = len(self._idle)
+        return stats
@@ -1,15 +1,19 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import Any, Dict, NewType, Optional, Type
+from typing import Any, ClassVar, Dict, List, NewType, Optional, Set, Tuple, Type
 
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, PrivateAttr, ValidationError, validator
 
 from app.enums import Entities, OutcomeEnum, StatusEnum, TypeEnum
 
 ForeignKey = NewType('ForeignKey', int)
+Indexes = Tuple[Tuple[str, ...], ...]
 
 
 class ISchema(ABC):
+    # Secondary indexes created with the table, one tuple of columns each.
+    indexes: ClassVar[Indexes] = ()
+
     @abstractmethod
     def get_id(self) -> Optional[int]:
         ...
@@ -33,22 +37,68 @@ class ISchema(ABC):
     def dict(cls) -> Dict[str, Any]:
         ...
 
+    @abstractmethod
+    def changes(self) -> Optional[Set[str]]:
+        """Fields assigned a new value since `track_changes`, None if untracked."""
+
+    @abstractmethod
+    def track_changes(self) -> None:
+        """Start tracking changes, e.g. once the schema matches its row."""
+
+    @classmethod
+    @abstractmethod
+    def validate_fields(cls, **values: Any) -> Dict[str, Any]:
+        """Validate some of the fields, without the rest of the schema."""
+
+
+_UNSET = object()
+
 
 class Schema(BaseModel, ISchema, ABC):
     ID: Optional[int]
 
+    # Fields changed since the schema was read or written, see `BaseModel.update`.
+    _changes: Optional[Set[str]] = PrivateAttr(None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        changes = self._changes
+        if changes is not None and name in self.__fields__ and self.__dict__.get(name, _UNSET) != value:
+            changes.add(name)
+        super().__setattr__(name, value)
+
     def get_id(self) -> Optional[int]:
         return self.ID
 
     def set_id(self, id: int) -> None:
         self.ID = id
 
+    def changes(self) -> Optional[Set[str]]:
+        return self._changes
+
+    def track_changes(self) -> None:
+        object.__setattr__(self, '_changes', set())
+
+    @classmethod
+    def validate_fields(cls, **values: Any) -> Dict[str, Any]:
+        validated: Dict[str, Any] = {}
+        errors = []
+        for name, value in values.items():
+            value, error = cls.__fields__[name].validate(value, validated, loc=name, cls=cls)
+            if error:
+                errors.append(error)
+            validated[name] = value
+        if errors:
+            raise ValidationError(errors, cls)
+        return validated
+
 
 class SportSchema(Schema):
     Name: str
     Slug: str
     Active: bool
 
+    indexes: ClassVar[Indexes] = (('Slug',),)
+
 
 class EventSchema(Schema):
     Name: str
@@ -59,6 +109,8 @@ class EventSchema(Schema):
     Status: StatusEnum
     ScheduledStart: datetime
 
+    indexes: ClassVar[Indexes] = (('Sport', 'Active'), ('ScheduledStart',))
+
     class Config:
         use_enum_values = True
 
@@ -70,6 +122,8 @@ class SelectionSchema(Schema):
     Active: bool
     Outcome: OutcomeEnum
 
+    indexes: ClassVar[Indexes] = (('Event', 'Active'),)
+
     class Config:
         use_enum_values = True
 
@@ -87,6 +141,21 @@ class SelectionSchema(Schema):
         return price
 
 
+class EventTreeSchema(EventSchema):
+    """An event with its selections, see `BaseModel.with_children`.
+
+    `Selections` is None when they weren't loaded.
+    """
+
+    Selections: Optional[List[SelectionSchema]] = None
+
+
+class SportTreeSchema(SportSchema):
+    """A sport with its events and their selections."""
+
+    Events: Optional[List[EventTreeSchema]] = None
+
+
 class SchemaFactory:
     _schemas: Dict[str, Type[Schema]] = {
         Entities.Sport.value: SportSchema,
@@ -0,0 +1,95 @@
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+from typing import Any, Dict, List, Sequence, Tuple, Type, Union
+
+from app.enums import Keywords, RowShapes
+from app.metadata import TableMetadata
+
+Row = Tuple[Any, ...]
+Columns = Dict[str, Sequence[Any]]
+Results = Union[List[Any], Columns]
+
+# Array type codes of the JSON column types, other columns are lists.
+TYPE_CODES = {
+    'integer': 'q',
+    'number': 'd',
+    'boolean': 'b',
+}
+
+
+class Record:
+    """Base of the `__slots__` record classes generated per projection.
+
+    Far lighter than a schema object, with attribute access to the fields.
+    """
+
+    __slots__ = ()
+    _fields: Tuple[str, ...] = ()
+
+    def __init__(self, *values: Any) -> None:
+        for field, value in zip(self._fields, values):
+            setattr(self, field, value)
+
+    def __repr__(self) -> str:
+        values = ', '.join(f'{field}={getattr(self, field)!r}' for field in self._fields)
+        return f'{type(self).__name__}({values})'
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and self._astuple() == other._astuple()
+
+    def _astuple(self) -> Row:
+        return tuple(getattr(self, field) for field in self._fields)
+
+    def _asdict(self) -> Dict[str, Any]:
+        return dict(zip(self._fields, self._astuple()))
+
+
+@lru_cache(maxsize=256)
+def record_class(table_name: str, fields: Tuple[str, ...]) -> Type[Record]:
+    """The record class of `fields` of `table_name`, generated once."""
+    return type(
+        f'{table_name.capitalize()}Record', (Record,), {'__slots__': fields, '_fields': fields},
+    )
+
+
+@lru_cache(maxsize=256)
+def namedtuple_class(table_name: str, fields: Tuple[str, ...]) -> Type[Any]:
+    return namedtuple(f'{table_name.capitalize()}Row', fields)
+
+
+def to_columns(metadata: TableMetadata, fields: Sequence[str], rows: List[Row]) -> Columns:
+    """A sequence of values per field, `array`s for numbers and booleans.
+
+    Columns holding NULLs stay lists, as arrays can't.
+    """
+    columns: Columns = {}
+    for index, field in enumerate(fields):
+        values = [row[index] for row in rows]
+        column_type = 'integer' if field == Keywords.ID.value else metadata.column_types.get(field)
+        type_code = TYPE_CODES.get(column_type or '')
+        if type_code is not None:
+            try:
+                columns[field] = array(type_code, values)
+                continue
+            except TypeError:  # NULLs.
+                pass
+        columns[field] = values
+    return columns
+
+
+def shape_rows(
+    shape: RowShapes, metadata: TableMetadata, fields: Tuple[str, ...], rows: List[Row],
+) -> Results:
+    """Results of `rows` in `shape`, any shape but `RowShapes.Schema`."""
+    if shape is RowShapes.Tuple:
+        return list(rows)  # A copy, `rows` may be held by the result cache.
+    if shape is RowShapes.Columns:
+        return to_columns(metadata, fields, rows)
+    if shape is RowShapes.NamedTuple:
+        make = namedtuple_class(metadata.table_name, fields)._make
+        return [make(row) for row in rows]
+    if shape is RowShapes.Record:
+        record = record_class(metadata.table_name, fields)
+        return [record(*row) for row in rows]
+    raise ValueError(f'Unsupported row shape: {shape}')
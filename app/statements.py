@@ -0,0 +1,101 @@
+from typing import Any, List, NamedTuple, Optional, Tuple, Union
+
+from app.enums import Operators
+
+# LIMIT of a query with an OFFSET but no limit, the largest both MySQL and
+# SQLite accept.
+NO_LIMIT = 2 ** 63 - 1
+
+
+class Condition(NamedTuple):
+    field_name: str
+    operator: Operators
+    value: Any  # A tuple of values for operators which take many.
+
+
+class OrderBy(NamedTuple):
+    field_name: str
+    descending: bool = False
+
+
+class Select(NamedTuple):
+    """A query, models build these and engines compile or evaluate them.
+
+    `after` seeks past a row for keyset pagination: only rows whose
+    `order_by` columns, as a tuple, come after it in the order are matched.
+    Every `order_by` must then have the same direction.
+    """
+
+    table_name: str
+    fields: Tuple[str, ...]
+    conditions: Tuple[Condition, ...] = ()
+    order_by: Tuple[OrderBy, ...] = ()
+    distinct: bool = False
+    for_update: bool = False
+    limit: Optional[int] = None
+    offset: int = 0
+    after: Tuple[Any, ...] = ()
+
+    def params(self) -> List[Any]:
+        params = condition_params(self.conditions)
+        params.extend(self.after)
+        if self.limit is not None or self.offset:
+            params.extend((NO_LIMIT if self.limit is None else self.limit, self.offset))
+        return params
+
+
+class Count(NamedTuple):
+    """Count the matching rows, per distinct `group_by` values when given.
+
+    Engines return a row of the count, or a row per group of the
+    `group_by` values followed by their count.
+    """
+
+    table_name: str
+    conditions: Tuple[Condition, ...] = ()
+    group_by: Tuple[str, ...] = ()
+
+    def params(self) -> List[Any]:
+        return condition_params(self.conditions)
+
+
+class Insert(NamedTuple):
+    """A single or multi-row insert, `rows` hold values in `columns` order."""
+
+    table_name: str
+    columns: Tuple[str, ...]
+    rows: Tuple[Tuple[Any, ...], ...]
+
+
+class Update(NamedTuple):
+    table_name: str
+    assignments: Tuple[Tuple[str, Any], ...]
+    conditions: Tuple[Condition, ...]
+
+
+class DeactivateOrphans(NamedTuple):
+    """Deactivate the parents in `parent_ids` which have no active child."""
+
+    parent_table: str
+    child_table: str
+    foreign_key: str
+    parent_ids: Tuple[int, ...]
+
+
+Statement = Union[Select, Count, Insert, Update, DeactivateOrphans]
+
+
+def condition(field_name: str, operator: Operators, value: Any) -> Condition:
+    if operator.takes_many:
+        value = tuple(value)
+    return Condition(field_name, operator, value)
+
+
+def condition_params(conditions: Tuple[Condition, ...]) -> List[Any]:
+    params: List[Any] = []
+    for where in conditions:
+        if where.operator.takes_many:
+            params.extend(where.value)
+        else:
+            params.append(where.value)
+    return params
@@ -0,0 +1,65 @@
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Set
+
+_local = threading.local()
+
+
+class Transaction:
+    """A unit of work: one connection and one commit for many model calls.
+
+    Started by `app.models.transaction()`. While it is open, every model
+    call of the thread runs on its connection and, instead of committing,
+    leaves the commit to the end of the outermost `with` block. Nested
+    blocks are savepoints, rolled back on their own when they raise.
+    """
+
+    def __init__(self, engine: Any, connection: Any) -> None:
+        self.engine = engine
+        self.connection = connection
+        self.written: Set[str] = set()  # Tables written to, for the result cache.
+        self._savepoints = 0
+
+    @contextmanager
+    def savepoint(self) -> Iterator['Transaction']:
+        name = f'sp_{self._savepoints}'
+        self._savepoints += 1
+        self.engine.savepoint(self.connection, name)
+        try:
+            yield self
+        except BaseException:
+            self.engine.rollback_to_savepoint(self.connection, name)
+            raise
+        self.engine.release_savepoint(self.connection, name)
+
+
+def current() -> Optional[Transaction]:
+    """The transaction open in this thread, if any."""
+    return getattr(_local, 'transaction', None)
+
+
+@contextmanager
+def begin(engine: Any, on_commit: Callable[[Set[str]], None]) -> Iterator[Transaction]:
+    """Open a transaction on `engine`, or a savepoint in the open one.
+
+    `on_commit` is called with the tables written to once it is committed.
+    """
+    transaction = current()
+    if transaction is not None:
+        with transaction.savepoint():
+            yield transaction
+        return
+
+    with engine.pool.connection() as connection:
+        transaction = Transaction(engine, connection)
+        _local.transaction = transaction
+        try:
+            yield transaction
+        except BaseException:
+            connection.rollback()
+            raise
+        else:
+            connection.commit()
+        finally:
+            _local.transaction = None
+        on_commit(transaction.written)
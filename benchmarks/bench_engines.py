@@ -0,0 +1,87 @@
+"""Per-operation latency of each storage engine on the same workload.
+
+Usage::
+    python -m benchmarks.bench_engines --engines mysql,sqlite --selections 10000
+"""
+import argparse
+from typing import Any, Callable, Dict
+
+from app.enums import Operators
+from app.models import EventModel, SelectionModel, SportModel
+from app.schemas import SportSchema
+from benchmarks.common import (
+    drop_database,
+    measure,
+    pick,
+    print_results,
+    seed,
+    use_database,
+)
+
+
+def _operations(
+    sport_ids: Any, event_ids: Any, selection_ids: Any,
+) -> Dict[str, Callable[[], Any]]:
+    next_sport, next_event = pick(sport_ids), pick(event_ids)
+    next_selection, next_deactivated = pick(selection_ids), pick(selection_ids)
+
+    def update_selection() -> Any:
+        selection = SelectionModel().find(next_selection())
+        selection.Price += 1
+        return SelectionModel().update(selection)
+
+    return {
+        'insert sport': lambda: SportModel().insert(
+            SportSchema(Name='bench', Slug='bench', Active=True),
+        ),
+        'insert_many 100 sports': lambda: SportModel().insert_many(
+            SportSchema(Name='bench', Slug=f'bench-{index}', Active=True)
+            for index in range(100)
+        ),
+        'find selection': lambda: SelectionModel().find(next_selection()),
+        'filter events of a sport': lambda: EventModel().filter(
+            'Sport', Operators.Equals, next_sport(),
+        ).filter('Active', Operators.Equals, True).execute(),
+        'with_children of an event': lambda: EventModel().filter(
+            'ID', Operators.Equals, next_event(),
+        ).with_children(),
+        'update selection': update_selection,
+        'deactivate selection with cascade': lambda: SelectionModel().deactivate(
+            [next_deactivated()],
+        ),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default='eightapp_bench')
+    parser.add_argument('--engines', default='mysql,sqlite')
+    parser.add_argument('--selections', type=int, default=10_000)
+    parser.add_argument('--selections-per-event', type=int, default=10)
+    parser.add_argument('--events-per-sport', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=500)
+    parser.add_argument('--keep', action='store_true', help='Keep the databases.')
+    arguments = parser.parse_args()
+
+    events = max(1, arguments.selections // arguments.selections_per_event)
+    sports = max(1, events // arguments.events_per_sport)
+    for engine in arguments.engines.split(','):
+        server_settings = use_database(arguments.database, engine)
+        try:
+            sport_ids, event_ids, selection_ids = seed(
+                sports, arguments.events_per_sport, arguments.selections_per_event,
+            )
+            print_results(
+                f'{engine}, {len(selection_ids)} selections',
+                {
+                    name: measure(operation, arguments.repeat)
+                    for name, operation in _operations(sport_ids, event_ids, selection_ids).items()
+                },
+            )
+        finally:
+            if not arguments.keep:
+                drop_database(server_settings, arguments.database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Cascade and lookup latency with and without the declared indexes.
+
+Usage::
+    python -m benchmarks.bench_indexes --selections 1000000
+"""
+import argparse
+from typing import Any, Callable, Dict
+
+from app.enums import Operators
+from app.models import BaseModel, EventModel, SelectionModel, SportModel
+from app.statements import Condition, Select
+from benchmarks.common import (
+    drop_database,
+    measure,
+    pick,
+    print_results,
+    seed,
+    use_database,
+)
+
+MODELS = (SportModel, EventModel, SelectionModel)
+
+
+def _set_indexes(enabled: bool) -> None:
+    engine = BaseModel.engine()
+    with engine.pool.connection() as connection:
+        for model in MODELS:
+            if enabled:
+                engine.create_indexes(connection, model.metadata())
+            else:
+                engine.drop_indexes(connection, model.metadata())
+        connection.commit()
+
+
+def _query(
+    table_name: str,
+    foreign_key: str,
+    next_id: Callable[[], int],
+    active_only: bool = False,
+) -> Callable[[], Any]:
+    engine = BaseModel.engine()
+
+    def run() -> Any:
+        conditions = (Condition(foreign_key, Operators.Equals, next_id()),)
+        if active_only:
+            conditions += (Condition('Active', Operators.Equals, True),)
+        with engine.pool.connection() as connection:
+            return engine.select(
+                connection, Select(table_name, ('ID',), conditions),
+            ).fetchall()
+    return run
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default='eightapp_bench')
+    parser.add_argument('--engine', default=None, help='Defaults to DB_ENGINE.')
+    parser.add_argument('--selections', type=int, default=1_000_000)
+    parser.add_argument('--selections-per-event', type=int, default=10)
+    parser.add_argument('--events-per-sport', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--keep', action='store_true', help='Keep the database.')
+    arguments = parser.parse_args()
+
+    server_settings = use_database(arguments.database, arguments.engine)
+    events = max(1, arguments.selections // arguments.selections_per_event)
+    sports = max(1, events // arguments.events_per_sport)
+    sport_ids, event_ids, selection_ids = seed(
+        sports, arguments.events_per_sport, arguments.selections_per_event,
+    )
+
+    next_selection = pick(selection_ids)
+    operations: Dict[str, Callable[[], Any]] = {
+        'active selections (Event, Active)': _query(
+            'selections', 'Event', pick(event_ids), active_only=True,
+        ),
+        'selections of an event (Event)': _query(
+            'selections', 'Event', pick(event_ids),
+        ),
+        'active events of a sport (Sport, Active)': _query(
+            'events', 'Sport', pick(sport_ids), active_only=True,
+        ),
+        'deactivate selection with cascade': lambda: SelectionModel().deactivate(
+            [next_selection()],
+        ),
+    }
+    try:
+        for enabled in (False, True):
+            _set_indexes(enabled)
+            print_results(
+                f"{'With' if enabled else 'Without'} indexes, {len(selection_ids)} selections",
+                {name: measure(operation, arguments.repeat) for name, operation in operations.items()},
+            )
+    finally:
+        if not arguments.keep:
+            drop_database(server_settings, arguments.database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Loading the sport, event, selection hierarchy eagerly versus N+1 queries.
+
+Usage::
+    python -m benchmarks.bench_prefetch --sports 10 --events-per-sport 50
+"""
+import argparse
+from typing import Any, List, Sequence
+
+from app.enums import Operators
+from app.models import EventModel, SelectionModel, SportModel
+from benchmarks.common import (
+    drop_database,
+    measure,
+    print_results,
+    seed,
+    use_database,
+)
+
+
+def naive(sport_ids: Sequence[int]) -> List[Any]:
+    """One query for the sports, one per sport and one per event."""
+    sports = SportModel().filter('ID', Operators.In, list(sport_ids)).execute()
+    tree = []
+    for sport in sports:
+        events = EventModel().filter('Sport', Operators.Equals, sport.get_id()).execute()
+        tree.append(
+            (
+                sport,
+                [
+                    (
+                        event,
+                        SelectionModel().filter(
+                            'Event', Operators.Equals, event.get_id(),
+                        ).execute(),
+                    )
+                    for event in events
+                ],
+            )
+        )
+    return tree
+
+
+def eager(sport_ids: Sequence[int]) -> List[Any]:
+    return SportModel().filter('ID', Operators.In, list(sport_ids)).with_children()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default='eightapp_bench')
+    parser.add_argument('--engine', default=None, help='Defaults to DB_ENGINE.')
+    parser.add_argument('--sports', type=int, default=10)
+    parser.add_argument('--events-per-sport', type=int, default=50)
+    parser.add_argument('--selections-per-event', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--keep', action='store_true', help='Keep the database.')
+    arguments = parser.parse_args()
+
+    server_settings = use_database(arguments.database, arguments.engine)
+    try:
+        sport_ids, _, _ = seed(
+            arguments.sports,
+            arguments.events_per_sport,
+            arguments.selections_per_event,
+        )
+        print_results(
+            f'{arguments.sports} sports, {arguments.events_per_sport} events each, {arguments.selections_per_event} selections each',
+            {
+                'naive N+1': measure(lambda: naive(sport_ids), arguments.repeat),
+                'with_children': measure(lambda: eager(sport_ids), arguments.repeat),
+            },
+        )
+    finally:
+        if not arguments.keep:
+            drop_database(server_settings, arguments.database)
+
+
+if __name__ == '__main__':
+    main()
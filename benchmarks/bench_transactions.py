@@ -0,0 +1,86 @@
+"""Commit throughput of a unit of work against a commit per row.
+
+Each operation writes `--rows` selections of an event and updates them,
+either committing every call on its own or inside one `transaction()`.
+
+Usage::
+    python -m benchmarks.bench_transactions --engines mysql,sqlite --rows 100
+"""
+import argparse
+from typing import Any, Callable, Dict, List, Sequence
+
+from app.enums import OutcomeEnum
+from app.models import SelectionModel, transaction
+from app.schemas import SelectionSchema
+from benchmarks.common import (
+    drop_database,
+    measure,
+    pick,
+    print_results,
+    seed,
+    use_database,
+)
+
+
+def _write(next_event: Callable[[], int], rows: int) -> Callable[[], Any]:
+    """Insert `rows` selections of an event, then update each of them."""
+    def run() -> Any:
+        sm = SelectionModel()
+        event_id = next_event()
+        selections: List[SelectionSchema] = []
+        for index in range(rows):
+            selections.append(sm.insert(SelectionSchema(
+                Name=f'bench_{index}',
+                Event=event_id,
+                Price=1.5,
+                Active=True,
+                Outcome=OutcomeEnum.Unsettled,
+            )))
+        for selection in selections:
+            selection.Price += 1
+            sm.update(selection)
+    return run
+
+
+def _in_transaction(operation: Callable[[], Any]) -> Callable[[], Any]:
+    def run() -> Any:
+        with transaction():
+            return operation()
+    return run
+
+
+def _operations(event_ids: Sequence[int], rows: int) -> Dict[str, Callable[[], Any]]:
+    return {
+        f'autocommit, {rows * 2} writes': _write(pick(event_ids), rows),
+        f'transaction, {rows * 2} writes': _in_transaction(_write(pick(event_ids), rows)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--database', default='eightapp_bench')
+    parser.add_argument('--engines', default='mysql,sqlite')
+    parser.add_argument('--events', type=int, default=1000)
+    parser.add_argument('--rows', type=int, default=100, help='Selections written per operation.')
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--keep', action='store_true', help='Keep the databases.')
+    arguments = parser.parse_args()
+
+    for engine in arguments.engines.split(','):
+        server_settings = use_database(arguments.database, engine)
+        try:
+            _, event_ids, _ = seed(1, arguments.events, 0)
+            print_results(
+                f'{engine}, {arguments.rows} selections inserted and updated per operation',
+                {
+                    name: measure(operation, arguments.repeat)
+                    for name, operation in _operations(event_ids, arguments.rows).items()
+                },
+            )
+        finally:
+            if not arguments.keep:
+                drop_database(server_settings, arguments.database)
+
+
+if __name__ == '__main__':
+    main()
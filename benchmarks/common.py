@@ -0,0 +1,154 @@
+"""Helpers shared by the benchmarks.
+
+Benchmarks run against their own database (``eightapp_bench`` by default)
+using the connection settings of `app.models.DB_SETTINGS`, on its storage
+engine unless another one is given.
+"""
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from app.enums import OutcomeEnum, StatusEnum, TypeEnum
+from app.models import (
+    DB_SETTINGS,
+    BaseModel,
+    EventModel,
+    SelectionModel,
+    SportModel,
+    create_database,
+    remove_database,
+)
+from app.schemas import EventSchema, SelectionSchema, SportSchema
+
+KEY_DATABASE = 'database'
+KEY_ENGINE = 'engine'
+
+SEED_CHUNK_SIZE = 5000
+
+
+def use_database(database_name: str, engine: Optional[str] = None) -> Dict[str, Any]:
+    """Point every model at a fresh `database_name`.
+
+    Returns the server settings without a database, for `drop_database`.
+    """
+    db_settings = {**DB_SETTINGS, KEY_DATABASE: database_name}
+    if engine is not None:
+        db_settings[KEY_ENGINE] = engine
+    server_settings = {
+        key: value for key, value in db_settings.items() if key != KEY_DATABASE
+    }
+    remove_database(server_settings, database_name)
+    create_database(server_settings, database_name)
+    BaseModel.db_settings = db_settings
+    return server_settings
+
+
+def drop_database(server_settings: Dict[str, Any], database_name: str) -> None:
+    remove_database(server_settings, database_name)
+
+
+def _sports(count: int) -> Iterator[SportSchema]:
+    for index in range(count):
+        yield SportSchema(Name=f'sport_{index}', Slug=f'sport-{index}', Active=True)
+
+
+def _events(sport_ids: Sequence[int], per_sport: int) -> Iterator[EventSchema]:
+    start = datetime(2021, 1, 1)
+    for sport_id in sport_ids:
+        for index in range(per_sport):
+            yield EventSchema(
+                Name=f'event_{sport_id}_{index}',
+                Slug=f'event-{sport_id}-{index}',
+                Active=True,
+                Type=TypeEnum.Preplay,
+                Sport=sport_id,
+                Status=StatusEnum.Pending,
+                ScheduledStart=start + timedelta(minutes=index),
+            )
+
+
+def _selections(event_ids: Sequence[int], per_event: int) -> Iterator[SelectionSchema]:
+    for event_id in event_ids:
+        for index in range(per_event):
+            yield SelectionSchema(
+                Name=f'selection_{event_id}_{index}',
+                Event=event_id,
+                Price=1.5,
+                Active=True,
+                Outcome=OutcomeEnum.Unsettled,
+            )
+
+
+def _inserted_ids(model: BaseModel, schemas: Iterator[Any]) -> Sequence[int]:
+    """Insert `schemas` into a fresh table, returning their IDs as a range.
+
+    Only the first and last schema are kept so seeding stays flat in memory.
+    The table is written by a single transaction with no concurrent writers,
+    so its IDs are consecutive.
+    """
+    ends: List[Any] = []
+
+    def track(schemas: Iterator[Any]) -> Iterator[Any]:
+        last = None
+        for schema in schemas:
+            if not ends:
+                ends.append(schema)
+            last = schema
+            yield schema
+        ends.append(last)
+
+    model.insert_many(track(schemas), chunk_size=SEED_CHUNK_SIZE)
+    if not ends or ends[0] is None:
+        return range(0)
+    return range(ends[0].get_id(), ends[-1].get_id() + 1)
+
+
+def seed(
+    sports: int, events_per_sport: int, selections_per_event: int,
+) -> Tuple[Sequence[int], Sequence[int], Sequence[int]]:
+    """Seed the hierarchy, returning the sport, event and selection IDs."""
+    sport_ids = _inserted_ids(SportModel(), _sports(sports))
+    event_ids = _inserted_ids(EventModel(), _events(sport_ids, events_per_sport))
+    selection_ids = _inserted_ids(
+        SelectionModel(), _selections(event_ids, selections_per_event),
+    )
+    return sport_ids, event_ids, selection_ids
+
+
+def measure(operation: Callable[[], Any], repeat: int, warmup: int = 0) -> Dict[str, float]:
+    """Time `operation` `repeat` times, after `warmup` untimed runs,
+    returning throughput and latencies.
+    """
+    for _ in range(warmup):
+        operation()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        operation_started = time.perf_counter()
+        operation()
+        latencies.append(time.perf_counter() - operation_started)
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'operations': repeat,
+        'ops_per_second': repeat / elapsed if elapsed else 0.0,
+        'p50_ms': statistics.median(latencies) * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+    }
+
+
+def pick(ids: Sequence[int]) -> Callable[[], int]:
+    rng = random.Random(888)  # Deterministic, so runs are comparable.
+    return lambda: rng.choice(ids)
+
+
+def print_results(title: str, results: Dict[str, Dict[str, float]]) -> None:
+    print(title)
+    print(f"{'operation':<40} {'ops/s':>12} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, result in results.items():
+        print(
+            f"{name:<40} {result['ops_per_second']:>12.1f} {result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f}"
+        )
@@ -0,0 +1,257 @@
+"""Throughput and latency of the ORM hot paths, with regression checks.
+
+Seeds the configured volumes, measures every operation and writes the
+results as JSON. Given a baseline from an earlier run with the same
+settings, any operation whose throughput or median latency is worse by more
+than `--tolerance` fails the run. So does a median CLI startup slower than
+`--startup-target-ms`, whatever the baseline.
+
+Usage::
+    python -m benchmarks.suite --engine memory --output results.json
+    python -m benchmarks.suite --engine memory --baseline results.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from itertools import cycle
+from typing import Any, Callable, Dict, List, Sequence
+
+from app.enums import Operators, OutcomeEnum, RowShapes, TypeEnum
+from app.models import EventModel, SelectionModel, SportModel
+from app.schemas import SelectionSchema, SportSchema
+from benchmarks.common import (
+    KEY_DATABASE,
+    drop_database,
+    measure,
+    pick,
+    print_results,
+    seed,
+    use_database,
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CLI_STARTUP = 'cli startup (import)'
+STARTUP_TARGET_MS = 150.0  # Scripts start the CLI thousands of times an hour.
+
+
+class Regression(Exception):
+    """Raised when results are worse than the baseline."""
+
+
+def _selection(id: int, event_id: int, price: float, active: bool) -> SelectionSchema:
+    return SelectionSchema(
+        ID=id,
+        Name=f'selection_{id}',
+        Event=event_id,
+        Price=price,
+        Active=active,
+        Outcome=OutcomeEnum.Unsettled,
+    )
+
+
+def _cli(arguments: List[str], db_settings: Dict[str, Any]) -> Callable[[], None]:
+    """Run the CLI in a new process, as scripts do."""
+    environment = {
+        **os.environ,
+        'DB_ENGINE': str(db_settings['engine']),
+        'DB_DIRECTORY': os.path.abspath(str(db_settings['directory'])),
+        'DB_NAME': str(db_settings[KEY_DATABASE]),
+    }
+
+    def run() -> None:
+        completed = subprocess.run(
+            [sys.executable, *arguments],
+            cwd=ROOT,
+            env=environment,
+            capture_output=True,
+            text=True,
+        )
+        if completed.returncode:
+            raise RuntimeError(f'CLI failed: {arguments}\n{completed.stderr}')
+    return run
+
+
+def operations(
+    sport_ids: Sequence[int],
+    event_ids: Sequence[int],
+    selection_ids: Sequence[int],
+    selections_per_event: int,
+) -> Dict[str, Callable[[], Any]]:
+    """The measured operations, in the order they run.
+
+    Updates with a cascade deactivate selections in ID order, so every event
+    and eventually every sport is deactivated too. They run after the reads.
+    """
+    next_sport, next_event = pick(sport_ids), pick(event_ids)
+    next_selection = pick(selection_ids)
+    to_deactivate = cycle(selection_ids)
+
+    def event_of(selection_id: int) -> int:
+        return event_ids[(selection_id - selection_ids[0]) // selections_per_event]
+
+    def update(active: bool, selection_id: int) -> Any:
+        return SelectionModel().update(
+            _selection(selection_id, event_of(selection_id), 2.5, active),
+        )
+
+    return {
+        'insert sport': lambda: SportModel().insert(
+            SportSchema(Name='bench', Slug='bench', Active=True),
+        ),
+        'insert selection': lambda: SelectionModel().insert(
+            SelectionSchema(
+                Name='bench',
+                Event=next_event(),
+                Price=1.5,
+                Active=True,
+                Outcome=OutcomeEnum.Unsettled,
+            ),
+        ),
+        'find selection': lambda: SelectionModel().find(next_selection()),
+        'execute events (Sport, Active, Type)': lambda: EventModel()
+        .filter('Sport', Operators.Equals, next_sport())
+        .filter('Active', Operators.Equals, True)
+        .filter('Type', Operators.Equals, TypeEnum.Preplay.value)
+        .execute(),
+        'select_fields sports (Name, Slug)': lambda: SportModel().select_fields('Name', 'Slug'),
+        'execute selections of an event as schemas': lambda: SelectionModel()
+        .filter('Event', Operators.Equals, next_event())
+        .execute(),
+        'execute selections of an event as tuples': lambda: SelectionModel()
+        .filter('Event', Operators.Equals, next_event())
+        .execute(RowShapes.Tuple),
+        'select_fields selections (Price) as columns': lambda: SelectionModel().select_fields(
+            'Price', shape=RowShapes.Columns,
+        ),
+        'update selection': lambda: update(True, next_selection()),
+        'patch selection price': lambda: SelectionModel().patch(next_selection(), Price=3.5),
+        'update selection with cascade': lambda: update(False, next(to_deactivate)),
+    }
+
+
+def cli_operations(db_settings: Dict[str, Any]) -> Dict[str, Callable[[], Any]]:
+    return {
+        CLI_STARTUP: _cli(['-c', 'import app.cli'], db_settings),
+        'cli create-sport': _cli(['run.py', 'create-sport', 'bench', 'bench'], db_settings),
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float,
+) -> List[str]:
+    """Return a description of every regression against `baseline`."""
+    if results['config'] != baseline['config']:
+        raise Regression(
+            f"Baseline settings {baseline['config']} differ from {results['config']}."
+        )
+    regressions = []
+    for name, expected in baseline['results'].items():
+        actual = results['results'].get(name)
+        if actual is None:
+            regressions.append(f'{name}: missing from the results')
+            continue
+        if actual['ops_per_second'] < expected['ops_per_second'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {actual['ops_per_second']:.1f} ops/s, baseline {expected['ops_per_second']:.1f} ops/s"
+            )
+        if actual['p50_ms'] > expected['p50_ms'] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {actual['p50_ms']:.3f} ms, baseline {expected['p50_ms']:.3f} ms"
+            )
+    return regressions
+
+
+def check_startup(results: Dict[str, Any], target_ms: float) -> List[str]:
+    """Describe the CLI startup if its median is slower than `target_ms`."""
+    startup = results['results'].get(CLI_STARTUP)
+    if startup is None or startup['p50_ms'] <= target_ms:
+        return []
+    return [f"{CLI_STARTUP}: p50 {startup['p50_ms']:.3f} ms, target {target_ms:.3f} ms"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default='eightapp_bench')
+    parser.add_argument('--engine', default=None, help='Defaults to DB_ENGINE.')
+    parser.add_argument('--sports', type=int, default=10)
+    parser.add_argument('--events-per-sport', type=int, default=100)
+    parser.add_argument('--selections-per-event', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--cli-repeat', type=int, default=10)
+    parser.add_argument('--skip-cli', action='store_true', help='Skip the CLI startup benchmarks.')
+    parser.add_argument('--output', default='benchmark-results.json')
+    parser.add_argument('--baseline', default=None, help='Results to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed slowdown, e.g. 0.25 for 25%%.')
+    parser.add_argument(
+        '--startup-target-ms', type=float, default=STARTUP_TARGET_MS,
+        help='Slowest median CLI startup allowed, in milliseconds.',
+    )
+    parser.add_argument('--keep', action='store_true', help='Keep the database.')
+    arguments = parser.parse_args()
+
+    server_settings = use_database(arguments.database, arguments.engine)
+    db_settings = {**server_settings, KEY_DATABASE: arguments.database}
+    config = {
+        'engine': db_settings['engine'],
+        'sports': arguments.sports,
+        'events_per_sport': arguments.events_per_sport,
+        'selections_per_event': arguments.selections_per_event,
+        'repeat': arguments.repeat,
+    }
+    try:
+        sport_ids, event_ids, selection_ids = seed(
+            arguments.sports, arguments.events_per_sport, arguments.selections_per_event,
+        )
+        measured = {
+            name: measure(operation, arguments.repeat, arguments.warmup)
+            for name, operation in operations(
+                sport_ids, event_ids, selection_ids, arguments.selections_per_event,
+            ).items()
+        }
+        if not arguments.skip_cli:
+            measured.update(
+                (name, measure(operation, arguments.cli_repeat, warmup=1))
+                for name, operation in cli_operations(db_settings).items()
+            )
+    finally:
+        if not arguments.keep:
+            drop_database(server_settings, arguments.database)
+
+    results = {
+        'config': config,
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': measured,
+    }
+    print_results(
+        f"{config['engine']}, {len(selection_ids)} selections", measured,
+    )
+    with open(arguments.output, 'w') as output:
+        json.dump(results, output, indent=2)
+
+    regressions = check_startup(results, arguments.startup_target_ms)
+    if regressions:
+        raise Regression('\n'.join(regressions))
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline:
+            regressions = compare(results, json.load(baseline), arguments.tolerance)
+        if regressions:
+            raise Regression(
+                f'{len(regressions)} regression(s) against {arguments.baseline}:\n'
+                + '\n'.join(regressions)
+            )
+        print(f'No regressions against {arguments.baseline}.')
+
+
+if __name__ == '__main__':
+    main()
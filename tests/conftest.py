@@ -1,4 +1,6 @@
 from datetime import datetime
+from os import environ
+from typing import Any, Dict, Iterator
 
 import pytest
 
@@ -12,7 +14,7 @@ from app.models import (
     create_database,
     remove_database,
 )
-from app.schemas import EventSchema, SelectionSchema, SportSchema
+from app.schemas import EventSchema, ISchema, SelectionSchema, SportSchema
 
 
 def create_event_testing_schema()  -> EventSchema:
@@ -57,11 +59,11 @@ def selection_testing_schema() -> SelectionSchema:
 def sport_testing_schema() -> SportSchema:
     return create_sport_testing_schema()
 
-@pytest.fixture(scope='session', autouse=True)
-def database() -> None:
-    KEY_DATABASE = 'database'
-
-    DB_SETTINGS = {
+@pytest.fixture(scope='session')
+def db_settings(tmp_path_factory: pytest.TempPathFactory) -> Dict[str, Any]:
+    return {
+        'engine': environ.get('TEST_DB_ENGINE', 'memory'),
+        'directory': str(tmp_path_factory.mktemp('databases')),
         'host': 'localhost',
         'port': '3306',
         'user': 'root',
@@ -69,21 +71,27 @@ def database() -> None:
         'password': 'root'
     }
 
-    BaseModel.db_settings = DB_SETTINGS
+@pytest.fixture(autouse=True)
+def database(db_settings: Dict[str, Any]) -> Iterator[Dict[str, ISchema]]:
+    """A fresh database for every test, so no test depends on another.
+
+    Seeded with a sport, an event and a selection, returned by entity name.
+    """
+    KEY_DATABASE = 'database'
+
+    BaseModel.db_settings = db_settings
 
-    db_settings_without_database = DB_SETTINGS.copy()
+    db_settings_without_database = db_settings.copy()
     database_name = db_settings_without_database[KEY_DATABASE] 
     del db_settings_without_database[KEY_DATABASE] 
 
     remove_database(db_settings_without_database, database_name) # If the tests crashed, etc.
     create_database(db_settings_without_database, database_name)
 
-    SportModel().insert(create_sport_testing_schema())
-    EventModel().insert(create_event_testing_schema())
-    SelectionModel().insert(create_selection_testing_schema())
-
-    yield
+    yield {
+        'Sport': SportModel().insert(create_sport_testing_schema()),
+        'Event': EventModel().insert(create_event_testing_schema()),
+        'Selection': SelectionModel().insert(create_selection_testing_schema()),
+    }
 
     remove_database(db_settings_without_database, database_name)
-
-    
\ No newline at end of file
@@ -0,0 +1,84 @@
+import asyncio
+
+from app.async_models import (
+    AsyncEventModel,
+    AsyncSelectionModel,
+    AsyncSportModel,
+)
+from app.enums import Operators, OutcomeEnum
+from app.models import BaseModel
+from app.schemas import SelectionSchema, SportSchema
+
+
+def test_find_and_execute() -> None:
+    async def run():
+        sport = await AsyncSportModel().find(1)
+        model = AsyncEventModel()
+        query = model.filter('Sport', Operators.Equals, 1)
+        events, again = await asyncio.gather(query.execute(), query.execute())
+        return sport, query, events, again
+
+    sport, query, events, again = asyncio.run(run())
+    assert sport.ID == 1
+    assert 'WHERE' in query.get_query()
+    assert events and all(event.Sport == 1 for event in events)
+    assert again == events
+
+
+def test_concurrent_lookups_and_insert_many() -> None:
+    async def run():
+        model = AsyncSelectionModel()
+        inserted = await model.insert_many(
+            SelectionSchema(Name=f'async_{i}', Event=1, Price=1.5, Active=True, Outcome=OutcomeEnum.Unsettled)
+            for i in range(20)
+        )
+        found = await model.filter('Name', Operators.In, [f'async_{i}' for i in range(20)]).execute()
+        lookups = await asyncio.gather(*(model.find(selection.ID) for selection in found * 10))
+        streamed = [
+            selection async for selection in
+            AsyncSelectionModel().filter('ID', Operators.In, [s.ID for s in found]).iter(batch_size=7)
+        ]
+        return inserted, found, lookups, streamed
+
+    inserted, found, lookups, streamed = asyncio.run(run())
+    assert inserted == 20 == len(found)
+    assert len(lookups) == 200
+    assert {selection.ID for selection in lookups} == {selection.ID for selection in found}
+    assert sorted(s.ID for s in streamed) == sorted(s.ID for s in found)
+
+
+def test_insert_and_update() -> None:
+    async def run():
+        sport = await AsyncSportModel().insert(SportSchema(Name='async', Slug='async', Active=True))
+        sports = await AsyncSportModel().find_many([sport.ID])
+        sport.Active = False
+        await AsyncSportModel().update(sport)
+        return sports, await AsyncSportModel().find(sport.ID)
+
+    (sports, missing_ids), sport = asyncio.run(run())
+    assert len(sports) == 1 and missing_ids == []
+    assert not sport.Active
+
+
+def test_suspended_iterators_hold_no_connection() -> None:
+    async def run():
+        model = AsyncSelectionModel()
+        await model.insert_many(
+            SelectionSchema(Name=f'iter_{i}', Event=1, Price=1.5, Active=True, Outcome=OutcomeEnum.Unsettled)
+            for i in range(5)
+        )
+        query = model.filter('Name', Operators.In, [f'iter_{i}' for i in range(5)])
+        # More suspended iterators than pooled connections.
+        iterators = [query.iter(batch_size=2).__aiter__() for _ in range(BaseModel.pool().size + 1)]
+        firsts = [await iterator.__anext__() for iterator in iterators]
+        in_use = BaseModel.pool().stats().in_use
+        rests = [[schema async for schema in iterator] for iterator in iterators]
+        limited = [schema async for schema in query.order_by('ID', descending=True).offset(1).limit(3).iter(batch_size=2)]
+        return firsts, in_use, rests, limited
+
+    firsts, in_use, rests, limited = asyncio.run(run())
+    assert in_use == 0
+    ids = [firsts[0].ID] + [selection.ID for selection in rests[0]]
+    assert len(ids) == 5 and ids == sorted(ids)
+    assert all([first.ID] + [s.ID for s in rest] == ids for first, rest in zip(firsts, rests))
+    assert [selection.ID for selection in limited] == sorted(ids, reverse=True)[1:4]
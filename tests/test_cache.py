@@ -0,0 +1,60 @@
+from typing import cast
+
+from app.cache import QueryCache
+from app.models import BaseModel, SportModel
+from app.schemas import SportSchema
+
+
+def test_cache_lru_and_ttl() -> None:
+    cache = QueryCache(max_size=2, ttl=60)
+    first, second, third = (
+        cache.key('sports', 'SELECT ID FROM sports WHERE ID = %s', (id,))
+        for id in (1, 2, 3)
+    )
+    cache.set(first, [(1,)])
+    cache.set(second, [(2,)])
+    assert cache.get(first) == [(1,)]
+
+    cache.set(third, [(3,)])  # Evicts `second`, the least recently used.
+    assert cache.get(second) is None
+
+    expired = QueryCache(ttl=0)
+    key = expired.key('sports', 'SELECT ID FROM sports', ())
+    expired.set(key, [])
+    assert expired.get(key) is None
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.evictions) == (1, 1, 1)
+    assert expired.stats().expirations == 1
+
+
+def test_cache_invalidation() -> None:
+    cache = QueryCache()
+    key = cache.key('sports', 'SELECT ID FROM sports', ())
+    cache.set(key, [(1,)])
+
+    cache.invalidate('events')
+    assert cache.get(cache.key('sports', 'SELECT ID FROM sports', ())) == [(1,)]
+
+    cache.invalidate('sports')
+    assert cache.get(cache.key('sports', 'SELECT ID FROM sports', ())) is None
+
+    cache.set(key, [(1,)])  # Stale result computed before the invalidation.
+    assert cache.get(cache.key('sports', 'SELECT ID FROM sports', ())) is None
+
+
+def test_model_result_cache() -> None:
+    cache = BaseModel.enable_result_cache()
+    try:
+        sm = SportModel()
+        sport = cast(SportSchema, sm.insert(SportSchema(Name='cached', Slug='c', Active=True)))
+
+        assert sm.find(sport.get_id()).Name == 'cached'
+        assert sm.find(sport.get_id()).Name == 'cached'
+        assert cache.stats().hits == 1
+
+        sport.Name = 'renamed'
+        sm.update(sport)
+        assert sm.find(sport.get_id()).Name == 'renamed'
+    finally:
+        BaseModel.disable_result_cache()
@@ -1,8 +1,14 @@
+import re
+
 import pytest
+from typer import BadParameter
 from typer.testing import CliRunner, Result
 
-from app.cli import app
-from typing import List
+from app.cli import _parse_filter, _script_lines, app
+from app.enums import Operators
+from app.models import ModelFactory
+from app.schemas import ISchema
+from typing import Dict, List
 
 runner = CliRunner()
 
@@ -17,25 +23,90 @@ def test_create(arguments: List[str], entity_name: str) -> None:
     result = runner.invoke(app, arguments)
 
     assert result.exit_code == 0
-    assert f"Inserted {entity_name} with ID: 2 successfully." in result.stdout
+    match = re.search(f'Inserted {entity_name} with ID: (\\d+) successfully.', result.stdout)
+    assert match is not None
+    created = ModelFactory.create(entity_name.lower()).find(int(match.group(1)))
+    assert created.Name == 'testing'
 
 @pytest.mark.parametrize("arguments, entity_name", 
     [
-        (['update-sport', '1', '--name', 'updated', '--slug', 'up'], 'Sport'),
-        (['update-event', '1', '--name', 'updated', '--inactive'], 'Event'),
-        (['update-selection', '1', '--name', 'updated', '--inactive'], 'Selection'),
+        (['update-sport', '--name', 'updated', '--slug', 'up'], 'Sport'),
+        (['update-event', '--name', 'updated', '--inactive'], 'Event'),
+        (['update-selection', '--name', 'updated', '--inactive'], 'Selection'),
     ]
 )
-def test_update(arguments: List[str], entity_name: str) -> None:
+def test_update(
+    arguments: List[str], entity_name: str, database: Dict[str, ISchema],
+) -> None:
     # Could implement into test_create but I did it this way for increased readability.
-    result = runner.invoke(app, arguments)
+    id = database[entity_name].get_id()
+    result = runner.invoke(app, [arguments[0], str(id), *arguments[1:]])
     
     print(result.stdout)
     assert result.exit_code == 0
-    assert f"Updated {entity_name} with ID: 1 successfully." in result.stdout
+    assert f"Updated {entity_name} with ID: {id} successfully." in result.stdout
+    assert ModelFactory.create(entity_name.lower()).find(id).Name == 'updated'
 
 
 def test_search() -> None:
     """Manually tested its difficult with while loops. I could refactor but I'm happy with it for now."""
     ...
 
+
+def test_search_unknown_field() -> None:
+    result = runner.invoke(app, ['search', 'sport', '--filter', 'Name;DROP = 1'])
+
+    assert result.exit_code != 0
+    assert 'Unknown fields of sports' in result.output
+
+
+def test_search_value_of_another_type() -> None:
+    result = runner.invoke(app, ['search', 'sport', '--filter', 'ID = abc'])
+
+    assert result.exit_code == 0
+    assert 'Nothing was found.' in result.stdout
+
+
+def test_search_bad_page_token() -> None:
+    result = runner.invoke(
+        app, ['search', 'sport', '--filter', 'Active = 1', '--limit', '1', '--page-token', 'tampered'],
+    )
+
+    assert result.exit_code != 0
+    assert '--page-token' in result.output
+    assert result.exception is None or isinstance(result.exception, SystemExit)
+
+
+
+def test_parse_filter() -> None:
+    assert _parse_filter('Name = two words') == ('Name', Operators.Equals, 'two words')
+    assert _parse_filter('ID NOT IN 1, 2') == ('ID', Operators.NotIn, ['1', '2'])
+    with pytest.raises(BadParameter):
+        _parse_filter('Name ~ x')
+
+
+def test_script_lines() -> None:
+    script = ['# Seed\n', '\n', '  create-sport a b  \n', 'update-sport 1 --name c\n']
+    assert list(_script_lines(script)) == [(3, 'create-sport a b'), (4, 'update-sport 1 --name c')]
+
+
+def test_batch(tmp_path, database: Dict[str, ISchema]) -> None:
+    sport_id, selection_id = database['Sport'].get_id(), database['Selection'].get_id()
+    script = tmp_path / 'script.txt'
+    script.write_text(
+        '# Each line is a command.\n'
+        'create-sport batch batch-sport\n'
+        f'update-sport {sport_id} --name batch_renamed\n'
+        f'update-selection {selection_id} --price not_a_price\n'
+        'search sport --filter "Name = batch_renamed" --select-field Name --format ndjson\n'
+    )
+
+    result = runner.invoke(app, ['batch', str(script), '--transaction-size', '2'])
+
+    assert result.exit_code == 1  # One command failed.
+    match = re.search(r'Inserted Sport with ID: (\d+)', result.stdout)
+    assert match is not None
+    assert ModelFactory.create('sport').find(int(match.group(1))).Name == 'batch'
+    assert f'{{"ID": {sport_id}, "Name": "batch_renamed"}}' in result.stdout
+    assert "Line 4: Invalid value for '--price'" in result.stdout
+    assert 'Ran 4 commands, 1 failed' in result.stdout
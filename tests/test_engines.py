@@ -0,0 +1,181 @@
+import pytest
+
+from app.engines import MySQLEngine, SQLiteEngine, close_engines, get_engine
+from app.enums import Operators
+from app.migrations import SCHEMA_VERSION
+from app.models import SelectionModel, SportModel
+from app.schemas import SportSchema
+from app.statements import (
+    Condition,
+    Count,
+    DeactivateOrphans,
+    Insert,
+    OrderBy,
+    Select,
+    NO_LIMIT,
+    Update,
+    condition,
+)
+
+
+def test_compile_mysql() -> None:
+    engine = MySQLEngine({'database': 'unused'})
+
+    select = Select(
+        'sports',
+        ('ID', 'Name'),
+        (
+            Condition('Name', Operators.Equals, 'a'),
+            condition('ID', Operators.In, [1, 2]),
+        ),
+        order_by=(OrderBy('ID', descending=True),),
+        for_update=True,
+    )
+    query, params = engine.compile_select(select)
+    assert query == 'SELECT ID, Name FROM sports WHERE Name = %s AND ID IN (%s, %s) ORDER BY ID DESC FOR UPDATE'
+    assert params == ['a', 1, 2]
+    # Only the shape is cached, the same SQL is reused for new values.
+    assert engine.compile_select(select._replace(conditions=(
+        Condition('Name', Operators.Equals, 'b'), condition('ID', Operators.In, [3, 4]),
+    )))[0] is query
+
+    assert engine.compile_select(
+        Select(
+            'sports',
+            ('ID',),
+            order_by=(OrderBy('Name', descending=True), OrderBy('ID', descending=True)),
+            limit=10,
+            after=('b', 5),
+        ),
+    ) == ('SELECT ID FROM sports WHERE (Name, ID) < (%s, %s) ORDER BY Name DESC, ID DESC LIMIT %s OFFSET %s', ['b', 5, 10, 0])
+    assert engine.compile_select(Select('sports', ('ID',), offset=5))[1] == [NO_LIMIT, 5]
+    assert engine.compile(
+        Count('events', (Condition('Active', Operators.Equals, True),), ('Sport',)),
+    ) == ('SELECT Sport, COUNT(*) FROM events WHERE Active = %s GROUP BY Sport', [True])
+
+    assert engine.compile_update(
+        Update('sports', (('Active', False),), (Condition('ID', Operators.Equals, 1),)),
+    ) == ('UPDATE sports SET Active = %s WHERE ID = %s', [False, 1])
+    assert engine.compile_insert(
+        Insert('sports', ('Name', 'Slug'), (('a', 'a'), ('b', 'b'))),
+    ) == ('INSERT INTO sports (Name, Slug) VALUES (%s, %s), (%s, %s)', ['a', 'a', 'b', 'b'])
+    assert engine.compile_deactivate_orphans(
+        DeactivateOrphans('events', 'selections', 'Event', (1,)),
+    )[0] == 'UPDATE events SET Active = 0 WHERE ID IN (%s) AND Active = 1 AND NOT EXISTS (SELECT 1 FROM selections WHERE selections.Event = events.ID AND selections.Active = 1)'
+    assert engine.create_table_query(SportModel.metadata()) == 'CREATE TABLE IF NOT EXISTS sports (ID INTEGER PRIMARY KEY AUTO_INCREMENT, Name VARCHAR(255), Slug VARCHAR(255), Active BOOLEAN)'
+
+
+def test_compile_sqlite(tmp_path) -> None:
+    engine = SQLiteEngine({'database': 'unused', 'directory': str(tmp_path)})
+
+    query, _ = engine.compile_select(
+        Select('sports', ('ID',), (condition('ID', Operators.NotIn, []),), for_update=True),
+    )
+    assert query == 'SELECT ID FROM sports WHERE 1 = 1'
+    assert engine.create_table_query(SportModel.metadata()) == 'CREATE TABLE IF NOT EXISTS sports (ID INTEGER PRIMARY KEY, Name TEXT, Slug TEXT, Active BOOLEAN)'
+
+
+def test_sqlite_engine(tmp_path) -> None:
+    settings = {'engine': 'sqlite', 'directory': str(tmp_path), 'database': 'engine_test'}
+    engine = get_engine(settings)
+    assert get_engine(dict(settings)) is engine
+
+    metadata = SelectionModel.metadata()
+    engine.ensure_schema(lambda: [metadata, SportModel.metadata()])
+    with engine.pool.connection() as connection:
+        assert connection.raw.execute('PRAGMA journal_mode').fetchone() == ('wal',)
+        assert set(metadata.indexes) <= engine.existing_indexes(connection, metadata.table_name)
+
+        rows = tuple(
+            (f'sport_{index}', f's{index}', True) for index in range(engine.MAX_VARIABLES)
+        )
+        first_id = engine.insert(
+            connection, Insert('sports', ('Name', 'Slug', 'Active'), rows),
+        )
+        connection.commit()
+
+        assert first_id == 1
+        cursor = engine.select(
+            connection,
+            Select(
+                'sports',
+                ('ID', 'Name'),
+                (Condition('ID', Operators.GreaterThan, len(rows) - 2),),
+                order_by=(OrderBy('ID'),),
+            ),
+        )
+        assert cursor.fetchall() == [
+            (len(rows) - 1, f'sport_{len(rows) - 2}'), (len(rows), f'sport_{len(rows) - 1}'),
+        ]
+        cursor = engine.select(
+            connection,
+            Select(
+                'sports',
+                ('ID',),
+                (Condition('Active', Operators.Equals, True),),
+                order_by=(OrderBy('Slug'), OrderBy('ID')),
+                limit=2,
+                offset=1,
+                after=('s10', 11),
+            ),
+        )
+        assert cursor.fetchall() == [(1001,), (10001,)]  # s1000 and s10000, after s10 and s100.
+
+    close_engines('engine_test')
+    engine.remove_database('engine_test')
+    assert not list(tmp_path.iterdir())
+
+
+def test_prepared_statement_cache(tmp_path) -> None:
+    engine = SQLiteEngine({'database': 'statements', 'directory': str(tmp_path)})
+    engine.ensure_schema(lambda: [SportModel.metadata()])
+
+    with engine.pool.connection() as connection:
+        for id in (1, 2):
+            engine.select(
+                connection,
+                Select('sports', ('ID',), (Condition('ID', Operators.Equals, id),)),
+            ).fetchall()
+
+        assert (connection.statements.hits, connection.statements.misses) == (1, 1)
+    engine.close()
+
+
+def test_models_use_engine() -> None:
+    engine = SportModel.engine()
+    sport = SportModel().insert(SportSchema(Name='engine', Slug='engine', Active=True))
+
+    assert SportModel.pool() is engine.pool
+    assert SportModel().find(sport.get_id()).Name == 'engine'
+
+
+@pytest.mark.parametrize('engine_name', ['sqlite', 'memory'])
+def test_ensure_schema(tmp_path, engine_name: str) -> None:
+    settings = {'engine': engine_name, 'directory': str(tmp_path), 'database': 'schema_test'}
+    engine = get_engine(settings)
+    engine.remove_database('schema_test')
+    engine.create_database('schema_test')
+    created = []
+
+    def tables():
+        created.append(True)
+        return [SportModel.metadata(), SelectionModel.metadata()]
+
+    with engine.pool.connection() as connection:
+        assert engine.schema_version(connection) == 0
+    engine.ensure_schema(tables)
+    engine.ensure_schema(tables)
+    assert created == [True]
+    with engine.pool.connection() as connection:
+        assert engine.schema_version(connection) == SCHEMA_VERSION
+        assert engine.has_table(connection, 'selections')
+        assert not engine.has_table(connection, 'events')
+
+    # A new process, i.e. engine, only reads the version.
+    engine.close()
+    engine = type(engine)(settings)
+    engine.ensure_schema(tables)
+    assert created == [True]
+
+    close_engines('schema_test')
+    engine.remove_database('schema_test')
@@ -0,0 +1,32 @@
+import io
+import json
+
+from app.enums import DataFormats, Entities, Operators
+from app.exporter import export
+from app.importer import Importer, read_rows
+from app.models import EventModel, SportModel
+from app.schemas import SportSchema
+
+
+def test_export_csv_follows_selected_fields() -> None:
+    sport = SportModel().insert(SportSchema(Name='export, csv', Slug='export', Active=False))
+    query = SportModel().select('Name', 'Active').filter('ID', Operators.Equals, sport.ID)
+    output = io.StringIO()
+
+    assert export(query, DataFormats.CSV, output) == 1
+    assert output.getvalue().splitlines() == ['ID,Name,Active', f'{sport.ID},"export, csv",false']
+
+
+def test_export_ndjson_round_trips() -> None:
+    query = EventModel().filter('ID', Operators.Equals, 1)
+    output = io.StringIO()
+
+    assert export(query, DataFormats.NDJSON, output, batch_size=1) == 1
+    row = json.loads(output.getvalue())
+    assert list(row) == list(query.fields)
+    assert row['Active'] is True
+    assert isinstance(row['ScheduledStart'], str)
+
+    output.seek(0)
+    report = Importer(Entities.Event.value).run(read_rows(output, DataFormats.NDJSON))
+    assert (report.inserted, report.rejected) == (1, 0)
@@ -0,0 +1,82 @@
+import io
+from typing import List
+
+import pytest
+
+from app.enums import DataFormats, Entities, Operators
+from app.importer import Importer, ParentKeys, Rejection, detect_format, read_rows
+from app.models import EventModel, SelectionModel, SportModel
+from app.schemas import SportSchema
+
+
+def test_detect_format() -> None:
+    assert detect_format('feed.CSV') is DataFormats.CSV
+    assert detect_format('feed.jsonl') is DataFormats.NDJSON
+    assert detect_format('-') is DataFormats.NDJSON
+    with pytest.raises(ValueError):
+        detect_format('feed.xml')
+
+
+def test_import_csv_with_parent_keys() -> None:
+    SportModel().insert(SportSchema(Name='Import', Slug='import-sport', Active=True))
+    feed = io.StringIO(
+        'Name,Slug,Active,Type,Sport,Status,ScheduledStart\n'
+        'import_1,import-1,true,Preplay,import-sport,Pending,2022-01-01T12:00:00\n'
+        'import_2,import-2,false,Inplay,import-sport,Started,2022-01-01T13:00:00\n'
+        'import_3,import-3,true,Preplay,missing-sport,Pending,2022-01-01T12:00:00\n'
+        'import_4,import-4,true,Unknown,import-sport,Pending,2022-01-01T12:00:00\n'
+        'import_5,import-5,true,Preplay,import-sport,Pending,\n'
+    )
+    rejections: List[Rejection] = []
+
+    report = Importer(
+        Entities.Event.value, parent_key='Slug', batch_size=2, on_reject=rejections.append,
+    ).run(read_rows(feed, DataFormats.CSV))
+
+    assert (report.rows, report.inserted, report.rejected) == (5, 2, 3)
+    assert [rejection.line for rejection in rejections] == [3, 4, 5]
+    assert 'Unknown Sport: missing-sport.' == rejections[0].error
+    events = EventModel().filter('Slug', Operators.In, ['import-1', 'import-2']).execute()
+    assert len(events) == 2
+    assert len({event.Sport for event in events}) == 1
+
+
+def test_parent_keys_past_max_size() -> None:
+    sports = [
+        SportModel().insert(SportSchema(Name='Keys', Slug=f'keys-{index}', Active=True))
+        for index in range(3)
+    ]
+    ids = {sport.Slug: sport.get_id() for sport in sports}
+    parent_keys = ParentKeys(SportModel(), 'Slug', max_size=2)
+
+    assert parent_keys.resolve(['keys-0', 'keys-1']) == {'keys-0': ids['keys-0'], 'keys-1': ids['keys-1']}
+    # Past max_size the cache is cleared, keeping cached keys in the result.
+    assert parent_keys.resolve(['keys-1', 'keys-2']) == {'keys-1': ids['keys-1'], 'keys-2': ids['keys-2']}
+    assert parent_keys.resolve(['keys-0', 'missing']) == {'keys-0': ids['keys-0']}
+
+
+def test_import_ndjson() -> None:
+    feed = io.StringIO(
+        '{"Name": "import", "Event": 1, "Price": 1.5, "Active": true, "Outcome": "Unsettled", "ID": 1}\n'
+        '\n'
+        '{"Name": "import", "Event": 1, "Price": 2.5, "Active": true, "Outcome": "Win"}\n'
+        '{"Name": "import", \n'
+        '[1, 2]\n'
+    )
+    rejections: List[Rejection] = []
+
+    report = Importer(Entities.Selection.value, on_reject=rejections.append).run(
+        read_rows(feed, DataFormats.NDJSON),
+    )
+
+    assert (report.rows, report.inserted, report.rejected) == (4, 2, 2)
+    assert report.rows_per_second > 0
+    assert [rejection.line for rejection in rejections] == [3, 4]
+    selections = SelectionModel().filter('Name', Operators.Equals, 'import').execute()
+    assert sorted(selection.Price for selection in selections) == [1.5, 2.5]
+    assert all(selection.ID != 1 for selection in selections)
+
+
+def test_parent_key_needs_a_parent() -> None:
+    with pytest.raises(ValueError):
+        Importer(Entities.Sport.value, parent_key='Slug')
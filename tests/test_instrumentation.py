@@ -0,0 +1,81 @@
+import logging
+from datetime import datetime
+from typing import List
+
+import pytest
+
+from app.instrumentation import QueryEvent, instrumentation
+from app.models import BaseModel, EventModel, SelectionModel, SportModel
+from app.schemas import EventSchema, SelectionSchema, SportSchema
+
+
+@pytest.fixture()
+def events() -> List[QueryEvent]:
+    events: List[QueryEvent] = []
+    instrumentation.enable()
+    instrumentation.add_hook(after=events.append)
+    yield events
+    instrumentation.remove_hook(events.append)
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_disabled_by_default() -> None:
+    assert not instrumentation.enabled
+    assert BaseModel.engine() is SportModel.engine()
+    assert type(BaseModel.engine()).__name__ != 'InstrumentedEngine'
+
+
+def test_hooks_and_counters(events: List[QueryEvent]) -> None:
+    before: List[QueryEvent] = []
+    instrumentation.add_hook(before=before.append)
+    SportModel().find(1)
+    instrumentation.remove_hook(before.append)
+
+    event = events[-1]
+    assert before == [event]
+    assert (event.model, event.method, event.operation) == ('SportModel', 'find', 'select')
+    assert 'FROM sports WHERE ID =' in event.sql
+    assert event.params == [1]
+    assert event.rowcount == 1
+    assert event.elapsed > 0
+    assert event.connection_wait > 0
+
+    event = EventModel().insert(EventSchema(
+        Name='instrumented', Slug='instrumented', Active=True, Type='Preplay',
+        Sport=1, Status='Pending', ScheduledStart=datetime.now(),
+    ))
+    selection = SelectionModel().insert(
+        SelectionSchema(Name='instrumented', Event=event.ID, Price=1.5, Active=True, Outcome='Unsettled'),
+    )
+    selection.Price += 1
+    SelectionModel().update(selection)
+    SelectionModel().update(SelectionSchema(**{**selection.dict(), 'Active': False}))
+
+    counters = instrumentation.counters()
+    assert counters[('SportModel', 'find')].statements == 1
+    update = counters[('SelectionModel', 'update')]
+    assert update.by_operation['update'] == 2
+    assert update.by_operation['lock'] == 2  # Events, then sports.
+    assert 'SelectionModel.update' in instrumentation.report()
+
+
+def test_slow_query_log(events: List[QueryEvent], caplog) -> None:
+    instrumentation.enable(slow_query_threshold=0)
+    with caplog.at_level(logging.WARNING, logger='app.slow_queries'):
+        SportModel().insert(SportSchema(Name='slow', Slug='slow', Active=True))
+
+    assert events[-1].operation == 'insert'
+    assert 'SportModel.insert' in caplog.text
+    assert instrumentation.counters()[('SportModel', 'insert')].slow == 1
+
+
+def test_nested_statements_while_iterating(events: List[QueryEvent]) -> None:
+    SportModel().insert(SportSchema(Name='nested', Slug='nested', Active=True))
+    for sport in SportModel().query().iter(batch_size=1):
+        EventModel().find(1)
+        assert (events[-1].model, events[-1].method) == ('EventModel', 'find')
+
+    counters = instrumentation.counters()
+    assert counters[('SportModel', 'stream')].statements == 1
+    assert counters[('EventModel', 'find')].statements == 2
@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+from app import memory
+from app.engines import close_engines, get_engine
+from app.enums import Operators, StatusEnum, TypeEnum
+from app.memory import IntegrityError, MemoryEngine
+from app.models import EventModel, SportModel
+from app.statements import Condition, Insert, OrderBy, Select, Update, condition
+
+SPORTS = ('ID', 'Name', 'Slug', 'Active')
+
+
+@pytest.fixture()
+def engine(tmp_path) -> MemoryEngine:
+    engine = get_engine({'engine': 'memory', 'directory': str(tmp_path), 'database': 'memory_test'})
+    engine.ensure_schema(lambda: [SportModel.metadata(), EventModel.metadata()])
+    with engine.pool.connection() as connection:
+        engine.insert(
+            connection,
+            Insert('sports', ('Name', 'Slug', 'Active'), (('a', 'a', True), ('b', 'b', False), ('c', 'c', True))),
+        )
+        engine.insert(
+            connection,
+            Insert(
+                'events',
+                EventModel.metadata().data_columns,
+                tuple(
+                    ('e', 'e', True, TypeEnum.Preplay, sport, StatusEnum.Pending, datetime(2021, 1, sport))
+                    for sport in (1, 1, 3)
+                ),
+            ),
+        )
+        connection.commit()
+    yield engine
+    close_engines('memory_test')
+    engine.remove_database('memory_test')
+
+
+def _ids(engine: MemoryEngine, *conditions: Condition, **options) -> list:
+    with engine.pool.connection() as connection:
+        return [
+            row[0]
+            for row in engine.select(connection, Select('events', ('ID',), conditions, **options)).fetchall()
+        ]
+
+
+def test_operators(engine: MemoryEngine) -> None:
+    assert _ids(engine, Condition('Sport', Operators.Equals, '1')) == [1, 2]  # Strings are converted, as the CLI passes them.
+    assert _ids(engine, Condition('Sport', Operators.NotEquals, 1)) == [3]
+    assert _ids(engine, Condition('ScheduledStart', Operators.GreaterThan, '2021-01-02')) == [3]
+    assert _ids(engine, Condition('ID', Operators.LessThan, 3), order_by=(OrderBy('ID', descending=True),)) == [2, 1]
+    assert _ids(engine, condition('ID', Operators.In, [3, 1, 9])) == [1, 3]
+    assert _ids(engine, condition('Sport', Operators.NotIn, [1])) == [3]
+    assert _ids(engine, condition('ID', Operators.In, [])) == []
+
+    with engine.pool.connection() as connection:
+        assert engine.select(
+            connection, Select('events', ('Sport',), distinct=True),
+        ).fetchall() == [(1,), (3,)]
+
+
+def test_rollback_and_integrity(engine: MemoryEngine) -> None:
+    with engine.pool.connection() as connection:
+        engine.insert(connection, Insert('sports', ('Name', 'Slug', 'Active'), (('d', 'd', True),)))
+        assert engine.update(
+            connection,
+            Update('events', (('Active', False),), (Condition('Sport', Operators.Equals, 1),)),
+        ) == 2
+        connection.rollback()
+
+        with pytest.raises(IntegrityError):
+            engine.insert(connection, Insert('sports', SPORTS, ((1, 'x', 'x', True),)))
+        connection.rollback()
+
+    assert _ids(engine, Condition('Active', Operators.Equals, True)) == [1, 2, 3]
+    assert _ids(engine, Condition('Sport', Operators.Equals, 1)) == [1, 2]  # The index was restored.
+    with engine.pool.connection() as connection:
+        assert engine.insert(connection, Insert('sports', ('Name', 'Slug', 'Active'), (('d', 'd', True),))) == 4
+
+
+def test_snapshot(engine: MemoryEngine) -> None:
+    engine.snapshot()
+    with engine.pool.connection() as connection:
+        engine.update(connection, Update('sports', (('Name', 'changed'),), ()))
+        connection.commit()
+
+    # As in a new process, the database is loaded from the snapshot.
+    close_engines('memory_test')
+    del memory._databases['memory_test']
+    restored = get_engine(engine.db_settings)
+    with restored.pool.connection() as connection:
+        assert restored.select(connection, Select('sports', ('Name',))).fetchall() == [('a',), ('b',), ('c',)]
+        assert 'ix_events_Sport_Active' in restored.existing_indexes(connection, 'events')
@@ -1,17 +1,29 @@
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import cast
+from typing import Tuple, Type, cast
 
 import pytest
 
-from app.enums import OutcomeEnum, StatusEnum, TypeEnum
+from app.enums import OutcomeEnum, RowShapes, StatusEnum, TypeEnum
+from pydantic import ValidationError
+
 from app.models import (
     BaseModel,
     EventModel,
     Operators,
+    SchemaNotFound,
     SelectionModel,
     SportModel,
 )
-from app.schemas import EventSchema, ISchema, SelectionSchema, SportSchema
+from app.pagination import InvalidPageToken
+from app.schemas import (
+    EventSchema,
+    ISchema,
+    SelectionSchema,
+    SportSchema,
+    SportTreeSchema,
+)
 
 def test_select_fields(sport_testing_schema: SportSchema) -> None:
     sm = SportModel().select_fields('Name', 'Slug')
@@ -21,7 +33,7 @@ def test_select_fields(sport_testing_schema: SportSchema) -> None:
     
 
 @pytest.mark.parametrize("schema, model", [
-        (SportSchema(Name="isport", Slug="is", Active=True), SportModel()),
+        (SportSchema(Name="isport", Slug="is", Active=True), SportModel),
         (
             EventSchema(
                 Name='ievent',
@@ -32,7 +44,7 @@ def test_select_fields(sport_testing_schema: SportSchema) -> None:
                 Status=StatusEnum.Pending,
                 ScheduledStart=datetime.now()
             ),
-            EventModel()
+            EventModel
         ),
         (
             SelectionSchema(
@@ -42,16 +54,16 @@ def test_select_fields(sport_testing_schema: SportSchema) -> None:
                 Active=True,
                 Outcome=OutcomeEnum.Unsettled,
             ),
-            SelectionModel()
+            SelectionModel
         )
     ]
 )
-def test_insert(schema: ISchema, model: BaseModel) -> None:
-    inserted_schema = model.insert(schema)
+def test_insert(schema: ISchema, model: Type[BaseModel]) -> None:
+    inserted_schema = model().insert(schema)
 
     assert inserted_schema.get_id() != None
 
-    assert len(model.select('ID').filter('ID', Operators.Equals, inserted_schema.ID).execute()) == 1
+    assert len(model().select('ID').filter('ID', Operators.Equals, inserted_schema.ID).execute()) == 1
 
 def test_complex_sport_query() -> None:
     ss = SportSchema(Name="test_two", Slug="test_two", Active=True)
@@ -59,7 +71,8 @@ def test_complex_sport_query() -> None:
     sm.insert(ss)
 
     sm = SportModel().select('Name', 'Slug', 'Active').filter('Name', Operators.Equals, "test_two")
-    assert sm.get_query() == "SELECT ID, Name, Slug, Active FROM sports WHERE Name = 'test_two'"
+    assert sm.get_query().replace('?', '%s') == "SELECT ID, Name, Slug, Active FROM sports WHERE Name = %s"
+    assert sm.get_params() == ["test_two"]
 
     sport_models = sm.execute()[0]
     assert sport_models.Name == "test_two"
@@ -68,13 +81,13 @@ def test_complex_sport_query() -> None:
 
 @pytest.mark.parametrize("model, id", 
     [
-        (SportModel(), 1),
-        (EventModel(), 1),
-        (SelectionModel(), 1)
+        (SportModel, 1),
+        (EventModel, 1),
+        (SelectionModel, 1)
     ]
 )
-def test_find(model: BaseModel, id: int) -> None:
-    schema = model.find(id)
+def test_find(model: Type[BaseModel], id: int) -> None:
+    schema = model().find(id)
 
     assert schema.get_id() == id
 
@@ -161,3 +174,366 @@ def test_update_selection() -> None:
     updated_es = em.select('ID', 'Active').filter('ID', Operators.Equals, es.get_id()).execute()[0]
     updated_es = cast(EventSchema, updated_es)
     assert updated_es.Active == False
+
+def test_update_with_active_sibling() -> None:
+    es = EventModel().insert(EventSchema(
+        Name='Sibling_Test',
+        Slug='STest',
+        Active=True,
+        Type=TypeEnum.Inplay,
+        Sport=1,
+        Status=StatusEnum.Pending,
+        ScheduledStart=datetime.now(),
+    ))
+    sm = SelectionModel()
+    first, second = (
+        sm.insert(SelectionSchema(Name=name, Event=es.get_id(), Price=1.5, Active=True, Outcome=OutcomeEnum.Unsettled))
+        for name in ('first', 'second')
+    )
+    event = EventModel().filter('ID', Operators.Equals, es.get_id())
+
+    first.Active = False
+    sm.update(first)
+    assert event.filter('Active', Operators.Equals, True).exists()
+
+    second.Active = False
+    sm.update(second)
+    assert not event.filter('Active', Operators.Equals, True).exists()
+
+
+def _event_with_selection(name: str) -> Tuple[EventSchema, SelectionSchema]:
+    event = EventModel().insert(EventSchema(
+        Name=name,
+        Slug=name,
+        Active=True,
+        Type=TypeEnum.Inplay,
+        Sport=1,
+        Status=StatusEnum.Pending,
+        ScheduledStart=datetime.now(),
+    ))
+    selection = SelectionModel().insert(SelectionSchema(
+        Name=name, Event=event.get_id(), Price=1.5, Active=True, Outcome=OutcomeEnum.Unsettled,
+    ))
+    return event, selection
+
+
+def test_update_writes_changes_only() -> None:
+    _, selection = _event_with_selection('Dirty_Test')
+    sm = SelectionModel()
+    first, second = sm.find(selection.get_id()), sm.find(selection.get_id())
+    assert first.changes() == set()
+
+    first.Price = 3.5
+    first.Name = first.Name  # Not a change.
+    assert first.changes() == {'Price'}
+    sm.update(first)
+    assert first.changes() == set()
+
+    second.Name = 'Dirty_Renamed'
+    sm.update(second)  # Leaves the price of `first` untouched.
+    found = sm.find(selection.get_id())
+    assert (found.Name, found.Price) == ('Dirty_Renamed', 3.5)
+
+    partial, = sm.select('Active').filter('ID', Operators.Equals, selection.get_id()).execute()
+    partial.Active = False
+    sm.update(partial)
+    assert not sm.find(selection.get_id()).Active
+    assert not EventModel().find(selection.Event).Active
+
+
+def test_update_cascades_on_active_change_only() -> None:
+    event, selection = _event_with_selection('Cascade_Change_Test')
+    SelectionModel().patch(selection.get_id(), Active=False)
+    EventModel().patch(event.get_id(), Active=True)  # Reactivated by hand.
+
+    found = SelectionModel().find(selection.get_id())
+    found.Price = 2.5
+    SelectionModel().update(found)
+    assert EventModel().find(event.get_id()).Active
+
+
+def test_patch() -> None:
+    event, selection = _event_with_selection('Patch_Test')
+    sm = SelectionModel()
+
+    assert sm.patch(selection.get_id(), Price='2.5', Outcome=OutcomeEnum.Win) == 1
+    found = sm.find(selection.get_id())
+    assert (found.Price, found.Outcome, found.Name) == (2.5, OutcomeEnum.Win.value, 'Patch_Test')
+
+    assert sm.patch(selection.get_id(), Active=False) == 1
+    assert not EventModel().find(event.get_id()).Active
+    assert sm.patch(selection.get_id(), Active=False) in (0, 1)  # Unchanged, but found.
+
+    with pytest.raises(SchemaNotFound):
+        sm.patch(10 ** 9, Price=1.5)
+    with pytest.raises(ValueError):
+        sm.patch(selection.get_id(), Unknown=1)
+    with pytest.raises(ValidationError):
+        sm.patch(selection.get_id(), Outcome='Maybe')
+
+
+def test_insert_many() -> None:
+    schemas = [
+        SportSchema(Name=f'bulk_{index}', Slug=f'bulk_{index}', Active=True)
+        for index in range(5)
+    ]
+    sm = SportModel()
+
+    assert sm.insert_many((schema for schema in schemas), chunk_size=2) == 5
+
+    ids = [schema.get_id() for schema in schemas]
+    assert None not in ids
+    assert ids == list(range(ids[0], ids[0] + 5))
+    for schema in schemas:
+        assert sm.find(schema.get_id()).Name == schema.Name
+
+def test_deactivate_cascades() -> None:
+    sport = SportModel().insert(SportSchema(Name='Cascade', Slug='C', Active=True))
+    event = EventModel().insert(
+        EventSchema(
+            Name='Cascade',
+            Slug='C',
+            Active=True,
+            Type=TypeEnum.Inplay,
+            Sport=sport.get_id(),
+            Status=StatusEnum.Pending,
+            ScheduledStart=datetime.now(),
+        )
+    )
+    selections = [
+        SelectionSchema(
+            Name=f'Cascade_{index}',
+            Event=event.get_id(),
+            Price=1.5,
+            Active=True,
+            Outcome=OutcomeEnum.Unsettled,
+        )
+        for index in range(3)
+    ]
+    sm = SelectionModel()
+    sm.insert_many(selections)
+    ids = [selection.get_id() for selection in selections]
+
+    assert sm.deactivate(ids[:2]) == 2
+    assert EventModel().find(event.get_id()).Active
+
+    assert sm.deactivate(ids) == 1
+    assert not EventModel().find(event.get_id()).Active
+    assert not SportModel().find(sport.get_id()).Active
+
+def test_metadata() -> None:
+    metadata = SportModel.metadata()
+
+    assert SportModel.metadata() is metadata
+    assert metadata.columns == ('ID', 'Name', 'Slug', 'Active')
+    assert metadata.column_types == {
+        'Name': 'string', 'Slug': 'string', 'Active': 'boolean',
+    }
+    assert metadata.indexes == {'ix_sports_Slug': ('Slug',)}
+
+def test_iter() -> None:
+    sm = SportModel()
+    sm.insert_many(
+        SportSchema(Name='stream', Slug=f'stream_{index}', Active=True)
+        for index in range(5)
+    )
+
+    expected = sm.filter('Name', Operators.Equals, 'stream').execute()
+    streamed = list(sm.filter('Name', Operators.Equals, 'stream').iter(batch_size=2))
+    assert [schema.get_id() for schema in streamed] == [
+        schema.get_id() for schema in expected
+    ]
+
+    abandoned = sm.filter('Name', Operators.Equals, 'stream').iter(batch_size=1)
+    assert next(abandoned).Name == 'stream'
+    abandoned.close()
+    assert sm.find(1).get_id() == 1
+
+def test_indexes_created() -> None:
+    sm = SelectionModel()
+    engine = BaseModel.engine()
+    with engine.pool.connection() as connection:
+        engine.create_indexes(connection, sm.metadata())  # Idempotent on an existing table.
+        indexes = engine.existing_indexes(connection, sm.table_name)
+
+    assert 'ix_selections_Event_Active' in indexes
+
+def test_find_many() -> None:
+    sm = SportModel()
+    missing_id = 10 ** 9
+
+    schemas, missing = sm.find_many([1, missing_id, 1])
+
+    assert [schema.get_id() for schema in schemas] == [1, 1]
+    assert missing == [missing_id]
+
+
+def test_filter_in(sport_testing_schema: SportSchema) -> None:
+    ids = [
+        sport_testing_schema.get_id(),
+        SportModel().insert(SportSchema(Name='In', Slug='in', Active=True)).get_id(),
+    ]
+    sm = SportModel().select('ID').filter('ID', Operators.In, ids)
+    assert sm.get_query().replace('?', '%s') == 'SELECT ID FROM sports WHERE ID IN (%s, %s)'
+    assert {schema.get_id() for schema in sm.execute()} == set(ids)
+
+    assert SportModel().filter('ID', Operators.In, []).execute() == []
+    assert len(SportModel().filter('ID', Operators.NotIn, ids[:1]).filter('ID', Operators.In, ids).execute()) == 1
+
+def test_query_is_immutable() -> None:
+    sm = SportModel()
+    active = sm.filter('Active', Operators.Equals, True)
+    named = active.filter('Name', Operators.Equals, 'Testing').select('Name')
+
+    assert active.get_params() == [True]
+    assert named.get_params() == [True, 'Testing']
+    assert named.get_query().replace('?', '%s') == 'SELECT ID, Name FROM sports WHERE Active = %s AND Name = %s'
+    with pytest.raises(AttributeError):
+        named.statement = active.statement
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda query: query.execute(), [named] * 8))
+    assert all(result == results[0] for result in results)
+    assert results[0][0].get_id() == 1
+
+
+def test_unknown_fields_rejected() -> None:
+    sm = SportModel()
+    with pytest.raises(ValueError):
+        sm.select('(SELECT group_concat(name) FROM sqlite_master) AS Name')
+    with pytest.raises(ValueError):
+        sm.query().order_by('Name; DROP TABLE sports')
+    with pytest.raises(ValueError):
+        sm.filter('Name = Name OR 1', Operators.Equals, 1)
+    with pytest.raises(ValueError):
+        sm.query().count_by('Active, Name')
+    with pytest.raises(ValueError):
+        sm.select_fields('Missing')
+    assert sm.query().count() == 1
+
+
+def test_filter_value_of_another_type() -> None:
+    sm = SportModel()
+
+    assert sm.filter('ID', Operators.Equals, 'abc').execute() == []
+    assert sm.filter('ID', Operators.In, ['abc', 1]).count() == 1
+    assert sm.filter('ID', Operators.NotEquals, 'abc').count() == sm.query().count()
+
+
+def test_order_by_limit_offset() -> None:
+    sm = SportModel()
+    for name in ('order_b', 'order_a', 'order_c'):
+        sm.insert(SportSchema(Name=name, Slug='order', Active=True))
+    query = sm.select('Name').filter('Slug', Operators.Equals, 'order').order_by('Name', descending=True)
+
+    assert [sport.Name for sport in query.execute()] == ['order_c', 'order_b', 'order_a']
+    assert [sport.Name for sport in query.limit(2).offset(1).execute()] == ['order_b', 'order_a']
+    assert [sport.Name for sport in query.offset(2).execute()] == ['order_a']
+    with pytest.raises(ValueError):
+        query.limit(-1)
+
+
+def test_page() -> None:
+    sm = SportModel()
+    for index in range(5):
+        sm.insert(SportSchema(Name=f'page_{index % 2}', Slug='page', Active=True))
+    query = sm.filter('Slug', Operators.Equals, 'page').select('Slug').order_by('Name')
+
+    seen, token = [], None
+    while True:
+        page = query.page(2, token)
+        seen.extend(page.results)
+        token = page.next_token
+        if token is None:
+            break
+    assert len(seen) == 5
+    assert all(not hasattr(sport, 'Name') for sport in seen)
+    ids = [sport.ID for sport in seen]
+    assert len(set(ids)) == 5
+    # By Name then ID, page_0 were inserted 1st, 3rd and 5th.
+    assert ids == [min(ids) + offset for offset in (0, 2, 4, 1, 3)]
+
+    descending = sm.filter('Slug', Operators.Equals, 'page').order_by('ID', descending=True)
+    first = descending.page(3)
+    assert [sport.ID for sport in first.results] == sorted(ids, reverse=True)[:3]
+    with pytest.raises(InvalidPageToken):
+        query.page(2, first.next_token)
+    with pytest.raises(InvalidPageToken):
+        query.page(2, 'not a token')
+    with pytest.raises(ValueError):
+        sm.query().order_by('Name').order_by('ID', descending=True).page(2)
+
+
+def test_exists_and_count() -> None:
+    sm = SportModel()
+    for active in (True, True, False):
+        sm.insert(SportSchema(Name='count', Slug='count', Active=active))
+    query = sm.filter('Name', Operators.Equals, 'count')
+
+    assert query.exists()
+    assert not query.filter('Slug', Operators.Equals, 'missing').exists()
+    assert query.count() == 3
+    assert query.limit(1).count() == 3
+    assert query.count_by('Active') == {True: 2, False: 1}
+    assert query.count_by('Slug', 'Active') == {('count', True): 2, ('count', False): 1}
+    assert sm.filter('ID', Operators.In, []).count() == 0
+
+
+def test_row_shapes() -> None:
+    query = SelectionModel().select('Price', 'Active').filter('ID', Operators.In, [1])
+    expected = query.execute()[0]
+
+    assert query.execute(RowShapes.Tuple) == [(1, expected.Price, expected.Active)]
+    named, = query.execute(RowShapes.NamedTuple)
+    assert (named.ID, named.Price) == (1, expected.Price)
+    record, = query.execute(RowShapes.Record)
+    assert not hasattr(record, '__dict__')
+    assert record._asdict() == {'ID': 1, 'Price': expected.Price, 'Active': expected.Active}
+    assert type(record) is type(SelectionModel().select('Price', 'Active').execute(RowShapes.Record)[0])
+
+    columns = query.execute(RowShapes.Columns)
+    assert columns['ID'] == array('q', [1])
+    assert columns['Price'] == array('d', [expected.Price])
+    assert list(columns['Active']) == [expected.Active]
+
+    names = SportModel().select_fields('Name', shape=RowShapes.Columns)
+    assert isinstance(names['Name'], list) and len(names['Name']) == len(names['ID'])
+
+
+def test_with_children() -> None:
+    sport = SportModel().insert(SportSchema(Name='Tree', Slug='T', Active=True))
+    events = [
+        EventSchema(
+            Name=f'Tree_{index}',
+            Slug='T',
+            Active=True,
+            Type=TypeEnum.Inplay,
+            Sport=sport.get_id(),
+            Status=StatusEnum.Pending,
+            ScheduledStart=datetime.now(),
+        )
+        for index in range(2)
+    ]
+    EventModel().insert_many(events)
+    SelectionModel().insert(
+        SelectionSchema(
+            Name='Tree',
+            Event=events[0].get_id(),
+            Price=2.0,
+            Active=True,
+            Outcome=OutcomeEnum.Unsettled,
+        )
+    )
+
+    trees = SportModel().filter('ID', Operators.Equals, sport.get_id()).with_children()
+
+    tree = cast(SportTreeSchema, trees[0])
+    assert [event.get_id() for event in tree.Events] == [event.get_id() for event in events]
+    assert [selection.Name for selection in tree.Events[0].Selections] == ['Tree']
+    assert tree.Events[1].Selections == []
+
+    shallow = SportModel().filter('ID', Operators.Equals, sport.get_id()).with_children(depth=1)
+    shallow_events = cast(SportTreeSchema, shallow[0]).Events
+    assert [event.get_id() for event in shallow_events] == [event.get_id() for event in events]
+    assert all(event.Selections is None for event in shallow_events)
+    assert cast(SportTreeSchema, SportModel().with_children(depth=0)[0]).Events is None
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+from app.models import BaseModel, SportModel
+from app.pool import ConnectionPool, PoolTimeout, StatementCache
+
+
+class FakeCursor:
+    def __init__(self) -> None:
+        self.prepared = []
+        self.closed = False
+
+    def execute(self, query, params) -> None:
+        if not self.prepared or self.prepared[-1] is not query:
+            self.prepared.append(query)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.closed = False
+        self.in_transaction = False
+
+    def rollback(self) -> None:
+        self.in_transaction = False
+
+    def cursor(self, prepared: bool = False) -> FakeCursor:
+        return FakeCursor()
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def test_pool_reuses_connections() -> None:
+    pool = ConnectionPool(FakeConnection, size=2)
+
+    with pool.connection() as first:
+        first.in_transaction = True
+    with pool.connection() as second:
+        assert second is first
+        assert not second.in_transaction
+
+    stats = pool.stats()
+    assert stats.checkouts == 2
+    assert stats.created == 1
+    assert stats.idle == 1
+
+
+def test_pool_checkout_timeout() -> None:
+    pool = ConnectionPool(FakeConnection, size=1, checkout_timeout=0.01)
+
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+
+    stats = pool.stats()
+    assert stats.waits == 1
+    assert stats.timeouts == 1
+
+
+def test_pool_waits_for_release() -> None:
+    pool = ConnectionPool(FakeConnection, size=1, checkout_timeout=5)
+    connection = pool.acquire()
+
+    releaser = threading.Timer(0.05, pool.release, args=(connection,))
+    releaser.start()
+    assert pool.acquire() is connection
+    releaser.join()
+
+    assert pool.stats().waits == 1
+
+
+def test_pool_replaces_unhealthy_and_expired_connections() -> None:
+    pool = ConnectionPool(
+        FakeConnection,
+        size=1,
+        health_check=lambda connection: False,
+        health_check_after=0,
+    )
+    with pool.connection() as first:
+        ...
+    with pool.connection() as second:
+        assert second is not first
+    assert first.closed
+    assert pool.stats().health_check_failures == 1
+
+    pool = ConnectionPool(FakeConnection, size=1, max_idle_time=0)
+    with pool.connection() as first:
+        ...
+    with pool.connection() as second:
+        assert second is not first
+    assert pool.stats().idle_expired == 1
+
+
+def test_statement_cache() -> None:
+    statements = StatementCache(FakeConnection().cursor, size=1)
+
+    first = statements.execute('SELECT ID FROM sports WHERE ID = %s', [1])
+    assert statements.execute(''.join(['SELECT ID FROM sports WHERE ID = %s']), [2]) is first
+    assert len(first.prepared) == 1  # Prepared once, executed twice.
+    assert (statements.hits, statements.misses) == (1, 1)
+
+    statements.execute('SELECT ID FROM events WHERE ID = %s', [1])
+    assert first.closed
+
+
+def test_models_share_pool() -> None:
+    SportModel().find(1)
+    SportModel().find(1)
+
+    assert SportModel.pool() is BaseModel.pool()
+    stats = BaseModel.pool_stats()
+    assert stats.created <= stats.size
+    assert stats.checkouts > stats.created
@@ -0,0 +1,149 @@
+import threading
+from datetime import datetime
+from os import environ
+
+import pytest
+
+from app.enums import OutcomeEnum, StatusEnum, TypeEnum
+from app.models import (
+    BaseModel,
+    EventModel,
+    Operators,
+    SelectionModel,
+    SportModel,
+    transaction,
+)
+from app.schemas import EventSchema, SelectionSchema, SportSchema
+from app.transactions import current
+
+
+class Abort(Exception):
+    pass
+
+
+def _sport(name: str) -> SportSchema:
+    return SportSchema(Name=name, Slug=name, Active=True)
+
+
+def _names(prefix: str):
+    names = [f'{prefix}{index}' for index in range(1, 4)]
+    return sorted(
+        sport.Name for sport in SportModel().filter('Name', Operators.In, names).execute()
+    )
+
+
+def test_commit() -> None:
+    sm = SportModel()
+    with transaction() as unit:
+        sm.insert(_sport('tx_commit_1'))
+        sm.insert_many([_sport('tx_commit_2'), _sport('tx_commit_3')])
+        assert current() is unit
+        # Reads see the uncommitted writes of the transaction.
+        assert len(_names('tx_commit_')) == 3
+
+    assert current() is None
+    assert _names('tx_commit_') == ['tx_commit_1', 'tx_commit_2', 'tx_commit_3']
+
+
+def test_rollback() -> None:
+    sm = SportModel()
+    with pytest.raises(Abort):
+        with transaction():
+            sm.insert(_sport('tx_rollback_1'))
+            raise Abort()
+
+    assert current() is None
+    assert _names('tx_rollback_') == []
+
+
+def test_nested_savepoint() -> None:
+    sm = SportModel()
+    with transaction():
+        sm.insert(_sport('tx_nested_1'))
+        with pytest.raises(Abort):
+            with transaction():
+                sm.insert(_sport('tx_nested_2'))
+                raise Abort()
+        with transaction():
+            sm.insert(_sport('tx_nested_3'))
+
+    assert _names('tx_nested_') == ['tx_nested_1', 'tx_nested_3']
+
+
+def test_cascade_in_transaction() -> None:
+    sport = SportModel().insert(_sport('tx_cascade'))
+    with transaction():
+        event = EventModel().insert(EventSchema(
+            Name='tx_cascade',
+            Slug='tx_cascade',
+            Active=True,
+            Type=TypeEnum.Preplay,
+            Sport=sport.get_id(),
+            Status=StatusEnum.Pending,
+            ScheduledStart=datetime.now(),
+        ))
+        selection = SelectionModel().insert(SelectionSchema(
+            Name='tx_cascade',
+            Event=event.get_id(),
+            Price=1.5,
+            Active=True,
+            Outcome=OutcomeEnum.Unsettled,
+        ))
+        selection.Active = False
+        SelectionModel().update(selection)
+        assert not EventModel().find(event.get_id()).Active
+
+    assert not EventModel().find(event.get_id()).Active
+    assert not SportModel().find(sport.get_id()).Active
+
+
+def test_commit_invalidates_cache() -> None:
+    BaseModel.enable_result_cache()
+    try:
+        query = SportModel().filter('Name', Operators.Equals, 'tx_cache')
+        assert query.execute() == []
+        with transaction():
+            SportModel().insert(_sport('tx_cache'))
+        assert len(query.execute()) == 1
+    finally:
+        BaseModel.disable_result_cache()
+
+
+@pytest.mark.skipif(
+    environ.get('TEST_DB_ENGINE') != 'mysql',
+    reason='Needs InnoDB snapshots, which outlive the ancestor locks.',
+)
+def test_concurrent_sibling_deactivation() -> None:
+    event = EventModel().insert(EventSchema(
+        Name='tx_siblings',
+        Slug='tx_siblings',
+        Active=True,
+        Type=TypeEnum.Preplay,
+        Sport=1,
+        Status=StatusEnum.Pending,
+        ScheduledStart=datetime.now(),
+    ))
+    first, second = (
+        SelectionModel().insert(SelectionSchema(
+            Name=name, Event=event.get_id(), Price=1.5, Active=True, Outcome=OutcomeEnum.Unsettled,
+        ))
+        for name in ('tx_siblings_1', 'tx_siblings_2')
+    )
+    snapshot_taken, second_committed = threading.Event(), threading.Event()
+
+    def deactivate_first() -> None:
+        with transaction():
+            # Takes the transaction's snapshot while both are active.
+            SelectionModel().find(first.get_id())
+            snapshot_taken.set()
+            second_committed.wait(timeout=10)
+            SelectionModel().patch(first.get_id(), Active=False)
+
+    thread = threading.Thread(target=deactivate_first)
+    thread.start()
+    assert snapshot_taken.wait(timeout=10)
+    SelectionModel().patch(second.get_id(), Active=False)
+    second_committed.set()
+    thread.join()
+
+    assert not EventModel().find(event.get_id()).Active